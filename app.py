@@ -3,13 +3,28 @@ import matplotlib.pyplot as plt
 import numpy as np
 import json
 import os
-import re
-import requests
 import base64
+import hashlib
+import threading
+import time
+from datetime import datetime
 from io import BytesIO
 from dotenv import load_dotenv
 import textwrap
 
+import claude_api
+import prompts
+import tenants
+from artifact_store import COUNT_LIMIT, ArtifactStore
+from generation_cache import backend_from_url, generation_key
+from json_stream import JSONStreamError, JSONStreamParser
+from prefetch import Prefetcher, foreground
+from profiling import ProfileHistory, RerunProfiler
+from bulk_plans import read_review_export, run_bulk_plans
+from role_normalizer import RoleIndex
+from skills_gap import analyze_gaps, load_ratings, rating_matrix
+from skills_kb import SkillsKnowledgeBase, valid_skills
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -21,8 +36,20 @@ st.set_page_config(
     page_icon="👔"
 )
 
-# Custom CSS for professional UI
-st.markdown("""
+# Rerun profiling: ?profile=1 times named sections, ?profile=cprofile also captures a cProfile.
+# With HR360_ADMIN=1 both can be switched on from the sidebar instead.
+profile_param = st.query_params.get("profile", "")
+profiler_available = bool(profile_param) or os.getenv("HR360_ADMIN") == "1"
+profiler = RerunProfiler(
+    enabled=profile_param not in ("", "0") or st.session_state.get("profile_sections", False),
+    capture=profile_param == "cprofile" or st.session_state.get("profile_capture", False)
+).start()
+
+# Everything below runs inside try/finally, so the profiler is stopped even when
+# the script ends early (st.stop() at the key prompt, or a rerun interrupting this one)
+try:
+    # Custom CSS for professional UI
+    st.markdown("""
 <style>
     /* Main Styling */
     .main-header {
@@ -201,119 +228,332 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Get API key
-api_key = os.getenv("ANTHROPIC_API_KEY", "")
-if not api_key:
-    api_key = st.secrets.get("ANTHROPIC_API_KEY", "")
-if not api_key:
-    api_key = st.text_input("Enter your Anthropic API Key:", type="password")
+    # Get API key
+    api_key = os.getenv("ANTHROPIC_API_KEY", "")
     if not api_key:
-        st.warning("Please enter a valid API key to use the application.")
-        st.stop()
-
-
-# Use direct API calls with requests instead of the SDK
-def ask_claude(prompt, system_prompt=None, model="claude-3-haiku-20240307"):
-    """Send a prompt to Claude API directly using requests"""
-    try:
-        headers = {
-            "x-api-key": api_key,
-            "content-type": "application/json",
-            "anthropic-version": "2023-06-01"
-        }
-
-        payload = {
-            "model": model,
-            "max_tokens": 4000,
-            "messages": [{"role": "user", "content": prompt}]
-        }
-
-        if system_prompt:
-            payload["system"] = system_prompt
-
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers=headers,
-            json=payload
-        )
+        api_key = st.secrets.get("ANTHROPIC_API_KEY", "")
+    if not api_key:
+        api_key = st.text_input("Enter your Anthropic API Key:", type="password")
+        if not api_key:
+            st.warning("Please enter a valid API key to use the application.")
+            st.stop()
+
+
+    # Cached responses older than this are regenerated, but still served while the API is degraded
+    CACHE_TTL = float(os.getenv("HR360_CACHE_TTL", str(7 * 24 * 3600)))
+    REFRESH_ATTEMPTS = 5
+    # Rolling hourly token budget shared by all speculative prefetches
+    PREFETCH_BUDGET = int(os.getenv("HR360_PREFETCH_BUDGET", "200000"))
+
+    prefetch_enabled = st.sidebar.toggle(
+        "⚡ Prefetch likely next steps", key="prefetch_enabled",
+        help="Generate the other levels and tabs for a role in the background, so they open instantly.")
+
+
+    # Shared across sessions so identical prompts are only generated once; the
+    # phrasing chosen for each role is shared with the other replicas too
+    @st.cache_resource
+    def get_role_index():
+        return RoleIndex(phrasings=get_response_cache())
+
+
+    @st.cache_resource
+    def get_response_cache():
+        # Shared with other replicas when HR360_CACHE_URL points at SQLite or Redis
+        return backend_from_url()
+
+
+    @st.cache_resource
+    def get_prefetcher():
+        return Prefetcher(get_response_cache(), token_budget=PREFETCH_BUDGET, max_age=CACHE_TTL)
+
+
+    @st.cache_resource
+    def get_refreshes_in_flight():
+        return set(), threading.Lock()
+
+
+    @st.cache_resource
+    def get_skills_kb():
+        return SkillsKnowledgeBase(os.getenv("HR360_SKILLS_KB", "data/skills_kb.json"))
+
+
+    @st.cache_resource
+    def get_artifact_store():
+        return ArtifactStore(os.getenv("HR360_ARTIFACTS", "data/artifacts.db"))
+
+
+    @st.cache_resource
+    def get_tenant_scheduler():
+        # Every API key is a tenant with its own limits; see tenants.py for the HR360_* settings.
+        # Daily usage is counted in the response cache, so quotas hold across replicas
+        return tenants.scheduler_from_env(usage_store=get_response_cache())
+
+
+    claude_api.set_scheduler(get_tenant_scheduler())
+
+
+    def save_artifact(tab, role, level, title, content, requests, model=claude_api.DEFAULT_MODEL, metadata=None):
+        """Add a generated artifact to the history; ``requests`` are the (prompt, system_prompt) pairs behind it"""
+        usage = {"input_tokens": 0, "output_tokens": 0}
+        cache = get_response_cache()
+        for prompt, system_prompt in requests:
+            # Token usage is stored with each generation in the response cache
+            entry = cache.get(generation_key(model, system_prompt, prompt)) or {}
+            for name in usage:
+                usage[name] += entry.get("usage", {}).get(name, 0)
+        with profiler.section("artifact_save"):
+            get_artifact_store().save(tab, role, title, content, level=level, model=model, usage=usage,
+                                      metadata=metadata, tenant=tenants.tenant_id(api_key))
+
+
+    def record_skills(role, skills, prompt, system_prompt=None, model=claude_api.DEFAULT_MODEL):
+        """Add generated skills to the knowledge base, once per generation (cache hits are not counted again)"""
+        key = generation_key(model, system_prompt, prompt)
+        entry = get_response_cache().get(key)
+        if entry is not None:
+            get_skills_kb().record(role, skills, generation=f"{key}:{entry['stored_at']}")
+
+
+    def canonical_role(role):
+        """Map a free-text role onto the stored phrasing of its canonical key"""
+        return get_role_index().canonicalize(role) if role else role
+
 
-        if response.status_code != 200:
-            st.error(f"API Error: {response.status_code} - {response.text}")
+    # Use direct API calls with requests instead of the SDK
+    def ask_claude(prompt, system_prompt=None, model=claude_api.DEFAULT_MODEL):
+        """Send a prompt to Claude API directly using requests"""
+        cache = get_response_cache()
+        get_prefetcher().record_use(generation_key(model, system_prompt, prompt))
+        try:
+            with foreground(), profiler.section("ask_claude"):
+                return cached_generation(cache, prompt, system_prompt, model)
+        except claude_api.ClaudeAPIError as e:
+            return serve_stale(cache, prompt, system_prompt, model, e)
+        except Exception as e:
+            st.error(f"Error calling Claude API: {str(e)}")
             return None
 
-        response_data = response.json()
-        return response_data["content"][0]["text"]
-    except Exception as e:
-        st.error(f"Error calling Claude API: {str(e)}")
+
+    def stream_claude(prompt, system_prompt=None, model=claude_api.DEFAULT_MODEL):
+        """Like ``ask_claude``, but yield the response text in chunks as it is generated"""
+        cache = get_response_cache()
+        key = generation_key(model, system_prompt, prompt)
+        get_prefetcher().record_use(key)
+        payload = claude_api.build_payload(prompt, system_prompt, model)
+
+        def stream():
+            message = yield from claude_api.stream_message(payload, api_key)
+            return {"usage": message.get("usage") or {}}
+
+        streamed = False
+        try:
+            with foreground():
+                for text in cache.stream_or_generate(key, stream, max_age=CACHE_TTL):
+                    streamed = True
+                    yield text
+        except claude_api.ClaudeAPIError as e:
+            if streamed:
+                st.error(f"The response was interrupted: {str(e)}")
+                return
+            text = serve_stale(cache, prompt, system_prompt, model, e)
+            if text:
+                yield text
+        except Exception as e:
+            st.error(f"Error calling Claude API: {str(e)}")
+
+
+    def stream_json(parser, prompt, system_prompt=None):
+        """Yield ``(path, value)`` events of a JSON response as each member completes
+
+        Shows an error with the raw response if the stream is malformed or cut
+        short; the events yielded before that are valid and stay on screen.
+        ``parser.done`` tells whether the whole value arrived.
+        """
+        chunks = stream_claude(prompt, system_prompt)
+        try:
+            while True:
+                with profiler.section("stream_claude"):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                with profiler.section("json_parse"):
+                    events = parser.feed(chunk)
+                yield from events
+            if parser.text:
+                parser.close()
+        except JSONStreamError as e:
+            st.error(f"Could not parse JSON response ({str(e)}). Raw response: {parser.text}")
+        finally:
+            # Stop the API stream straight away when parsing gives up
+            chunks.close()
+
+
+    def service_degraded(error):
+        """Whether an API error is the service's fault, so a stale result beats none"""
+        return error.service_failure or isinstance(error, claude_api.CircuitOpenError)
+
+
+    def serve_stale(cache, prompt, system_prompt, model, error):
+        """Stale-while-revalidate: serve the last stored result and refresh it in the background
+
+        Only while the service is degraded; errors of the request itself (an
+        invalid key, a used-up quota) are shown as they are.
+        """
+        entry = cache.get(generation_key(model, system_prompt, prompt)) if service_degraded(error) else None
+        if entry is not None:
+            refresh_in_background(cache, prompt, system_prompt, model)
+            stored_at = datetime.fromtimestamp(entry["stored_at"]).strftime("%Y-%m-%d %H:%M")
+            st.warning(f"⚠️ The AI service is degraded, so this is a stale result stored on {stored_at}. "
+                       "A refresh is running in the background.")
+            return entry["text"]
+        st.error(str(error))
         return None
 
 
-# Function to create radar chart
-def create_radar_chart(skills, values, role, level, size=7):
-    import matplotlib.pyplot as plt
-    import numpy as np
-
-    plt.style.use('seaborn-v0_8-whitegrid')
-
-    num_vars = len(skills)
-    angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
-
-    # Loop around to close the radar
-    values_plot = values + values[:1]
-    angles += angles[:1]
-
-    # Create figure with dynamic size
-    fig, ax = plt.subplots(figsize=(size, size), subplot_kw=dict(polar=True), facecolor='white')
-
-    ax.plot(angles, values_plot, 'o-', linewidth=2.5, color='#2563EB')
-    ax.fill(angles, values_plot, alpha=0.25, color='#60A5FA')
-    ax.set_xticks(angles[:-1])
-    ax.set_xticklabels(skills, size=9, color='#1F2937')
-
-    ax.set_yticks([2, 4, 6, 8, 10])
-    ax.set_yticklabels(['2', '4', '6', '8', '10'], color='#4B5563')
-    ax.set_ylim(0, 10)
-    ax.grid(True, color='#E5E7EB')
-    ax.spines['polar'].set_visible(False)
-
-    plt.title(f"Skill Profile: {role} - {level} Level", size=18, y=1.1, color='#1E3A8A', fontweight='bold')
-
-    for i, value in enumerate(values):
-        angle = angles[i]
-        align_offset = 0.8 if np.pi / 2 <= angle <= 3 * np.pi / 2 else 1.2
-        ax.annotate(
-            f"{value}",
-            xy=(angle, value),
-            xytext=(angle, value + align_offset),
-            ha='center',
-            va='center',
-            fontsize=9,
-            fontweight='bold',
-            color='#1E3A8A',
-            bbox=dict(boxstyle='round,pad=0.3', fc='white', ec='#3B82F6', alpha=0.7)
+    def cached_generation(cache, prompt, system_prompt=None, model=claude_api.DEFAULT_MODEL):
+        """Return the fresh cached response for a prompt or generate it; raises ClaudeAPIError
+
+        Takes the cache explicitly so it can be called from worker threads.
+        Expired entries are kept so they can be served stale by ``ask_claude``.
+        Concurrent requests for the same prompt, in any replica, generate it once.
+        """
+        entry = cache.get_or_generate(
+            generation_key(model, system_prompt, prompt),
+            lambda: claude_api.generate(prompt, system_prompt, model, api_key=api_key),
+            max_age=CACHE_TTL
         )
+        return entry["text"]
 
-    fig.tight_layout()
-    return fig
 
+    def schedule_prefetch(prompt_role, level, current_tab=None):
+        """Speculatively generate the other levels and tabs of a role, if the user opted in"""
+        if prefetch_enabled:
+            get_prefetcher().schedule_role(prompt_role, level, api_key, current_tab)
 
-# Function to save plot as image and create download link
-def get_image_download_link(fig, filename="plot.png", text="Download Chart"):
-    buf = BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight', dpi=300)
-    buf.seek(0)
-    b64 = base64.b64encode(buf.read()).decode()
-    href = f'<a href="data:image/png;base64,{b64}" download="{filename}">{text}</a>'
-    return href
 
+    def refresh_in_background(cache, prompt, system_prompt=None, model=claude_api.DEFAULT_MODEL):
+        """Regenerate a stale entry once the circuit breaker lets a probe through"""
+        in_flight, lock = get_refreshes_in_flight()
+        cache_key = generation_key(model, system_prompt, prompt)
+        with lock:
+            if cache_key in in_flight:
+                return
+            in_flight.add(cache_key)
 
-# Load and encode the SVG file
-with open("img/Ferris-logo-full.svg", "rb") as f:
-    svg_data = f.read()
-    b64_svg = base64.b64encode(svg_data).decode()
+        def refresh(key):
+            try:
+                with tenants.background():
+                    for attempt in range(REFRESH_ATTEMPTS):
+                        try:
+                            generated = claude_api.generate(prompt, system_prompt, model, api_key=key)
+                        except claude_api.ClaudeAPIError as e:
+                            if not service_degraded(e):
+                                # Retrying cannot fix the request itself
+                                return
+                            time.sleep(max(claude_api.breaker_for(key).retry_after(), 2 ** attempt))
+                            continue
+                        cache.set(cache_key, {**generated, "stored_at": time.time()})
+                        return
+            finally:
+                with lock:
+                    in_flight.discard(cache_key)
+
+        threading.Thread(target=refresh, args=(api_key,), daemon=True, name="hr360-refresh").start()
+
+
+    def parse_json_response(response, pattern):
+        with profiler.section("json_parse"):
+            return claude_api.parse_json_response(response, pattern)
+
+
+    # Function to create radar chart
+    def create_radar_chart(skills, values, role, level, size=7, overlays=None, label=None, title=None):
+        """Radar chart of ``values``; ``overlays`` is a list of (label, values) drawn on the same axes"""
+        with profiler.section("radar_chart"):
+            return _radar_chart(skills, values, role, level, size, overlays, label, title)
+
+
+    def _radar_chart(skills, values, role, level, size, overlays, label, title):
+        import matplotlib.pyplot as plt
+        import numpy as np
+
+        plt.style.use('seaborn-v0_8-whitegrid')
+
+        num_vars = len(skills)
+        angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
+
+        # Loop around to close the radar
+        values_plot = values + values[:1]
+        angles += angles[:1]
+
+        # Create figure with dynamic size
+        fig, ax = plt.subplots(figsize=(size, size), subplot_kw=dict(polar=True), facecolor='white')
+
+        ax.plot(angles, values_plot, 'o-', linewidth=2.5, color='#2563EB', label=label or level)
+        ax.fill(angles, values_plot, alpha=0.25, color='#60A5FA')
+
+        # Overlaid series share the same skill axes and angles
+        overlay_colors = ['#10B981', '#F59E0B', '#EF4444', '#8B5CF6', '#EC4899', '#6B7280']
+        for (overlay_label, overlay_values), color in zip(overlays or [], overlay_colors):
+            overlay_plot = list(overlay_values) + list(overlay_values[:1])
+            ax.plot(angles, overlay_plot, 'o-', linewidth=1.8, color=color, label=overlay_label)
+            ax.fill(angles, overlay_plot, alpha=0.08, color=color)
+        ax.set_xticks(angles[:-1])
+        ax.set_xticklabels(skills, size=9, color='#1F2937')
+
+        ax.set_yticks([2, 4, 6, 8, 10])
+        ax.set_yticklabels(['2', '4', '6', '8', '10'], color='#4B5563')
+        ax.set_ylim(0, 10)
+        ax.grid(True, color='#E5E7EB')
+        ax.spines['polar'].set_visible(False)
+
+        plt.title(title or f"Skill Profile: {role} - {level} Level", size=18, y=1.1, color='#1E3A8A', fontweight='bold')
+
+        for i, value in enumerate(values):
+            angle = angles[i]
+            align_offset = 0.8 if np.pi / 2 <= angle <= 3 * np.pi / 2 else 1.2
+            ax.annotate(
+                f"{value}",
+                xy=(angle, value),
+                xytext=(angle, value + align_offset),
+                ha='center',
+                va='center',
+                fontsize=9,
+                fontweight='bold',
+                color='#1E3A8A',
+                bbox=dict(boxstyle='round,pad=0.3', fc='white', ec='#3B82F6', alpha=0.7)
+            )
+
+        if overlays:
+            ax.legend(loc='upper right', bbox_to_anchor=(1.3, 1.1), fontsize=9)
+
+        fig.tight_layout()
+        return fig
+
+
+    # Function to save plot as image and create download link
+    def get_image_download_link(fig, filename="plot.png", text="Download Chart"):
+        with profiler.section("png_encode"):
+            buf = BytesIO()
+            fig.savefig(buf, format='png', bbox_inches='tight', dpi=300)
+            buf.seek(0)
+            b64 = base64.b64encode(buf.read()).decode()
+        href = f'<a href="data:image/png;base64,{b64}" download="{filename}">{text}</a>'
+        return href
+
+
+    # Load and encode the SVG file once per process
+    @st.cache_resource
+    def get_logo_b64():
+        with open("img/Ferris-logo-full.svg", "rb") as f:
+            return base64.b64encode(f.read()).decode()
+
+
+    b64_svg = get_logo_b64()
 
-# HTML layout with base64-encoded logo, header text, and tagline
-st.markdown(f"""
+    # HTML layout with base64-encoded logo, header text, and tagline
+    st.markdown(f"""
     <div style="display: flex; align-items: center; gap: 25px; margin-bottom: 10px;">
         <img src="data:image/svg+xml;base64,{b64_svg}" alt="Logo" style="height: 150px; width: 150px;">
         <div>
@@ -325,10 +565,10 @@ st.markdown(f"""
     </div>
 """, unsafe_allow_html=True)
 
-# Create a row with info cards
-col1, col2, col3 = st.columns(3)
-with col1:
-    st.markdown("""
+    # Create a row with info cards
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown("""
     <div style="padding: 1rem; background-color: #EFF6FF; border-radius: 0.5rem; height: 100%; border-left: 5px solid #3B82F6;">
         <h3 style="margin-top: 0; color: #1E40AF; font-size: 1.2rem;">Workforce Planning</h3>
         <p style="color: #4B5563;">• Identify needs roles & skills based on company strategy.</p>
@@ -336,8 +576,8 @@ with col1:
     </div>
     """, unsafe_allow_html=True)
 
-with col2:
-    st.markdown("""
+    with col2:
+        st.markdown("""
     <div style="padding: 1rem; background-color: #ECFDF5; border-radius: 0.5rem; height: 100%; border-left: 5px solid #10B981;">
         <h3 style="margin-top: 0; color: #065F46; font-size: 1.2rem;">Recruiting & Onboarding</h3>
         <p style="color: #4B5563;">• Identify needed skills per vacancy</p>
@@ -345,8 +585,8 @@ with col2:
     </div>
     """, unsafe_allow_html=True)
 
-with col3:
-    st.markdown("""
+    with col3:
+        st.markdown("""
     <div style="padding: 1rem; background-color: #FEF3C7; border-radius: 0.5rem; height: 100%; border-left: 5px solid #F59E0B;">
         <h3 style="margin-top: 0; color: #B45309; font-size: 1.2rem;"> Performance Management & Compensation</h3>
         <p style="color: #4B5563;">• Skill-based performance evaluation</p>
@@ -354,141 +594,220 @@ with col3:
     </div>
     """, unsafe_allow_html=True)
 
-st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown("<br>", unsafe_allow_html=True)
 
-# Tabs for better organization
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "🔍 Skill Identifier",
-    "📊 Skill Profiler",
-    "📝 Job Poster",
-    "❓ Interview Questions",
-    "📈 Development Plan"
-])
 
-# Case 1: Skill Identifier
-with tab1:
-    st.markdown("<h2 class='use-case-header'>Skill Identifier</h2>", unsafe_allow_html=True)
-    st.markdown("""
+    # Pages only keep the state of widgets they render, so the role and level
+    # are also kept under keys of their own and carried from page to page
+    SHARED_INPUTS = {"role": "Electrical Engineer - Motor Control", "level": "Junior"}
+
+
+    def share_input(name, widget_key):
+        st.session_state[f"shared_{name}"] = st.session_state[widget_key]
+
+
+    def shared_input(widget, name, label, key, *args, **kwargs):
+        """``widget`` for the shared input ``name``, seeded from the value last entered on any page"""
+        if key not in st.session_state:
+            st.session_state[key] = st.session_state.get(f"shared_{name}", SHARED_INPUTS[name])
+        return widget(label, *args, key=key, on_change=share_input, args=(name, key), **kwargs)
+
+
+    # Case 1: Skill Identifier
+    def skill_identifier_page():
+        st.markdown("<h2 class='use-case-header'>Skill Identifier</h2>", unsafe_allow_html=True)
+        st.markdown("""
     <div style="padding: 1rem; background-color: #F3F4F6; border-radius: 0.5rem; margin-bottom: 1.5rem;">
         <p>Enter a job role or description to identify the most important technical and soft skills required for this position.</p>
     </div>
     """, unsafe_allow_html=True)
 
-    job_role = st.text_input("Job Role or Description:", value="Electrical Engineer - Motor Control")
+        job_role = shared_input(st.text_input, "role", "Job Role or Description:", "role_skill_identifier")
+
+        if st.button("Identify Skills", key="identify_skills"):
+            if job_role:
+                with st.spinner("Analyzing skills with AI..."):
+                    prompt_role = canonical_role(job_role)
+
+                    # Known roles are answered from the skills knowledge base without an API call
+                    known_skills = get_skills_kb().query(prompt_role)
+                    from_knowledge_base = known_skills is not None
+
+                    parser = JSONStreamParser()
+                    if from_knowledge_base:
+                        skill_events = (((i,), skill) for i, skill in enumerate(known_skills))
+                    else:
+                        # Prepare prompt for Claude; each skill is shown as soon as it has streamed in
+                        prompt, system_prompt = prompts.skill_identifier_prompt(prompt_role)
+                        skill_events = stream_json(parser, prompt, system_prompt)
+
+                    skills = []
+                    for path, skill in skill_events:
+                        if len(path) != 1:
+                            continue
+                        if not skills:
+                            # Display skills in a professional layout
+                            st.markdown("<div class='output-container'>", unsafe_allow_html=True)
+                            st.subheader(f"Skills for {job_role}")
+                            if from_knowledge_base:
+                                st.caption("Answered from the skills knowledge base")
 
-    if st.button("Identify Skills", key="identify_skills"):
-        if job_role:
-            with st.spinner("Analyzing skills with AI..."):
-                # Prepare prompt for Claude
-                prompt = f"""
-                You are a skilled HR professional and job analyst. Based on the job role or description below, 
-                identify and list the most important technical and soft skills required for this position.
+                            # Create two columns for skills, filled alternately as they arrive
+                            left_col, right_col = st.columns(2)
 
-                Job Role/Description: {job_role}
+                        with left_col if len(skills) % 2 == 0 else right_col:
+                            st.markdown(f"""
+                        <div class="skill-item">
+                            <span style="font-weight: 500;">• {skill}</span>
+                        </div>
+                        """, unsafe_allow_html=True)
+                        skills.append(skill)
 
-                Please format your response as a JSON array of strings, with each string being a specific skill.
-                Example format: ["Skill 1", "Skill 2", "Skill 3"]
+                    if skills:
+                        st.markdown("</div>", unsafe_allow_html=True)
 
-                Provide between 8-12 specific, relevant skills for this role.
-                """
+                        if parser.done and valid_skills(parser.value):
+                            record_skills(prompt_role, parser.value, prompt, system_prompt)
+                            save_artifact("Skill Identifier", job_role, None, f"Skills for {job_role}",
+                                          "\n".join(f"- {skill}" for skill in parser.value), [(prompt, system_prompt)])
 
-                system_prompt = "You are an HR skills analyst that identifies required skills for job roles. Always return your answer in valid JSON format as an array of strings."
+                        # The profiler opens on the first level
+                        schedule_prefetch(prompt_role, prompts.LEVELS[0])
+            else:
+                st.warning("Please enter a job role or description.")
 
-                response = ask_claude(prompt, system_prompt)
+    # Case 2: Skill Profiler
+    def skill_profiler_page():
+        st.markdown("<h2 class='use-case-header'>Skill Profiler</h2>", unsafe_allow_html=True)
+        st.markdown("""
+    <div style="padding: 1rem; background-color: #F3F4F6; border-radius: 0.5rem; margin-bottom: 1.5rem;">
+        <p>Generate a skills radar chart and skill level descriptions for a specific role and experience level.</p>
+    </div>
+    """, unsafe_allow_html=True)
 
-                if response:
-                    try:
-                        # Extract JSON from response if needed
-                        json_match = re.search(r'\[.*\]', response.replace('\n', ' '), re.DOTALL)
-                        if json_match:
-                            skills_json = json_match.group(0)
-                            skills = json.loads(skills_json)
-                        else:
-                            skills = json.loads(response)
+        col1, col2 = st.columns(2)
+        with col1:
+            role = shared_input(st.text_input, "role", "Role:", "role_skill_profiler")
+        with col2:
+            level = shared_input(st.selectbox, "level", "Level:", "level_skill_profiler", prompts.LEVELS)
 
-                        # Display skills in a professional layout
-                        st.markdown("<div class='output-container'>", unsafe_allow_html=True)
-                        st.subheader(f"Skills for {job_role}")
+        compare_levels = st.checkbox("Compare all levels (Junior / Mid / Senior) on one chart", key="compare_levels")
 
-                        # Create two columns for skills
-                        left_col, right_col = st.columns(2)
-                        half = len(skills) // 2 + len(skills) % 2
+        if st.button("Generate Skill Profile", key="generate_profile"):
+            if role and compare_levels:
+                with st.spinner("Generating skill profiles for all levels with AI..."):
+                    prompt_role = canonical_role(role)
+                    levels = prompts.LEVELS
 
-                        with left_col:
-                            for skill in skills[:half]:
-                                st.markdown(f"""
-                                <div class="skill-item">
-                                    <span style="font-weight: 500;">• {skill}</span>
-                                </div>
-                                """, unsafe_allow_html=True)
+                    # One shared skill list rated for every level keeps the radar axes aligned
+                    profile_prompt, system_prompt = prompts.multi_level_profile_prompt(prompt_role, levels)
+                    profile_response = ask_claude(profile_prompt, system_prompt)
 
-                        with right_col:
-                            for skill in skills[half:]:
+                    if profile_response:
+                        try:
+                            profile = parse_json_response(profile_response, r'\{.*\}')
+                            skills = profile["skills"]
+                            level_ratings = {lvl: profile["ratings"][lvl] for lvl in levels}
+                            if any(len(ratings) != len(skills) for ratings in level_ratings.values()):
+                                raise ValueError("every level needs one rating per skill")
+                        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                            st.error(f"Error processing skill data: {str(e)}")
+                        else:
+                            if valid_skills(skills):
+                                record_skills(prompt_role, skills, profile_prompt, system_prompt)
+
+                            st.markdown("<div class='output-container'>", unsafe_allow_html=True)
+                            chart_col, data_col = st.columns([1, 1])
+
+                            with chart_col:
+                                fig = create_radar_chart(
+                                    skills, level_ratings[levels[0]], role, levels[0],
+                                    overlays=[(lvl, level_ratings[lvl]) for lvl in levels[1:]],
+                                    title=f"Skill Profile: {role} - Level Comparison"
+                                )
+                                st.pyplot(fig)
+                                st.markdown(get_image_download_link(fig, f"{role}_levels_skills.png", "📥 Download Chart"),
+                                            unsafe_allow_html=True)
+                                plt.close()
+
+                            with data_col:
+                                st.subheader("Skills Profile Data")
+                                header_cells = "".join(f"<th>{lvl}</th>" for lvl in levels)
+                                rows_html = "".join(
+                                    f"<tr><td>{skill}</td>" + "".join(f"<td>{level_ratings[lvl][i]}</td>" for lvl in levels) + "</tr>"
+                                    for i, skill in enumerate(skills)
+                                )
                                 st.markdown(f"""
-                                <div class="skill-item">
-                                    <span style="font-weight: 500;">• {skill}</span>
-                                </div>
-                                """, unsafe_allow_html=True)
+                            <table>
+                                <tr><th>Skill</th>{header_cells}</tr>
+                                {rows_html}
+                            </table>
+                            """, unsafe_allow_html=True)
 
-                        st.markdown("</div>", unsafe_allow_html=True)
-                    except json.JSONDecodeError:
-                        st.error(f"Could not parse JSON response. Raw response: {response}")
-        else:
-            st.warning("Please enter a job role or description.")
-
-# Case 2: Skill Profiler
-with tab2:
-    st.markdown("<h2 class='use-case-header'>Skill Profiler</h2>", unsafe_allow_html=True)
-    st.markdown("""
-    <div style="padding: 1rem; background-color: #F3F4F6; border-radius: 0.5rem; margin-bottom: 1.5rem;">
-        <p>Generate a skills radar chart and skill level descriptions for a specific role and experience level.</p>
-    </div>
-    """, unsafe_allow_html=True)
+                            # All level descriptions in one call
+                            desc_prompt, system_prompt = prompts.multi_level_descriptions_prompt(prompt_role, levels, skills)
+                            desc_response = ask_claude(desc_prompt, system_prompt)
 
-    col1, col2 = st.columns(2)
-    with col1:
-        role = st.text_input("Role:", value="Electrical Engineer - Motor Control", key="role_skill_profiler")
-    with col2:
-        level = st.selectbox("Level:", ["Junior", "Mid", "Senior"], key="level_skill_profiler")
+                            if desc_response:
+                                try:
+                                    descriptions = parse_json_response(desc_response, r'\{.*\}')
+                                except json.JSONDecodeError:
+                                    st.error("Could not parse JSON response for descriptions")
+                                else:
+                                    st.subheader(f"Skill Descriptions by Level for {role}")
+                                    desc_cols = st.columns(2)
+                                    for i, skill in enumerate(skills):
+                                        skill_descriptions = descriptions.get(skill)
+                                        if not isinstance(skill_descriptions, dict):
+                                            skill_descriptions = {}
+                                        level_lines = "".join(
+                                            f"<div style='margin-top: 0.4rem;'><span style='font-weight: 600;'>{lvl} ({level_ratings[lvl][i]}/10):</span> "
+                                            f"{skill_descriptions.get(lvl, 'Description not available')}</div>"
+                                            for lvl in levels
+                                        )
+                                        with desc_cols[i % 2]:
+                                            st.markdown(f"""
+                                        <div style="background-color: white; padding: 1rem; margin-bottom: 1rem; border-radius: 0.5rem; border: 1px solid #E5E7EB; border-left: 4px solid #3B82F6;">
+                                            <div style="font-weight: 600; color: #1E40AF; margin-bottom: 0.5rem; font-size: 1.1rem;">{skill}</div>
+                                            <div style="color: #4B5563;">{level_lines}</div>
+                                        </div>
+                                        """, unsafe_allow_html=True)
 
-    if st.button("Generate Skill Profile", key="generate_profile"):
-        if role:
-            with st.spinner("Generating skill profile with AI..."):
-                skills_prompt = f"""
-                You are an expert in skills assessment for technical roles.
-                For the role of {role} at {level} level, please provide:
+                                    def level_cell(skill, i, lvl):
+                                        skill_descriptions = descriptions.get(skill)
+                                        description = skill_descriptions.get(lvl, "") if isinstance(skill_descriptions, dict) else ""
+                                        return f"{level_ratings[lvl][i]}/10: {description}" if description else f"{level_ratings[lvl][i]}/10"
 
-                1. A list of 8 key skills required for this role
-                2. A rating from 1-10 for each skill based on the expected proficiency level ({level})
+                                    profile_md = ("| Skill | " + " | ".join(levels) + " |\n|" + " --- |" * (len(levels) + 1) + "\n"
+                                                  + "\n".join(f"| {skill} | " + " | ".join(level_cell(skill, i, lvl) for lvl in levels) + " |"
+                                                               for i, skill in enumerate(skills)))
+                                    save_artifact("Skill Profiler", role, None, f"{role} skill profile, all levels compared",
+                                                  profile_md, [(profile_prompt, system_prompt), (desc_prompt, system_prompt)],
+                                                  metadata={"levels": levels})
 
-                Return your answer as a JSON object with this exact structure:
-                {{
-                    "skills": ["skill1", "skill2", ...],
-                    "ratings": [7, 8, ...]
-                }}
+                            st.markdown("</div>", unsafe_allow_html=True)
+            elif role:
+                with st.spinner("Generating skill profile with AI..."):
+                    prompt_role = canonical_role(role)
+                    skills_prompt, system_prompt = prompts.skill_profile_prompt(prompt_role, level)
 
-                Junior should have ratings mostly in the 3-5 range, Mid in the 5-8 range, and Senior in the 8-10 range.
-                """
-                system_prompt = "You are a skills assessment expert. Always return your answer in valid JSON format."
+                    skills_response = ask_claude(skills_prompt, system_prompt)
 
-                skills_response = ask_claude(skills_prompt, system_prompt)
+                    if skills_response:
+                        try:
+                            skills_data = parse_json_response(skills_response, r'\{.*\}')
 
-                if skills_response:
-                    try:
-                        json_match = re.search(r'\{.*\}', skills_response.replace('\n', ' '), re.DOTALL)
-                        if json_match:
-                            skills_json = json_match.group(0)
-                            skills_data = json.loads(skills_json)
-                        else:
-                            skills_data = json.loads(skills_response)
+                            skills = skills_data["skills"]
+                            ratings = skills_data["ratings"]
+                            schedule_prefetch(prompt_role, level, "profile")
 
-                        skills = skills_data["skills"]
-                        ratings = skills_data["ratings"]
+                            if valid_skills(skills):
+                                record_skills(prompt_role, skills, skills_prompt, system_prompt)
 
-                        st.markdown("<div class='output-container'>", unsafe_allow_html=True)
+                            st.markdown("<div class='output-container'>", unsafe_allow_html=True)
 
-                        # Add CSS
-                        st.markdown("""
+                            # Add CSS
+                            st.markdown("""
                         <style>
                             .output-container { margin-top: 1rem; }
 
@@ -519,21 +838,21 @@ with tab2:
                         </style>
                         """, unsafe_allow_html=True)
 
-                        # Layout
-                        chart_col, data_col = st.columns([1, 1])
+                            # Layout
+                            chart_col, data_col = st.columns([1, 1])
 
-                        with chart_col:
-                            fig = create_radar_chart(skills, ratings, role, level)
-                            st.pyplot(fig)
-                            st.markdown(get_image_download_link(fig, f"{role}_{level}_skills.png", "📥 Download Chart"),
-                                        unsafe_allow_html=True)
-                            plt.close()
+                            with chart_col:
+                                fig = create_radar_chart(skills, ratings, role, level)
+                                st.pyplot(fig)
+                                st.markdown(get_image_download_link(fig, f"{role}_{level}_skills.png", "📥 Download Chart"),
+                                            unsafe_allow_html=True)
+                                plt.close()
 
-                        with data_col:
-                            st.subheader("Skills Profile Data")
+                            with data_col:
+                                st.subheader("Skills Profile Data")
 
-                            # Create a clean table with CSS styling directly in the same markdown call
-                            st.markdown(f"""
+                                # Create a clean table with CSS styling directly in the same markdown call
+                                st.markdown(f"""
                             <style>
                                 table {{
                                     width: 100%;
@@ -571,41 +890,26 @@ with tab2:
                             </table>
                             """, unsafe_allow_html=True)
 
-                        # Get skill descriptions
-                        desc_prompt = f"""
-                        For each of these skills for a {level}-level {role}, provide a brief description of what this level of proficiency means.
-                        Skills: {", ".join(skills)}
+                            # Get skill descriptions
+                            desc_prompt, system_prompt = prompts.skill_descriptions_prompt(prompt_role, level, skills)
 
-                        Format your response as a JSON object with skill names as keys and descriptions as values.
-                        Example:
-                        {{
-                            "Skill Name": "Description of what {level} level means for this skill",
-                            ...
-                        }}
-                        """
+                            desc_response = ask_claude(desc_prompt, system_prompt)
 
-                        desc_response = ask_claude(desc_prompt, system_prompt)
-
-                        if desc_response:
-                            try:
-                                # Extract JSON from response if needed
-                                json_match = re.search(r'\{.*\}', desc_response.replace('\n', ' '), re.DOTALL)
-                                if json_match:
-                                    desc_json = json_match.group(0)
-                                    descriptions = json.loads(desc_json)
-                                else:
-                                    descriptions = json.loads(desc_response)
+                            if desc_response:
+                                try:
+                                    # Extract JSON from response if needed
+                                    descriptions = parse_json_response(desc_response, r'\{.*\}')
 
-                                # Display skill descriptions
-                                st.markdown("<div class='output-container'>", unsafe_allow_html=True)
-                                st.subheader(f"Skill Descriptions for {level}-Level {role}")
+                                    # Display skill descriptions
+                                    st.markdown("<div class='output-container'>", unsafe_allow_html=True)
+                                    st.subheader(f"Skill Descriptions for {level}-Level {role}")
 
-                                # Create grid for descriptions
-                                desc_cols = st.columns(2)
-                                for i, skill in enumerate(skills):
-                                    col_idx = i % 2
-                                    with desc_cols[col_idx]:
-                                        st.markdown(f"""
+                                    # Create grid for descriptions
+                                    desc_cols = st.columns(2)
+                                    for i, skill in enumerate(skills):
+                                        col_idx = i % 2
+                                        with desc_cols[col_idx]:
+                                            st.markdown(f"""
                                         <div style="background-color: white; padding: 1rem; margin-bottom: 1rem; border-radius: 0.5rem; border: 1px solid #E5E7EB; border-left: 4px solid #3B82F6;">
                                             <div style="font-weight: 600; color: #1E40AF; margin-bottom: 0.5rem; font-size: 1.1rem;">
                                                 {skill} <span style="float: right; background-color: #EFF6FF; padding: 0 0.5rem; border-radius: 0.25rem; font-size: 0.9rem;">{ratings[i]}/10</span>
@@ -616,303 +920,240 @@ with tab2:
                                         </div>
                                         """, unsafe_allow_html=True)
 
-                                st.markdown("</div>", unsafe_allow_html=True)
-                            except json.JSONDecodeError:
-                                st.error(f"Could not parse JSON response for descriptions")
-                    except (json.JSONDecodeError, KeyError) as e:
-                        st.error(f"Error processing skill data: {str(e)}")
-        else:
-            st.warning("Please enter a role.")
-
-# Case 3: Job Poster
-with tab3:
-    st.markdown("<h2 class='use-case-header'>Job Poster</h2>", unsafe_allow_html=True)
-    st.markdown("""
+                                    st.markdown("</div>", unsafe_allow_html=True)
+
+                                    profile_md = "| Skill | Rating | Description |\n| --- | --- | --- |\n" + "\n".join(
+                                        f"| {skill} | {rating}/10 | {descriptions.get(skill, '')} |"
+                                        for skill, rating in zip(skills, ratings))
+                                    save_artifact("Skill Profiler", role, level, f"{level}-level {role} skill profile",
+                                                  profile_md, [(skills_prompt, system_prompt), (desc_prompt, system_prompt)])
+                                except json.JSONDecodeError:
+                                    st.error(f"Could not parse JSON response for descriptions")
+                        except (json.JSONDecodeError, KeyError) as e:
+                            st.error(f"Error processing skill data: {str(e)}")
+            else:
+                st.warning("Please enter a role.")
+
+    # Case 3: Job Poster
+    def job_poster_page():
+        st.markdown("<h2 class='use-case-header'>Job Poster</h2>", unsafe_allow_html=True)
+        st.markdown("""
     <div style="padding: 1rem; background-color: #F3F4F6; border-radius: 0.5rem; margin-bottom: 1.5rem;">
         <p>Generate a complete job description and get recommended job boards for a specific role and experience level.</p>
     </div>
     """, unsafe_allow_html=True)
 
-    # Create two rows for inputs
-    row1_col1, row1_col2 = st.columns(2)
-    with row1_col1:
-        role = st.text_input("Role:", value="Electrical Engineer - Motor Control", key="role_job_poster")
-    with row1_col2:
-        level = st.selectbox("Level:", ["Junior", "Mid", "Senior"], key="level_job_poster")
-
-    row2_col1, row2_col2 = st.columns(2)
-    with row2_col1:
-        company_name = st.text_input("Company Name (Optional):", "")
-    with row2_col2:
-        location = st.text_input("Location (Optional):", "")
-
-    if st.button("Generate Job Description", key="generate_job"):
-        if role:
-            with st.spinner("Generating job description with AI..."):
-                # Prepare prompt for Claude
-                prompt = f"""
-                Create a professional job description for a {level}-level {role} position
-                {f'at {company_name}' if company_name else ''}{f' in {location}' if location else ''}.
-
-                Include the following sections:
-                1. Position title
-                2. Location and job type
-                3. About the company (generic if no company name provided)
-                4. Responsibilities
-                5. Required skills with proficiency levels
-                6. Qualifications and experience
-                7. Application instructions
-
-                Format the job description in Markdown with appropriate headers and bullet points.
-                Make it professional but engaging.
-                """
-
-                job_desc_response = ask_claude(prompt)
-
-                if job_desc_response:
-                    # Display job description
-                    st.markdown("<div class='output-container'>", unsafe_allow_html=True)
-                    st.markdown(job_desc_response)
-
-                    # Add download link for job description
-                    job_desc_bytes = job_desc_response.encode()
-                    b64 = base64.b64encode(job_desc_bytes).decode()
-                    filename = f"{role.replace(' ', '_')}_{level}_JobDescription.md"
-                    st.markdown(
-                        f'<a href="data:file/txt;base64,{b64}" download="{filename}">📥 Download Job Description</a>',
-                        unsafe_allow_html=True)
-                    st.markdown("</div>", unsafe_allow_html=True)
-
-                    # Get job board recommendations
-                    boards_prompt = f"""
-                    Recommend 5 specific job boards that would be most effective for posting a job listing for a {level}-level {role} position.
-
-                    For each job board, explain why it's particularly suitable for this role.
-
-                    Format your response as a JSON array of objects with "name" and "why" properties:
-                    [
-                      {{"name": "Job Board Name", "why": "Reason this board is good for this role"}},
-                      ...
-                    ]
-                    """
-
-                    system_prompt = "You are an HR recruitment expert. Always return your answer in valid JSON format."
-
-                    boards_response = ask_claude(boards_prompt, system_prompt)
-
-                    if boards_response:
-                        try:
-                            # Extract JSON from response if needed
-                            json_match = re.search(r'\[.*\]', boards_response.replace('\n', ' '), re.DOTALL)
-                            if json_match:
-                                boards_json = json_match.group(0)
-                                job_boards = json.loads(boards_json)
-                            else:
-                                job_boards = json.loads(boards_response)
-
-                            # Display job boards in a professional card layout
-                            st.markdown("<div class='output-container'>", unsafe_allow_html=True)
-                            st.subheader("Recommended Job Boards")
+        # Create two rows for inputs
+        row1_col1, row1_col2 = st.columns(2)
+        with row1_col1:
+            role = shared_input(st.text_input, "role", "Role:", "role_job_poster")
+        with row1_col2:
+            level = shared_input(st.selectbox, "level", "Level:", "level_job_poster", prompts.LEVELS)
 
-                            # Create job board cards
-                            for i, board in enumerate(job_boards):
-                                st.markdown(f"""
-                                <div style="background-color: white; padding: 1rem; margin-bottom: 1rem; border-radius: 0.5rem; border: 1px solid #E5E7EB;">
-                                    <div style="font-weight: 600; color: #1E40AF; margin-bottom: 0.5rem; font-size: 1.1rem;">
-                                        {i + 1}. {board['name']}
-                                    </div>
-                                    <div style="color: #4B5563;">
-                                        {board['why']}
-                                    </div>
-                                </div>
-                                """, unsafe_allow_html=True)
+        row2_col1, row2_col2 = st.columns(2)
+        with row2_col1:
+            company_name = st.text_input("Company Name (Optional):", "")
+        with row2_col2:
+            location = st.text_input("Location (Optional):", "")
+
+        if st.button("Generate Job Description", key="generate_job"):
+            if role:
+                with st.spinner("Generating job description with AI..."):
+                    # Prepare prompt for Claude
+                    prompt_role = canonical_role(role)
+                    prompt, _ = prompts.job_description_prompt(prompt_role, level, company_name, location)
+
+                    job_desc_response = ask_claude(prompt)
+
+                    if job_desc_response:
+                        schedule_prefetch(prompt_role, level, "job_poster")
+                        save_artifact("Job Poster", role, level, f"{level}-level {role} job description",
+                                      job_desc_response, [(prompt, None)],
+                                      metadata={"company_name": company_name, "location": location})
 
+                        # Display job description
+                        st.markdown("<div class='output-container'>", unsafe_allow_html=True)
+                        st.markdown(job_desc_response)
+
+                        # Add download link for job description
+                        job_desc_bytes = job_desc_response.encode()
+                        b64 = base64.b64encode(job_desc_bytes).decode()
+                        filename = f"{role.replace(' ', '_')}_{level}_JobDescription.md"
+                        st.markdown(
+                            f'<a href="data:file/txt;base64,{b64}" download="{filename}">📥 Download Job Description</a>',
+                            unsafe_allow_html=True)
+                        st.markdown("</div>", unsafe_allow_html=True)
+
+                        # Get job board recommendations
+                        boards_prompt, system_prompt = prompts.job_boards_prompt(prompt_role, level)
+
+                        # Display job boards in a professional card layout, one card as each arrives
+                        shown_boards = 0
+                        for path, board in stream_json(JSONStreamParser(), boards_prompt, system_prompt):
+                            if len(path) != 1 or not isinstance(board, dict):
+                                continue
+                            if not shown_boards:
+                                st.markdown("<div class='output-container'>", unsafe_allow_html=True)
+                                st.subheader("Recommended Job Boards")
+
+                            shown_boards += 1
+                            st.markdown(f"""
+                        <div style="background-color: white; padding: 1rem; margin-bottom: 1rem; border-radius: 0.5rem; border: 1px solid #E5E7EB;">
+                            <div style="font-weight: 600; color: #1E40AF; margin-bottom: 0.5rem; font-size: 1.1rem;">
+                                {shown_boards}. {board.get('name', '')}
+                            </div>
+                            <div style="color: #4B5563;">
+                                {board.get('why', '')}
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+
+                        if shown_boards:
                             st.markdown("</div>", unsafe_allow_html=True)
-                        except json.JSONDecodeError:
-                            st.error("Could not parse job board recommendations")
-        else:
-            st.warning("Please enter a role.")
-
-# Case 4: Interview Questions
-with tab4:
-    st.markdown("<h2 class='use-case-header'>Interview Questions Generator</h2>", unsafe_allow_html=True)
-    st.markdown("""
+            else:
+                st.warning("Please enter a role.")
+
+    # Case 4: Interview Questions
+    def interview_questions_page():
+        st.markdown("<h2 class='use-case-header'>Interview Questions Generator</h2>", unsafe_allow_html=True)
+        st.markdown("""
     <div style="padding: 1rem; background-color: #F3F4F6; border-radius: 0.5rem; margin-bottom: 1.5rem;">
         <p>Generate targeted interview questions based on role, level, and question types.</p>
     </div>
     """, unsafe_allow_html=True)
 
-    col1, col2 = st.columns(2)
-    with col1:
-        role = st.text_input("Role:", value="Electrical Engineer - Motor Control", key="role_interview")
-    with col2:
+        col1, col2 = st.columns(2)
+        with col1:
+            role = shared_input(st.text_input, "role", "Role:", "role_interview")
         with col2:
-            level = st.selectbox("Level:", ["Junior", "Mid", "Senior"], key="level_interview")
-
-        # Question types with a modern multi-select
-        question_type = st.multiselect(
-            "Question Types:",
-            ["Technical", "Behavioral", "Problem-solving", "Team Collaboration"],
-            default=["Technical", "Problem-solving"],
-            key="question_types"
-        )
-
-        if st.button("Generate Interview Questions", key="generate_questions"):
-            if role:
-                with st.spinner("Generating interview questions with AI..."):
-                    # Get skills first
-                    skills_prompt = f"""
-                        List the 5 most important skills for a {level}-level {role}.
-                        Return only a JSON array of strings.
-                        Example: ["Skill 1", "Skill 2", "Skill 3", "Skill 4", "Skill 5"]
-                        """
-
-                    system_prompt = "You are a technical recruiter creating interview questions. Return only valid JSON."
+            with col2:
+                level = shared_input(st.selectbox, "level", "Level:", "level_interview", prompts.LEVELS)
+
+            # Question types with a modern multi-select
+            question_type = st.multiselect(
+                "Question Types:",
+                prompts.QUESTION_TYPES,
+                default=prompts.DEFAULT_QUESTION_TYPES,
+                key="question_types"
+            )
+
+            if st.button("Generate Interview Questions", key="generate_questions"):
+                if role:
+                    with st.spinner("Generating interview questions with AI..."):
+                        # Get skills first
+                        prompt_role = canonical_role(role)
+                        skills_prompt, system_prompt = prompts.interview_skills_prompt(prompt_role, level)
+
+                        skills_response = ask_claude(skills_prompt, system_prompt)
+
+                        if skills_response:
+                            try:
+                                # Extract JSON from response if needed
+                                skills = parse_json_response(skills_response, r'\[.*\]')
 
-                    skills_response = ask_claude(skills_prompt, system_prompt)
+                                # Generate questions based on skills and question types
+                                questions_prompt, system_prompt = prompts.interview_questions_prompt(
+                                    prompt_role, level, skills, question_type)
 
-                    if skills_response:
-                        try:
-                            # Extract JSON from response if needed
-                            json_match = re.search(r'\[.*\]', skills_response.replace('\n', ' '), re.DOTALL)
-                            if json_match:
-                                skills_json = json_match.group(0)
-                                skills = json.loads(skills_json)
-                            else:
-                                skills = json.loads(skills_response)
-
-                            # Generate questions based on skills and question types
-                            questions_prompt = f"""
-                                Create interview questions for a {level}-level {role} position.
-
-                                Key skills for this role: {", ".join(skills)}
-                                Question types needed: {", ".join(question_type)}
-
-                                Generate 2-3 questions for each skill, focusing on the selected question types.
-                                Also include 2-3 general questions that cover the selected question types.
-
-                                Format your response as a JSON object with this structure:
-                                {{
-                                  "skills": {{
-                                    "Skill Name 1": ["Question 1", "Question 2", ...],
-                                    "Skill Name 2": ["Question 1", "Question 2", ...],
-                                    ...
-                                  }},
-                                  "general": ["General question 1", "General question 2", ...]
-                                }}
+                                def show_question_block(title, questions, border_color, title_color):
+                                    st.markdown(f"""
+                                    <div style="background-color: white; padding: 1rem; margin-bottom: 1rem; border-radius: 0.5rem; border: 1px solid #E5E7EB; border-left: 4px solid {border_color};">
+                                        <div style="font-weight: 600; color: {title_color}; margin-bottom: 0.5rem; font-size: 1.1rem;">
+                                            {title}
+                                        </div>
+                                        <div>
+                                    """, unsafe_allow_html=True)
 
-                                Questions should be appropriate for the {level} experience level.
-                                """
+                                    for i, question in enumerate(questions, 1):
+                                        st.markdown(f"""
+                                        <div style="margin-bottom: 0.5rem; padding: 0.5rem; background-color: #F9FAFB; border-radius: 0.25rem;">
+                                            <span style="font-weight: 500; color: #4B5563;">Q{i}:</span> {question}
+                                        </div>
+                                        """, unsafe_allow_html=True)
 
-                            questions_response = ask_claude(questions_prompt, system_prompt)
+                                    st.markdown("</div></div>", unsafe_allow_html=True)
 
-                            if questions_response:
-                                try:
-                                    # Extract JSON from response if needed
-                                    json_match = re.search(r'\{.*\}', questions_response.replace('\n', ' '), re.DOTALL)
-                                    if json_match:
-                                        questions_json = json_match.group(0)
-                                        questions_data = json.loads(questions_json)
-                                    else:
-                                        questions_data = json.loads(questions_response)
+                                # Display questions in an elegant UI, each skill's block as soon as it has streamed in
+                                questions_data = {"skills": {}, "general": []}
+                                question_tabs = None
+                                parser = JSONStreamParser()
+                                for path, questions in stream_json(parser, questions_prompt, system_prompt):
+                                    is_skill = len(path) == 2 and path[0] == "skills"
+                                    if not (is_skill or path == ("general",)) or not isinstance(questions, list):
+                                        continue
 
-                                    # Display questions in an elegant UI
-                                    st.markdown("<div class='output-container'>", unsafe_allow_html=True)
-                                    st.markdown(f"""
+                                    if question_tabs is None:
+                                        schedule_prefetch(prompt_role, level, "interview_questions")
+                                        st.markdown("<div class='output-container'>", unsafe_allow_html=True)
+                                        st.markdown(f"""
                                         <h3 style="color: #1E40AF; margin-bottom: 1.5rem; font-weight: 500;">
                                             Interview Questions for {level}-Level {role}
                                         </h3>
                                         """, unsafe_allow_html=True)
 
-                                    # Create question tabs for better organization
-                                    question_tabs = st.tabs(["Skills-Based Questions", "General Questions"])
-
-                                    with question_tabs[0]:
-                                        # Skill-specific questions
-                                        if "skills" in questions_data:
-                                            for skill, questions in questions_data["skills"].items():
-                                                st.markdown(f"""
-                                                    <div style="background-color: white; padding: 1rem; margin-bottom: 1rem; border-radius: 0.5rem; border: 1px solid #E5E7EB; border-left: 4px solid #3B82F6;">
-                                                        <div style="font-weight: 600; color: #1E40AF; margin-bottom: 0.5rem; font-size: 1.1rem;">
-                                                            {skill}
-                                                        </div>
-                                                        <div>
-                                                    """, unsafe_allow_html=True)
-
-                                                for i, question in enumerate(questions, 1):
-                                                    st.markdown(f"""
-                                                        <div style="margin-bottom: 0.5rem; padding: 0.5rem; background-color: #F9FAFB; border-radius: 0.25rem;">
-                                                            <span style="font-weight: 500; color: #4B5563;">Q{i}:</span> {question}
-                                                        </div>
-                                                        """, unsafe_allow_html=True)
-
-                                                st.markdown("</div></div>", unsafe_allow_html=True)
-
-                                    with question_tabs[1]:
-                                        # General questions
-                                        if "general" in questions_data:
-                                            st.markdown(f"""
-                                                <div style="background-color: white; padding: 1rem; margin-bottom: 1rem; border-radius: 0.5rem; border: 1px solid #E5E7EB; border-left: 4px solid #10B981;">
-                                                    <div style="font-weight: 600; color: #065F46; margin-bottom: 0.5rem; font-size: 1.1rem;">
-                                                        General Questions
-                                                    </div>
-                                                    <div>
-                                                """, unsafe_allow_html=True)
-
-                                            for i, question in enumerate(questions_data["general"], 1):
-                                                st.markdown(f"""
-                                                    <div style="margin-bottom: 0.5rem; padding: 0.5rem; background-color: #F9FAFB; border-radius: 0.25rem;">
-                                                        <span style="font-weight: 500; color: #4B5563;">Q{i}:</span> {question}
-                                                    </div>
-                                                    """, unsafe_allow_html=True)
-
-                                            st.markdown("</div></div>", unsafe_allow_html=True)
+                                        # Create question tabs for better organization
+                                        question_tabs = st.tabs(["Skills-Based Questions", "General Questions"])
 
+                                    if is_skill:
+                                        questions_data["skills"][path[1]] = questions
+                                        with question_tabs[0]:
+                                            show_question_block(path[1], questions, "#3B82F6", "#1E40AF")
+                                    else:
+                                        questions_data["general"] = questions
+                                        with question_tabs[1]:
+                                            show_question_block("General Questions", questions, "#10B981", "#065F46")
+
+                                if question_tabs is not None:
                                     st.markdown("</div>", unsafe_allow_html=True)
 
                                     # Add download link for questions in a professional button
                                     questions_md = f"# Interview Questions for {level}-Level {role}\n\n"
                                     questions_md += "## Skill-Specific Questions\n\n"
-                                    for skill, questions in questions_data.get("skills", {}).items():
+                                    for skill, questions in questions_data["skills"].items():
                                         questions_md += f"### {skill}\n"
                                         for i, question in enumerate(questions, 1):
                                             questions_md += f"{i}. {question}\n"
                                         questions_md += "\n"
 
-                                    if "general" in questions_data:
+                                    if questions_data["general"]:
                                         questions_md += "## General Questions\n\n"
                                         for i, question in enumerate(questions_data["general"], 1):
                                             questions_md += f"{i}. {question}\n"
 
+                                    if parser.done:
+                                        save_artifact("Interview Questions", role, level,
+                                                      f"Interview questions for {level}-level {role}", questions_md,
+                                                      [(skills_prompt, system_prompt), (questions_prompt, system_prompt)],
+                                                      metadata={"question_types": question_type})
+
                                     questions_bytes = questions_md.encode()
                                     b64 = base64.b64encode(questions_bytes).decode()
                                     filename = f"{role.replace(' ', '_')}_{level}_Interview_Questions.md"
                                     st.markdown(f"""
-                                        <a href="data:file/txt;base64,{b64}" download="{filename}" style="margin-top: 1.5rem;">
-                                            📥 Download Interview Questions
-                                        </a>
-                                        """, unsafe_allow_html=True)
-                                except json.JSONDecodeError:
-                                    st.error("Could not parse interview questions")
-                        except json.JSONDecodeError:
-                            st.error("Could not parse skills response")
-            else:
-                st.warning("Please enter a role.")
+                                    <a href="data:file/txt;base64,{b64}" download="{filename}" style="margin-top: 1.5rem;">
+                                        📥 Download Interview Questions
+                                    </a>
+                                    """, unsafe_allow_html=True)
+                            except json.JSONDecodeError:
+                                st.error("Could not parse skills response")
+                else:
+                    st.warning("Please enter a role.")
+
 
-        # Case 5: Development Plan
-    with tab5:
+    # Case 5: Development Plan
+    def development_plan_page():
         st.markdown("<h2 class='use-case-header'>Personalized Development Plan</h2>", unsafe_allow_html=True)
         st.markdown("""
-            <div style="padding: 1rem; background-color: #F3F4F6; border-radius: 0.5rem; margin-bottom: 1.5rem;">
-                <p>Generate a personalized development plan based on performance feedback for a specific role and level.</p>
-            </div>
-            """, unsafe_allow_html=True)
+        <div style="padding: 1rem; background-color: #F3F4F6; border-radius: 0.5rem; margin-bottom: 1.5rem;">
+            <p>Generate a personalized development plan based on performance feedback for a specific role and level.</p>
+        </div>
+        """, unsafe_allow_html=True)
 
         col1, col2 = st.columns(2)
         with col1:
-            role = st.text_input("Role:", value="Electrical Engineer - Motor Control", key="role_dev_plan")
+            role = shared_input(st.text_input, "role", "Role:", "role_dev_plan")
         with col2:
-            level = st.selectbox("Level:", ["Junior", "Mid", "Senior"], key="level_dev_plan")
+            level = shared_input(st.selectbox, "level", "Level:", "level_dev_plan", prompts.LEVELS)
 
         employee_name = st.text_input("Employee Name (Optional):", "", key="employee_name")
 
@@ -927,42 +1168,33 @@ with tab4:
             if role and feedback:
                 with st.spinner("Generating development plan with AI..."):
                     # Prepare prompt for Claude
-                    prompt = f"""
-                        Create a personalized development plan for a {level}-level {role}
-                        {f'named {employee_name}' if employee_name else ''} based on the following performance feedback:
-
-                        "{feedback}"
-
-                        Include:
-                        1. A summary of strengths and areas for improvement
-                        2. Specific development goals for each area needing improvement
-                        3. Recommended learning resources (courses, books, etc.)
-                        4. Actionable milestones with a 3-month timeline
-                        5. Key performance indicators to measure progress
-
-                        Format the development plan in detailed Markdown with clear sections and bullet points.
-                        """
+                    prompt, _ = prompts.development_plan_prompt(canonical_role(role), level, employee_name, feedback)
 
                     plan_response = ask_claude(prompt)
 
                     if plan_response:
+                        save_artifact("Development Plan", role, level,
+                                      f"Development plan for {employee_name}" if employee_name
+                                      else f"{level}-level {role} development plan",
+                                      plan_response, [(prompt, None)], metadata={"employee_name": employee_name})
+
                         # Display development plan in a professional format
                         st.markdown("<div class='output-container'>", unsafe_allow_html=True)
 
                         # Add a nice header with employee name if provided
                         if employee_name:
                             st.markdown(f"""
-                                <div style="text-align: center; margin-bottom: 1.5rem;">
-                                    <h3 style="color: #1E40AF; font-weight: 500; margin-bottom: 0.25rem;">Development Plan</h3>
-                                    <h4 style="color: #1F2937; font-weight: 400; margin-top: 0;">for {employee_name}</h4>
-                                </div>
-                                """, unsafe_allow_html=True)
+                            <div style="text-align: center; margin-bottom: 1.5rem;">
+                                <h3 style="color: #1E40AF; font-weight: 500; margin-bottom: 0.25rem;">Development Plan</h3>
+                                <h4 style="color: #1F2937; font-weight: 400; margin-top: 0;">for {employee_name}</h4>
+                            </div>
+                            """, unsafe_allow_html=True)
                         else:
                             st.markdown(f"""
-                                <div style="text-align: center; margin-bottom: 1.5rem;">
-                                    <h3 style="color: #1E40AF; font-weight: 500;">Development Plan</h3>
-                                </div>
-                                """, unsafe_allow_html=True)
+                            <div style="text-align: center; margin-bottom: 1.5rem;">
+                                <h3 style="color: #1E40AF; font-weight: 500;">Development Plan</h3>
+                            </div>
+                            """, unsafe_allow_html=True)
 
                         # Display the plan with enhanced styling
                         # st.markdown will automatically render the markdown from Claude
@@ -973,23 +1205,371 @@ with tab4:
                         b64 = base64.b64encode(plan_bytes).decode()
                         filename = f"{'Development_Plan' if not employee_name else employee_name.replace(' ', '_')}_Plan.md"
                         st.markdown(f"""
-                            <a href="data:file/txt;base64,{b64}" download="{filename}">
-                                📥 Download Development Plan
-                            </a>
-                            """, unsafe_allow_html=True)
+                        <a href="data:file/txt;base64,{b64}" download="{filename}">
+                            📥 Download Development Plan
+                        </a>
+                        """, unsafe_allow_html=True)
 
                         st.markdown("</div>", unsafe_allow_html=True)
             else:
                 st.warning("Please enter a role and performance feedback.")
 
-        # Footer with branding
+        # Bulk mode for review cycles
+        with st.expander("📦 Bulk mode: generate plans from a performance-review export"):
+            review_file = st.file_uploader(
+                "Review Export (CSV or Parquet with employee, role, level and feedback columns):",
+                type=["csv", "parquet"],
+                key="review_export"
+            )
+
+            bulk_col1, bulk_col2 = st.columns(2)
+            with bulk_col1:
+                max_workers = st.slider("Parallel Requests:", 1, 16, 4, key="bulk_workers")
+            with bulk_col2:
+                output_format = st.radio("Output:", ["ZIP of Markdown files", "Parquet table"], key="bulk_format")
+
+            if st.button("Generate Bulk Plans", key="generate_bulk_plans"):
+                if review_file is not None:
+                    try:
+                        rows = read_review_export(review_file, review_file.name)
+                    except ValueError as e:
+                        st.error(f"Could not read the review export: {str(e)}")
+                        rows = []
+
+                    if rows:
+                        # Re-uploading the same export resumes its run directory
+                        output_format_key = "parquet" if output_format == "Parquet table" else "zip"
+                        run_key = hashlib.sha1(review_file.getvalue()).hexdigest()[:12]
+                        output_dir = os.path.join(os.getenv("HR360_BULK_DIR", "data/bulk_runs"),
+                                                  f"{run_key}_{output_format_key}")
+
+                        # Resolve canonical roles and the shared cache here; workers must not touch Streamlit
+                        prompt_roles = {row["role"]: canonical_role(row["role"]) for row in rows}
+                        response_cache = get_response_cache()
+
+                        def generate_plan(row):
+                            prompt, system_prompt = prompts.development_plan_prompt(
+                                prompt_roles[row["role"]], row["level"], row["employee"], row["feedback"])
+                            # Bulk runs queue behind this key's interactive calls
+                            with tenants.background():
+                                return cached_generation(response_cache, prompt, system_prompt)
+
+                        progress = st.progress(0.0, text=f"Generating {len(rows):,} development plans...")
+
+                        def show_progress(done, total, eta_seconds):
+                            progress.progress(done / total,
+                                              text=f"{done:,} of {total:,} plans generated · ETA {eta_seconds:.0f}s")
+
+                        summary = run_bulk_plans(rows, generate_plan, output_dir, output_format_key,
+                                                 max_workers=max_workers, on_progress=show_progress)
+                        progress.progress(1.0, text="Done")
+
+                        st.success(f"Generated {summary['completed']:,} plans in {summary['elapsed']:.1f}s "
+                                   f"({summary['skipped']:,} already done in an earlier run, "
+                                   f"{summary['failed']:,} failed)")
+                        if summary["errors"]:
+                            st.warning("Some rows failed; generate again to retry only those rows.")
+                            st.dataframe([{"employee": record["employee"], "role": record["role"],
+                                           "error": record["error"]} for record in summary["errors"]],
+                                         use_container_width=True)
+
+                        with open(summary["output_path"], "rb") as f:
+                            st.download_button(
+                                "📥 Download Development Plans",
+                                f.read(),
+                                file_name=os.path.basename(summary["output_path"]),
+                                key="download_bulk_plans"
+                            )
+                else:
+                    st.warning("Please upload a review export.")
+
+
+    # Case 6: Team Skill Gaps
+    def team_skill_gaps_page():
+        st.markdown("<h2 class='use-case-header'>Team Skill Gap Analytics</h2>", unsafe_allow_html=True)
+        st.markdown("""
+    <div style="padding: 1rem; background-color: #F3F4F6; border-radius: 0.5rem; margin-bottom: 1.5rem;">
+        <p>Compare employee skill ratings against the target profile of a role and level to find gaps, coverage and development priorities per team.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            role = shared_input(st.text_input, "role", "Role:", "role_team_gaps")
+        with col2:
+            level = shared_input(st.selectbox, "level", "Level:", "level_team_gaps", prompts.LEVELS)
+
+        ratings_file = st.file_uploader("Employee Skill Ratings (CSV or Parquet):", type=["csv", "parquet"],
+                                        key="ratings_file")
+        st.caption("Long format: employee, team, skill, rating. Wide format: employee, team and one column per skill.")
+
+        if st.button("Analyze Team Gaps", key="analyze_gaps"):
+            if role and ratings_file is not None:
+                with st.spinner("Comparing team ratings with the skill profile..."):
+                    prompt_role = canonical_role(role)
+                    skills_prompt, system_prompt = prompts.skill_profile_prompt(prompt_role, level)
+                    skills_response = ask_claude(skills_prompt, system_prompt)
+
+                    if skills_response:
+                        try:
+                            profile = parse_json_response(skills_response, r'\{.*\}')
+                            skills = profile["skills"]
+                            targets = profile["ratings"]
+
+                            ratings = load_ratings(ratings_file, ratings_file.name)
+                            employees, teams, matrix = rating_matrix(ratings, skills)
+                            results = analyze_gaps(employees, teams, matrix, skills, targets)
+                        except (json.JSONDecodeError, KeyError, ValueError) as e:
+                            st.error(f"Error analyzing skill gaps: {str(e)}")
+                        else:
+                            employee_gaps = results["employees"]
+                            team_summary = results["teams"]
+                            priorities = results["priorities"]
+
+                            unmatched = [skill for j, skill in enumerate(skills) if np.isnan(matrix[:, j]).all()]
+                            if unmatched:
+                                st.warning(f"No ratings found for: {', '.join(unmatched)}")
+
+                            st.markdown("<div class='output-container'>", unsafe_allow_html=True)
+                            metric_cols = st.columns(4)
+                            metric_cols[0].metric("Employees", f"{len(employee_gaps):,}")
+                            metric_cols[1].metric("Teams", f"{len(team_summary):,}")
+                            metric_cols[2].metric("Mean Coverage", f"{employee_gaps['coverage'].mean():.0%}")
+                            metric_cols[3].metric("Skills Matched", f"{len(skills) - len(unmatched)}/{len(skills)}")
+
+                            chart_col, data_col = st.columns([1, 1])
+
+                            with chart_col:
+                                # Overlay the largest teams on the target profile
+                                largest_teams = team_summary.nlargest(5, "employees")["team"]
+                                overlays = [
+                                    (str(team), results["team_ratings"].loc[team].fillna(0).round(1).tolist())
+                                    for team in largest_teams
+                                ]
+                                fig = create_radar_chart(skills, targets, role, level, overlays=overlays,
+                                                         label=f"{level} target")
+                                st.pyplot(fig)
+                                st.markdown(get_image_download_link(fig, f"{role}_{level}_team_gaps.png", "📥 Download Chart"),
+                                            unsafe_allow_html=True)
+                                plt.close()
+
+                            with data_col:
+                                st.subheader("Development Priorities")
+                                st.dataframe(
+                                    priorities[priorities["team"] == "All teams"].head(10)[
+                                        ["rank", "skill", "target", "mean_gap", "share_below_target"]],
+                                    hide_index=True, use_container_width=True)
+
+                                st.subheader("Team Summary")
+                                st.dataframe(team_summary, hide_index=True, use_container_width=True)
+
+                            with st.expander("Top priorities per team"):
+                                st.dataframe(priorities[(priorities["team"] != "All teams") & (priorities["rank"] <= 3)],
+                                             hide_index=True, use_container_width=True)
+
+                            st.download_button("📥 Download Employee Gaps (CSV)",
+                                               employee_gaps.to_csv(index=False).encode(),
+                                               file_name=f"{role.replace(' ', '_')}_{level}_Employee_Gaps.csv",
+                                               mime="text/csv", key="download_employee_gaps")
+                            st.markdown("</div>", unsafe_allow_html=True)
+            else:
+                st.warning("Please enter a role and upload a ratings file.")
+
+    # Artifact history
+    HISTORY_PAGE_SIZE = 20
+    ARTIFACT_TABS = ["Skill Identifier", "Skill Profiler", "Job Poster", "Interview Questions", "Development Plan"]
+
+
+    def reset_history_pages():
+        st.session_state["history_cursors"] = [None]
+
+
+    def next_history_page(cursor):
+        st.session_state["history_cursors"].append(cursor)
+
+
+    def previous_history_page():
+        st.session_state["history_cursors"].pop()
+
+
+    def open_artifact(artifact_id):
+        st.session_state["history_open"] = artifact_id
+
+
+    def history_page():
+        st.markdown("<h2 class='use-case-header'>History</h2>", unsafe_allow_html=True)
+        st.markdown("""
+    <div style="padding: 1rem; background-color: #F3F4F6; border-radius: 0.5rem; margin-bottom: 1.5rem;">
+        <p>Search every job description, interview question set, development plan and skill profile generated with your API key, and reopen it without generating it again.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+        store = get_artifact_store()
+        # Each API key only sees the artifacts generated with it
+        tenant = tenants.tenant_id(api_key)
+
+        opened = st.session_state.get("history_open")
+        artifact = store.get(opened, tenant=tenant) if opened else None
+        if artifact:
+            st.markdown("<div class='output-container'>", unsafe_allow_html=True)
+            st.subheader(artifact["title"])
+            created = datetime.fromtimestamp(artifact["created_at"]).strftime("%Y-%m-%d %H:%M")
+            st.caption(f"{artifact['tab']} · {created} · {artifact['model']} · "
+                       f"{artifact['input_tokens'] + artifact['output_tokens']:,} tokens")
+            st.markdown(artifact["content"])
+            st.download_button("📥 Download", artifact["content"],
+                               file_name=f"{artifact['title'].replace(' ', '_')}.md", key="download_artifact")
+            st.button("Close", key="close_artifact", on_click=open_artifact, args=(None,))
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            query = st.text_input("Search:", placeholder="e.g. senior motor control engineer", key="history_query",
+                                  on_change=reset_history_pages)
+        with col2:
+            tab = st.selectbox("Use case:", ["All"] + ARTIFACT_TABS, key="history_tab",
+                               on_change=reset_history_pages)
+        with col3:
+            level = st.selectbox("Level:", ["All"] + prompts.LEVELS, key="history_level", on_change=reset_history_pages)
+
+        filters = {"tab": None if tab == "All" else tab, "level": None if level == "All" else level, "tenant": tenant}
+        cursors = st.session_state.setdefault("history_cursors", [None])
+        with profiler.section("artifact_search"):
+            rows = store.search(query, before=cursors[-1], limit=HISTORY_PAGE_SIZE + 1, **filters)
+            total = store.count(query, **filters)
+        has_next = len(rows) > HISTORY_PAGE_SIZE
+        rows = rows[:HISTORY_PAGE_SIZE]
+
+        st.caption(f"{total:,}{'+' if total >= COUNT_LIMIT else ''} artifacts · page {len(cursors)}")
+        for row in rows:
+            with st.container(border=True):
+                text_col, button_col = st.columns([5, 1])
+                with text_col:
+                    created = datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d %H:%M")
+                    st.markdown(f"**{row['title']}**")
+                    st.caption(f"{row['tab']} · {created} · {row['input_tokens'] + row['output_tokens']:,} tokens")
+                    if row.get("snippet"):
+                        st.markdown(row["snippet"])
+                with button_col:
+                    st.button("Open", key=f"open_artifact_{row['id']}", on_click=open_artifact, args=(row["id"],))
+
+        prev_col, next_col = st.columns(2)
+        with prev_col:
+            st.button("← Newer", key="history_previous", disabled=len(cursors) == 1, on_click=previous_history_page)
+        with next_col:
+            st.button("Older →", key="history_next", disabled=not has_next, on_click=next_history_page,
+                      args=(rows[-1]["id"] if rows else None,))
+
+
+    def api_usage_page():
+        st.markdown("<h2 class='use-case-header'>API Usage</h2>", unsafe_allow_html=True)
+        st.markdown("""
+    <div style="padding: 1rem; background-color: #F3F4F6; border-radius: 0.5rem; margin-bottom: 1.5rem;">
+        <p>Token usage, limits and queueing of your API key. Each key has its own connection pool, concurrency and token-rate limits and a daily token quota, so one team's bulk runs do not slow down another's.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+        scheduler = get_tenant_scheduler()
+        rows = scheduler.usage(api_key)
+        if not rows:
+            st.info("No API calls with this key yet.")
+        for row in rows:
+            st.caption(f"Tenant {row['name']}")
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Tokens today", f"{row['tokens_today']:,}", help=f"of {row['daily_tokens']:,} per day")
+            col2.metric("Requests", f"{row['requests']:,}")
+            col3.metric("In flight / queued", f"{row['in_flight']} / {row['queued']}")
+            col4.metric("Queue wait p95", f"{row['wait_p95_s']:.2f}s")
+            st.progress(min(1.0, row["tokens_today"] / row["daily_tokens"]),
+                        text=f"Daily quota: {row['tokens_today'] / row['daily_tokens']:.0%} used")
+            st.caption(f"Token rate: {row['tokens_available']:,} of {row['tokens_per_minute']:,} tokens per minute "
+                       f"available · Throttled: {row['throttled']} · Rejected over quota: {row['rejected']} · "
+                       f"Circuit breaker: {row['breaker'].replace('_', '-')}")
+
+        if os.getenv("HR360_ADMIN") == "1":
+            st.subheader("All tenants")
+            st.dataframe(scheduler.usage(), use_container_width=True, hide_index=True)
+
+
+    # One page per use case, so each rerun only executes the page in use
+    PAGES = [
+        (skill_identifier_page, "Skill Identifier", "🔍", "skill-identifier"),
+        (skill_profiler_page, "Skill Profiler", "📊", "skill-profiler"),
+        (job_poster_page, "Job Poster", "📝", "job-poster"),
+        (interview_questions_page, "Interview Questions", "❓", "interview-questions"),
+        (development_plan_page, "Development Plan", "📈", "development-plan"),
+        (team_skill_gaps_page, "Team Skill Gaps", "👥", "team-skill-gaps"),
+        (history_page, "History", "🗂️", "history"),
+        (api_usage_page, "API Usage", "🔑", "api-usage"),
+    ]
+    START_PAGE = os.getenv("HR360_START_PAGE", "skill-identifier")
+
+    page = st.navigation([
+        st.Page(render, title=title, icon=icon, url_path=url_path, default=url_path == START_PAGE)
+        for render, title, icon, url_path in PAGES
+    ])
+    with profiler.section(page.title):
+        page.run()
+
+    # Footer with branding
     st.markdown("""
-        <div style="margin-top: 3rem; padding-top: 1.5rem; border-top: 1px solid #E5E7EB; text-align: center;">
-            <p style="color: #6B7280; font-size: 0.9rem;">
-                HR Skills Management Platform | Powered by Ferris.ai
-            </p>
-            <p style="color: #9CA3AF; font-size: 0.8rem;">
-                © 2025 | Create professional HR content with AI assistance
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
\ No newline at end of file
+    <div style="margin-top: 3rem; padding-top: 1.5rem; border-top: 1px solid #E5E7EB; text-align: center;">
+        <p style="color: #6B7280; font-size: 0.9rem;">
+            HR Skills Management Platform | Powered by Ferris.ai
+        </p>
+        <p style="color: #9CA3AF; font-size: 0.8rem;">
+            © 2025 | Create professional HR content with AI assistance
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # API health for operators
+    with st.sidebar.expander("API Status"), profiler.section("API Status"):
+        api_breaker = claude_api.breaker_for(api_key)
+        breaker_metrics = api_breaker.metrics()
+        st.markdown(f"**Circuit breaker:** {breaker_metrics['state'].replace('_', '-')}")
+        st.caption(f"Consecutive failures: {breaker_metrics['consecutive_failures']} · "
+                   f"Rejected while open: {breaker_metrics['rejected_calls']}")
+        if breaker_metrics["transitions"]:
+            st.code(api_breaker.metrics_text(), language="text")
+
+        cache_metrics = get_response_cache().metrics()
+        st.markdown(f"**Generation cache:** {cache_metrics['backend']}")
+        st.caption(f"Hit rate: {cache_metrics['hit_rate']:.0%} · Generations: {cache_metrics['generations']} · "
+                   f"Lock waits: {cache_metrics['lock_waits']} ({cache_metrics['lock_wait_seconds']:.1f}s)")
+
+        prefetch_metrics = get_prefetcher().metrics()
+        st.markdown(f"**Prefetch:** {'on' if prefetch_enabled else 'off'} for this session")
+        st.caption(f"Hit rate: {prefetch_metrics['hit_rate']:.0%} of {prefetch_metrics['prefetched']} prefetched · "
+                   f"Wasted tokens: {prefetch_metrics['wasted_token_rate']:.0%} of {prefetch_metrics['tokens_spent']:,} · "
+                   f"Budget left this hour: {prefetch_metrics['budget_remaining']:,} tokens")
+finally:
+    rerun_profile = profiler.finish()
+
+# Rerun profiler for operators: slowest sections of recent reruns and cProfile dumps
+if profiler_available:
+    profile_history = st.session_state.setdefault("profile_history", ProfileHistory())
+    profile_history.add(rerun_profile)
+    with st.sidebar.expander("🛠 Profiler"):
+        st.toggle("Time sections", key="profile_sections")
+        st.toggle("Capture cProfile", key="profile_capture")
+        st.caption("Settings apply from the next rerun.")
+
+        records = profile_history.records()
+        if records:
+            st.markdown(f"**Slowest sections** over the last {len(records)} reruns")
+            st.dataframe([{key: round(value, 4) if isinstance(value, float) else value for key, value in row.items()}
+                          for row in profile_history.slowest_sections()],
+                         use_container_width=True, hide_index=True)
+
+            for i, record in enumerate(reversed(records[-5:])):
+                started = datetime.fromtimestamp(record["started_at"]).strftime("%H:%M:%S")
+                st.caption(f"Rerun at {started}: {record['total'] * 1000:.0f} ms")
+                if record["profile"]:
+                    st.download_button("📥 Download cProfile dump", record["profile"],
+                                       file_name=f"hr360_rerun_{started.replace(':', '')}.prof",
+                                       mime="application/octet-stream", key=f"download_profile_{i}")
+            if records[-1]["summary"]:
+                st.code(records[-1]["summary"], language="text")
+            if st.button("Clear profiles", key="clear_profiles"):
+                profile_history.clear()
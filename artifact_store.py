@@ -0,0 +1,280 @@
+"""Persistent, searchable history of generated HR artifacts.
+
+Job descriptions, interview question sets, development plans and the other
+generated outputs are stored in SQLite with their role, level, tab, model
+and token usage, and indexed with FTS5 for full-text search.  Identical
+content from the same tab is stored once.
+
+Artifacts belong to the tenant (see ``tenants.tenant_id``) that generated
+them.  Every read takes ``tenant`` and then only sees that tenant's rows;
+rows saved before tenants were recorded have none and are only visible to
+unscoped reads.
+
+Listing and search are newest first with keyset pagination (``before`` is
+the id of the last row of the previous page), so deep pages cost the same
+as the first one.
+
+Run ``python artifact_store.py [count]`` to benchmark search at a million
+stored artifacts.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Counting stops here; larger result sets are reported as "at least"
+COUNT_LIMIT = 10_000
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    tab TEXT NOT NULL,
+    role TEXT NOT NULL,
+    level TEXT,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    model TEXT,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    metadata TEXT,
+    content_hash TEXT NOT NULL UNIQUE,
+    tenant TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS artifacts_fts USING fts5 (
+    title, role, content,
+    content='artifacts', content_rowid='id',
+    tokenize='porter unicode61', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS artifacts_ai AFTER INSERT ON artifacts BEGIN
+    INSERT INTO artifacts_fts (rowid, title, role, content) VALUES (new.id, new.title, new.role, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS artifacts_ad AFTER DELETE ON artifacts BEGIN
+    INSERT INTO artifacts_fts (artifacts_fts, rowid, title, role, content)
+    VALUES ('delete', old.id, old.title, old.role, old.content);
+END;
+"""
+
+# Created after the tenant column is added to databases from before it existed
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS artifacts_tab ON artifacts (tab, id);
+CREATE INDEX IF NOT EXISTS artifacts_tenant ON artifacts (tenant, id);
+CREATE INDEX IF NOT EXISTS artifacts_tenant_tab ON artifacts (tenant, tab, id);
+"""
+
+_SUMMARY_COLUMNS = "a.id, a.created_at, a.tab, a.role, a.level, a.title, a.model, a.input_tokens, a.output_tokens"
+
+
+def match_expression(query):
+    """FTS5 query matching every word of free-text ``query``, the last one as a prefix"""
+    terms = _TERM_RE.findall(query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class ArtifactStore:
+    """Generated artifacts in SQLite at ``path``, with an FTS5 index"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(artifacts)")}
+        if "tenant" not in columns:
+            conn.execute("ALTER TABLE artifacts ADD COLUMN tenant TEXT")
+        conn.executescript(_INDEXES)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save(self, tab, role, title, content, level=None, model=None, usage=None, metadata=None, tenant=None):
+        """Store an artifact and return its id; identical content from the same tab and tenant is stored once"""
+        usage = usage or {}
+        # Legacy rows hash without a tenant, so unscoped saves still deduplicate against them
+        key = f"{tab}\0{content}" if tenant is None else f"{tenant}\0{tab}\0{content}"
+        content_hash = hashlib.sha256(key.encode()).hexdigest()
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO artifacts (created_at, tab, role, level, title, content, model, "
+                "input_tokens, output_tokens, metadata, content_hash, tenant) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), tab, role, level, title, content, model, usage.get("input_tokens", 0),
+                 usage.get("output_tokens", 0), json.dumps(metadata) if metadata else None, content_hash, tenant))
+            if cursor.rowcount:
+                return cursor.lastrowid
+            return conn.execute("SELECT id FROM artifacts WHERE content_hash = ?", (content_hash,)).fetchone()[0]
+
+    def get(self, artifact_id, tenant=None):
+        """The full artifact as a dict, or None (also when it belongs to another ``tenant``)"""
+        row = self._connection().execute("SELECT * FROM artifacts WHERE id = ?", (artifact_id,)).fetchone()
+        if row is None or (tenant is not None and row["tenant"] != tenant):
+            return None
+        artifact = dict(row)
+        artifact["metadata"] = json.loads(artifact["metadata"]) if artifact["metadata"] else {}
+        del artifact["content_hash"]
+        return artifact
+
+    def delete(self, artifact_id, tenant=None):
+        with self._connection() as conn:
+            if tenant is None:
+                conn.execute("DELETE FROM artifacts WHERE id = ?", (artifact_id,))
+            else:
+                conn.execute("DELETE FROM artifacts WHERE id = ? AND tenant = ?", (artifact_id, tenant))
+
+    def _where(self, query, tab, level, before, tenant):
+        match = match_expression(query) if query else None
+        if match:
+            # CROSS JOIN keeps the full-text index as the outer loop, so a
+            # filtered search walks the matches newest first instead of the
+            # whole tab
+            sql = ("FROM artifacts_fts CROSS JOIN artifacts a ON a.id = artifacts_fts.rowid "
+                   "WHERE artifacts_fts MATCH ?")
+            id_column = "artifacts_fts.rowid"
+            params = [match]
+        else:
+            sql = "FROM artifacts a WHERE 1"
+            id_column = "a.id"
+            params = []
+        for column, value in (("tenant", tenant), ("tab", tab), ("level", level)):
+            if value:
+                sql += f" AND a.{column} = ?"
+                params.append(value)
+        if before is not None:
+            sql += f" AND {id_column} < ?"
+            params.append(before)
+        return sql, params, id_column, bool(match)
+
+    def search(self, query="", tab=None, level=None, before=None, limit=20, tenant=None):
+        """One page of artifact summaries, newest first
+
+        ``query`` is free text matched against title, role and content; with
+        a query each row has a ``snippet`` of the matching content.  Pass the
+        id of the last row as ``before`` to get the next page.  With
+        ``tenant`` only that tenant's artifacts are listed.
+        """
+        sql, params, id_column, matched = self._where(query, tab, level, before, tenant)
+        snippet = ", snippet(artifacts_fts, 2, '**', '**', '…', 16) AS snippet" if matched else ""
+        rows = self._connection().execute(f"SELECT {_SUMMARY_COLUMNS}{snippet} {sql} ORDER BY {id_column} DESC LIMIT ?",
+                                          params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self, query="", tab=None, level=None, limit=COUNT_LIMIT, tenant=None):
+        """Number of matching artifacts, counted up to ``limit``"""
+        sql, params, _, _ = self._where(query, tab, level, None, tenant)
+        return self._connection().execute(
+            f"SELECT count(*) FROM (SELECT 1 {sql} LIMIT ?)", params + [limit]).fetchone()[0]
+
+    def usage(self, tenant=None):
+        """Artifact count and token totals per tab"""
+        where, params = ("WHERE tenant = ?", [tenant]) if tenant is not None else ("", [])
+        rows = self._connection().execute(
+            "SELECT tab, count(*) AS artifacts, sum(input_tokens) AS input_tokens, "
+            f"sum(output_tokens) AS output_tokens FROM artifacts {where} GROUP BY tab ORDER BY tab", params).fetchall()
+        return [dict(row) for row in rows]
+
+
+if __name__ == "__main__":
+    import itertools
+    import random
+    import statistics
+    import sys
+    import tempfile
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(0)
+    tabs = ["Job Poster", "Interview Questions", "Development Plan", "Skill Profiler", "Skill Identifier"]
+    levels = ["Junior", "Mid", "Senior"]
+    tenant_ids = [f"tenant{i:02d}" for i in range(20)]
+    roles = [f"{area} {kind}" for area in ("Motor Control", "Embedded", "Power Electronics", "Data", "Cloud",
+                                           "Frontend", "Backend", "Test", "Hardware", "Firmware", "Security",
+                                           "Network", "Mobile", "Platform", "Reliability", "Controls")
+             for kind in ("Engineer", "Developer", "Architect", "Analyst", "Technician", "Manager")]
+    vocabulary = ["leadership", "testing", "python", "debugging", "documentation", "safety", "matlab",
+                  "simulink", "inverter", "pcb", "kubernetes", "mentoring", "stakeholder", "roadmap",
+                  "compliance"] + [f"term{i}" for i in range(20_000)]
+    # Zipf-like word frequencies, so the named skills are common and most terms are rare
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+
+    path = os.path.join(tempfile.mkdtemp(), "artifacts.db")
+    store = ArtifactStore(path)
+    conn = store._connection()
+    start = time.perf_counter()
+    batch = []
+    for i in range(count):
+        role = rng.choice(roles)
+        level = rng.choice(levels)
+        tab = rng.choice(tabs)
+        tenant = rng.choice(tenant_ids)
+        words = " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=80))
+        content = f"# {level} {role}\n\n{words}"
+        batch.append((time.time(), tab, role, level, f"{level} {role} {tab}", content, "claude-3-haiku-20240307",
+                      400, 900, None, hashlib.sha256(f"{i}".encode()).hexdigest(), tenant))
+        if len(batch) == 20_000:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO artifacts (created_at, tab, role, level, title, content, model, input_tokens, "
+                    "output_tokens, metadata, content_hash, tenant) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    batch)
+            batch = []
+    if batch:
+        with conn:
+            conn.executemany(
+                "INSERT INTO artifacts (created_at, tab, role, level, title, content, model, input_tokens, "
+                "output_tokens, metadata, content_hash, tenant) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                batch)
+    load = time.perf_counter() - start
+    print(f"{count:,} artifacts loaded in {load:.0f}s ({os.path.getsize(path) / 2**20:,.0f} MiB)")
+
+    def bench(name, run, repeat=50):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = run()
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        rows = len(result) if isinstance(result, list) else result
+        print(f"{name:<42} p50 {statistics.median(samples) * 1e3:7.2f} ms   "
+              f"p99 {samples[int(len(samples) * 0.99) - 1] * 1e3:7.2f} ms   ({rows} rows)")
+
+    last_page = store.search(limit=20)
+    for _ in range(50):
+        last_page = store.search(before=last_page[-1]["id"], limit=20)
+    deep_cursor = last_page[-1]["id"]
+
+    bench("latest page", lambda: store.search(limit=20))
+    bench("latest page, one tab and level", lambda: store.search(tab="Job Poster", level="Senior", limit=20))
+    bench("page 51 (keyset)", lambda: store.search(before=deep_cursor, limit=20))
+    bench("common term", lambda: store.search("leadership", limit=20))
+    bench("rare term", lambda: store.search("term15000", limit=20))
+    bench("role phrase", lambda: store.search("senior motor control engineer", limit=20))
+    bench("prefix while typing", lambda: store.search("kuber", limit=20))
+    bench("short prefix while typing", lambda: store.search("te", limit=20))
+    bench("two rare terms", lambda: store.search("term12000 term17000", limit=20))
+    bench("common term, one tab", lambda: store.search("python", tab="Development Plan", limit=20))
+    bench("rare term, one tab and level", lambda: store.search("term15000", tab="Development Plan",
+                                                                level="Senior", limit=20))
+    bench("latest page, one tenant", lambda: store.search(limit=20, tenant="tenant07"))
+    bench("latest page, one tenant and tab", lambda: store.search(tab="Job Poster", limit=20, tenant="tenant07"))
+    bench("common term, one tenant", lambda: store.search("leadership", limit=20, tenant="tenant07"))
+    bench("rare term, one tenant", lambda: store.search("term15000", limit=20, tenant="tenant07"))
+    bench("count, common term (capped)", lambda: store.count("leadership"), repeat=10)
+    bench("open artifact by id", lambda: [store.get(rng.randint(1, count))])
@@ -0,0 +1,185 @@
+"""Offline end-to-end benchmark of every page using Streamlit's AppTest.
+
+The app runs against the replay transport: recorded fixtures from
+``--fixtures`` when given (see ``HR360_TRANSPORT=record`` in claude_api),
+otherwise canned responses, with a simulated API latency.  For each page the
+benchmark reports the script time of the click that generates the output,
+the API wall time inside it, the cost of a plain rerun and the number of
+rendered elements.  The knowledge base and artifact history live in a
+temporary directory, so the benchmark leaves ``data/`` alone.
+
+    python benchmark.py --latency 0.5 --runs 3 --history bench_history.jsonl
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import claude_api
+import prompts
+
+PAGES = [
+    ("Skill Identifier", "skill-identifier", "identify_skills"),
+    ("Skill Profiler", "skill-profiler", "generate_profile"),
+    ("Job Poster", "job-poster", "generate_job"),
+    ("Interview Questions", "interview-questions", "generate_questions"),
+    ("Development Plan", "development-plan", "generate_plan"),
+]
+
+CANNED_SKILLS = [
+    "Motor Control Theory", "Power Electronics", "Embedded C Programming", "Circuit Analysis",
+    "MATLAB/Simulink", "Field-Oriented Control", "Technical Documentation", "Team Communication",
+]
+
+
+def canned_response(payload):
+    """Plausible response text for any prompt built by the prompts module"""
+    prompt = payload["messages"][0]["content"]
+    system_prompt = payload.get("system")
+
+    if system_prompt == prompts.skill_identifier_prompt("")[1]:
+        return json.dumps(CANNED_SKILLS)
+    if system_prompt == prompts.SKILLS_ASSESSMENT_SYSTEM_PROMPT:
+        if "key skills required" in prompt:
+            return json.dumps({"skills": CANNED_SKILLS, "ratings": [4, 5, 3, 4, 5, 3, 4, 5]})
+        skills = re.search(r"Skills: (.*)", prompt).group(1).split(", ")
+        return json.dumps({skill: f"Can apply {skill.lower()} to routine tasks with guidance." for skill in skills})
+    if system_prompt == prompts.job_boards_prompt("", "")[1]:
+        return json.dumps([{"name": f"Job Board {i}", "why": "Strong reach among engineers."} for i in range(1, 6)])
+    if system_prompt == prompts.INTERVIEW_SYSTEM_PROMPT:
+        if "List the 5" in prompt:
+            return json.dumps(CANNED_SKILLS[:5])
+        return json.dumps({
+            "skills": {skill: [f"How have you used {skill}?", f"Describe a {skill} problem you solved."]
+                       for skill in CANNED_SKILLS[:5]},
+            "general": ["Tell us about a project you are proud of.", "How do you handle tight deadlines?"],
+        })
+    section = "\n".join(f"- Point {i} about this section." for i in range(1, 6))
+    return "\n\n".join(f"## Section {i}\n\n{section}" for i in range(1, 8))
+
+
+def count_elements(node):
+    children = getattr(node, "children", None)
+    if not children:
+        return 1
+    return 1 + sum(count_elements(child) for child in children.values())
+
+
+def fresh_app(timeout):
+    # Shared resources (response cache, role index, knowledge base) would
+    # otherwise turn every run after the first into a cache hit
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    kb_path = os.environ["HR360_SKILLS_KB"]
+    artifacts_path = os.environ["HR360_ARTIFACTS"]
+    for path in (kb_path, f"{kb_path}.log", artifacts_path, f"{artifacts_path}-wal", f"{artifacts_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    return AppTest.from_file("app.py", default_timeout=timeout)
+
+
+def bench_page(url_path, button_key, runs, timeout):
+    # The app opens on HR360_START_PAGE, so each page is benchmarked as the landing page
+    os.environ["HR360_START_PAGE"] = url_path
+    samples = []
+    for _ in range(runs):
+        at = fresh_app(timeout)
+        start = time.perf_counter()
+        at.run()
+        initial = time.perf_counter() - start
+
+        claude_api.stats.reset()
+        start = time.perf_counter()
+        at.button(key=button_key).click().run()
+        click = time.perf_counter() - start
+        api = claude_api.stats.snapshot()
+        if at.exception:
+            raise RuntimeError(f"{button_key}: {at.exception[0].message}")
+        elements = count_elements(at.main) + count_elements(at.sidebar)
+
+        start = time.perf_counter()
+        at.run()
+        rerun = time.perf_counter() - start
+
+        samples.append({
+            "initial_run": initial,
+            "click_script": click,
+            "click_api": api["seconds"],
+            "api_calls": api["calls"],
+            "rerun": rerun,
+            "elements": elements,
+        })
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", help="directory of recorded fixtures (default: canned responses only)")
+    parser.add_argument("--latency", type=float, default=0.5,
+                        help="simulated API latency per call in seconds (default: 0.5)")
+    parser.add_argument("--recorded-latency", action="store_true",
+                        help="replay the latency stored in each fixture instead of --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls that fail")
+    parser.add_argument("--runs", type=int, default=3, help="runs per page; the median is reported")
+    parser.add_argument("--timeout", type=float, default=120, help="AppTest script timeout in seconds")
+    parser.add_argument("--history", help="append the results as one JSON line to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+    workdir = tempfile.mkdtemp(prefix="hr360-benchmark-")
+    os.environ["HR360_SKILLS_KB"] = os.path.join(workdir, "skills_kb.json")
+    os.environ["HR360_ARTIFACTS"] = os.path.join(workdir, "artifacts.db")
+    os.environ["HR360_CACHE_URL"] = "memory://"
+    try:
+        run_benchmark(args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_benchmark(args):
+    claude_api.set_transport(claude_api.ReplayTransport(
+        args.fixtures,
+        latency=None if args.recorded_latency else args.latency,
+        error_rate=args.error_rate,
+        fallback=canned_response,
+        seed=0,
+    ))
+
+    results = {}
+    print(f"{'page':<22}{'initial':>9}{'click':>9}{'api':>9}{'calls':>7}{'rerun':>9}{'elements':>10}")
+    for name, url_path, button_key in PAGES:
+        result = results[name] = bench_page(url_path, button_key, args.runs, args.timeout)
+        print(f"{name:<22}{result['initial_run']:>8.3f}s{result['click_script']:>8.3f}s"
+              f"{result['click_api']:>8.3f}s{result['api_calls']:>7.0f}{result['rerun']:>8.3f}s"
+              f"{result['elements']:>10.0f}")
+
+    if args.history:
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "revision": git_revision(),
+                "latency": None if args.recorded_latency else args.latency,
+                "runs": args.runs,
+                "tabs": results,
+            }) + "\n")
+
+
+if __name__ == "__main__":
+    main()
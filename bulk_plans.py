@@ -0,0 +1,228 @@
+"""Bulk development plan generation from a performance-review export.
+
+Rows (employee, role, level, feedback) are generated with bounded
+parallelism and streamed into a ZIP of Markdown files or a Parquet table as
+they complete.  Every finished row is appended to a ``checkpoint.jsonl`` in
+the run directory, so an interrupted run resumes where it stopped and only
+failed or missing rows are generated again.  The output file is written
+under a temporary name and moved into place when the run ends, and it is
+rebuilt from the checkpoint on every run, so a hard kill never leaves a
+half-written archive behind.
+
+Run ``python bulk_plans.py`` to measure throughput against a mock API.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+REQUIRED_COLUMNS = ("employee", "role", "level", "feedback")
+CHECKPOINT_FILE = "checkpoint.jsonl"
+PARQUET_BATCH_SIZE = 100
+
+
+def read_review_export(source, filename=None):
+    """Read a CSV or Parquet review export into a list of row dicts"""
+    import pandas as pd
+
+    name = str(filename or getattr(source, "name", None) or source).lower()
+    if name.endswith((".parquet", ".pq")):
+        export = pd.read_parquet(source)
+    else:
+        export = pd.read_csv(source, dtype=str, keep_default_na=False)
+
+    export.columns = [str(column).strip().lower() for column in export.columns]
+    missing = [column for column in REQUIRED_COLUMNS if column not in export.columns]
+    if missing:
+        raise ValueError(f"The review export is missing columns: {', '.join(missing)}")
+    export = export[list(REQUIRED_COLUMNS)].fillna("").astype(str)
+    return export.to_dict("records")
+
+
+def row_id(row):
+    """Stable identifier of a review row, used to resume interrupted runs"""
+    text = "\x1f".join(row[column].strip() for column in REQUIRED_COLUMNS)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def plan_markdown(row, plan):
+    header = f"# Development Plan for {row['employee'] or 'Employee'}\n\n*{row['level']}-level {row['role']}*\n\n"
+    return header + plan
+
+
+def _plan_filename(row, rid):
+    name = re.sub(r"[^A-Za-z0-9_-]+", "_", row["employee"]).strip("_") or "Employee"
+    return f"{name}_{rid[:8]}_Plan.md"
+
+
+class _ZipSink:
+    def __init__(self, path):
+        self.path = path
+        # A ZIP only gets its central directory on close, so it is built under
+        # a temporary name and earlier results are rewritten from the checkpoint
+        self._tmp_path = f"{path}.partial"
+        self._zip = zipfile.ZipFile(self._tmp_path, "w", compression=zipfile.ZIP_DEFLATED)
+        self._written = set()
+
+    def write(self, record):
+        filename = _plan_filename(record, record["id"])
+        if filename not in self._written:
+            self._zip.writestr(filename, plan_markdown(record, record["plan"]))
+            self._written.add(filename)
+
+    def close(self):
+        self._zip.close()
+        os.replace(self._tmp_path, self.path)
+
+
+class _ParquetSink:
+    columns = ["id", *REQUIRED_COLUMNS, "plan"]
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.path = path
+        self._schema = pa.schema([(column, pa.string()) for column in self.columns])
+        self._tmp_path = f"{path}.partial"
+        self._writer = pq.ParquetWriter(self._tmp_path, self._schema)
+        self._batch = []
+
+    def write(self, record):
+        self._batch.append(record)
+        if len(self._batch) >= PARQUET_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._batch:
+            table = self._pa.Table.from_pylist(
+                [{column: record[column] for column in self.columns} for record in self._batch],
+                schema=self._schema)
+            self._writer.write_table(table)
+            self._batch = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+
+def _load_checkpoint(path):
+    records = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-write leaves at most one partial line
+                    continue
+                records[record["id"]] = record
+    return records
+
+
+def run_bulk_plans(rows, generate, output_dir, output_format="zip", max_workers=4, on_progress=None):
+    """Generate a plan for every row and stream the results into ``output_dir``
+
+    ``generate(row)`` returns the plan Markdown or raises; a failing row is
+    recorded as an error without affecting the others.  ``on_progress`` is
+    called from the calling thread as ``on_progress(done, total, eta_seconds)``.
+    Returns a summary dict with the counts, the errors and the output path.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+    previous = _load_checkpoint(checkpoint_path)
+
+    if output_format == "parquet":
+        sink = _ParquetSink(os.path.join(output_dir, "development_plans.parquet"))
+    else:
+        sink = _ZipSink(os.path.join(output_dir, "development_plans.zip"))
+    # Neither format can be appended to safely, so earlier results are rewritten first
+    for record in previous.values():
+        if record["status"] == "ok":
+            sink.write(record)
+
+    pending = {}
+    for row in rows:
+        rid = row_id(row)
+        if previous.get(rid, {}).get("status") != "ok":
+            pending[rid] = row
+    skipped = len({row_id(row) for row in rows}) - len(pending)
+
+    total = len(pending)
+    done = 0
+    errors = []
+    start = time.perf_counter()
+
+    def work(rid, row):
+        try:
+            return {"id": rid, **row, "status": "ok", "plan": generate(row)}
+        except Exception as e:
+            return {"id": rid, **row, "status": "error", "error": str(e)}
+
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(work, rid, row) for rid, row in pending.items()]
+        try:
+            for future in as_completed(futures):
+                record = future.result()
+                checkpoint.write(json.dumps(record) + "\n")
+                checkpoint.flush()
+                if record["status"] == "ok":
+                    sink.write(record)
+                else:
+                    errors.append(record)
+
+                done += 1
+                if on_progress:
+                    elapsed = time.perf_counter() - start
+                    on_progress(done, total, elapsed / done * (total - done))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            sink.close()
+
+    return {
+        "completed": total - len(errors),
+        "skipped": skipped,
+        "failed": len(errors),
+        "errors": errors,
+        "elapsed": time.perf_counter() - start,
+        "output_path": sink.path,
+    }
+
+
+if __name__ == "__main__":
+    import random
+    import shutil
+    import tempfile
+
+    rng = random.Random(3)
+    rows = [
+        {"employee": f"Employee {i}", "role": "Electrical Engineer - Motor Control",
+         "level": rng.choice(["Junior", "Mid", "Senior"]), "feedback": f"Feedback {i}"}
+        for i in range(400)
+    ]
+
+    def mock_generate(row):
+        # Simulated API latency of 50-150 ms and a 2% error rate
+        time.sleep(rng.uniform(0.05, 0.15))
+        if rng.random() < 0.02:
+            raise RuntimeError("mock API error")
+        return f"## Plan\n\nPlan for {row['employee']}.\n" * 20
+
+    for workers in (1, 4, 16, 32):
+        output_dir = tempfile.mkdtemp()
+        sample = rows if workers > 1 else rows[:40]
+        summary = run_bulk_plans(sample, mock_generate, output_dir, max_workers=workers)
+        resumed = run_bulk_plans(sample, mock_generate, output_dir, max_workers=workers)
+        print(f"workers={workers:<3} {len(sample) / summary['elapsed']:7.1f} rows/s "
+              f"({summary['completed']} ok, {summary['failed']} failed; "
+              f"resume retried {resumed['completed'] + resumed['failed']}, skipped {resumed['skipped']})")
+        shutil.rmtree(output_dir)
@@ -0,0 +1,569 @@
+"""Direct calls to the Anthropic Messages API using requests.
+
+This module has no Streamlit dependency so it can be used from background
+threads and batch jobs; the app wraps it in ``ask_claude``.
+
+Requests go through a pluggable transport chosen with ``HR360_TRANSPORT``:
+
+- ``http`` (default): the live API
+- ``record``: the live API, saving every response (text, usage, timing and
+  stream chunk offsets) as a JSON fixture in ``HR360_FIXTURES``
+- ``replay``: answers from the fixtures in ``HR360_FIXTURES`` with simulated
+  latency (``HR360_REPLAY_LATENCY`` seconds, default: the recorded timing)
+  and error rate (``HR360_REPLAY_ERROR_RATE``), without network access
+
+All calls pass through a circuit breaker that opens after
+``HR360_BREAKER_FAILURES`` consecutive failures or calls slower than
+``HR360_BREAKER_LATENCY`` seconds, fails fast while open and lets a single
+probe through after ``HR360_BREAKER_RESET`` seconds.  Only failures of the
+service count: connection errors, timeouts, 429 and 5xx responses.  Client
+errors such as an invalid key (400/401/403) do not.  A stream is timed to
+its first token; a non-streamed call is not timed at all, since a long
+generation takes long on a healthy service too (its timeout still counts).  With a tenant scheduler (see ``set_scheduler``) every
+API key has a breaker of its own.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import nullcontext
+
+import requests
+
+API_URL = "https://api.anthropic.com/v1/messages"
+API_VERSION = "2023-06-01"
+DEFAULT_MODEL = "claude-3-haiku-20240307"
+MAX_TOKENS = 4000
+
+
+logger = logging.getLogger(__name__)
+
+
+class ClaudeAPIError(Exception):
+    """Raised when the API cannot be reached or returns an error response"""
+
+    # Whether the error says the service is unhealthy, as opposed to the request being wrong
+    service_failure = False
+
+
+class APIConnectionError(ClaudeAPIError):
+    """The API could not be reached or did not answer in time"""
+
+    service_failure = True
+
+
+class APIStatusError(ClaudeAPIError):
+    """The API answered with an error status"""
+
+    def __init__(self, status_code, message):
+        super().__init__(f"API Error: {status_code} - {message}")
+        self.status_code = status_code
+        self.service_failure = status_code == 429 or status_code >= 500
+
+
+class CircuitOpenError(ClaudeAPIError):
+    """Raised without calling the API while the circuit breaker is open"""
+
+
+# Status codes of the error events sent inside a stream
+_STREAM_ERROR_STATUS = {
+    "invalid_request_error": 400, "authentication_error": 401, "permission_error": 403,
+    "not_found_error": 404, "request_too_large": 413, "rate_limit_error": 429, "api_error": 500,
+    "overloaded_error": 529,
+}
+
+
+def build_payload(prompt, system_prompt=None, model=DEFAULT_MODEL, max_tokens=MAX_TOKENS):
+    payload = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+
+    if system_prompt:
+        payload["system"] = system_prompt
+    return payload
+
+
+def _headers(api_key):
+    return {
+        "x-api-key": api_key,
+        "content-type": "application/json",
+        "anthropic-version": API_VERSION
+    }
+
+
+class HTTPTransport:
+    """Sends payloads to the live Messages API"""
+
+    def __init__(self, session=None, timeout=(10, 120)):
+        self.session = session
+        self.timeout = timeout
+
+    def send(self, payload, api_key):
+        try:
+            response = (self.session or requests).post(
+                API_URL, headers=_headers(api_key), json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise APIConnectionError(f"Error calling Claude API: {str(e)}") from e
+
+        if response.status_code != 200:
+            raise APIStatusError(response.status_code, response.text)
+        return response.json()
+
+    def stream(self, payload, api_key):
+        """Yield text deltas as they arrive and return the assembled message"""
+        try:
+            response = (self.session or requests).post(
+                API_URL, headers=_headers(api_key), json={**payload, "stream": True},
+                timeout=self.timeout, stream=True)
+        except requests.RequestException as e:
+            raise APIConnectionError(f"Error calling Claude API: {str(e)}") from e
+
+        with response:
+            if response.status_code != 200:
+                raise APIStatusError(response.status_code, response.text)
+
+            message = {"content": [{"type": "text", "text": ""}], "usage": {}}
+            parts = []
+            try:
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[len("data:"):])
+                    if event["type"] == "message_start":
+                        message = {**event["message"], "content": message["content"]}
+                    elif event["type"] == "content_block_delta" and event["delta"].get("type") == "text_delta":
+                        parts.append(event["delta"]["text"])
+                        yield event["delta"]["text"]
+                    elif event["type"] == "message_delta":
+                        message["usage"] = {**message.get("usage", {}), **event.get("usage", {})}
+                    elif event["type"] == "error":
+                        error = event["error"]
+                        raise APIStatusError(_STREAM_ERROR_STATUS.get(error.get("type"), 500),
+                                             error.get("message", error))
+            except requests.RequestException as e:
+                raise APIConnectionError(f"Error calling Claude API: {str(e)}") from e
+
+        message["content"][0]["text"] = "".join(parts)
+        return message
+
+
+def fixture_key(payload):
+    """Fixture name of a payload; streaming and non-streaming calls share fixtures"""
+    canonical = json.dumps({k: v for k, v in payload.items() if k != "stream"}, sort_keys=True)
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def save_fixture(fixture_dir, payload, response_data, elapsed, chunks=None):
+    os.makedirs(fixture_dir, exist_ok=True)
+    fixture = {"payload": payload, "response": response_data, "elapsed": elapsed}
+    if chunks is not None:
+        fixture["chunks"] = chunks
+    with open(os.path.join(fixture_dir, f"{fixture_key(payload)}.json"), "w", encoding="utf-8") as f:
+        json.dump(fixture, f, indent=2)
+
+
+class RecordingTransport:
+    """Forwards to ``inner`` and saves every successful response as a fixture"""
+
+    def __init__(self, fixture_dir, inner=None):
+        self.fixture_dir = fixture_dir
+        self.inner = inner or HTTPTransport()
+
+    def send(self, payload, api_key):
+        start = time.perf_counter()
+        response_data = self.inner.send(payload, api_key)
+        save_fixture(self.fixture_dir, payload, response_data, time.perf_counter() - start)
+        return response_data
+
+    def stream(self, payload, api_key):
+        start = time.perf_counter()
+        chunks = []
+        stream = self.inner.stream(payload, api_key)
+        while True:
+            try:
+                text = next(stream)
+            except StopIteration as stop:
+                response_data = stop.value
+                break
+            chunks.append([text, time.perf_counter() - start])
+            yield text
+        save_fixture(self.fixture_dir, payload, response_data, time.perf_counter() - start, chunks)
+        return response_data
+
+
+class ReplayTransport:
+    """Answers from recorded fixtures without network access
+
+    ``latency`` overrides the recorded response time (seconds) and
+    ``latency_scale`` multiplies it; ``error_rate`` is the share of calls that
+    fail with a simulated overload.  Requests without a fixture are answered
+    by ``fallback(payload)`` if given, otherwise they fail.
+    """
+
+    def __init__(self, fixture_dir=None, latency=None, latency_scale=1.0, error_rate=0.0,
+                 chunk_size=24, fallback=None, seed=None):
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.error_rate = error_rate
+        self.chunk_size = chunk_size
+        self.fallback = fallback
+        self._random = random.Random(seed)
+
+    def _fixture(self, payload):
+        if self._random.random() < self.error_rate:
+            raise APIStatusError(529, "Overloaded (simulated)")
+
+        path = os.path.join(self.fixture_dir or "", f"{fixture_key(payload)}.json")
+        if self.fixture_dir and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                fixture = json.load(f)
+        elif self.fallback is not None:
+            text = self.fallback(payload)
+            fixture = {"response": _message(text, payload), "elapsed": 0.0}
+        else:
+            raise ClaudeAPIError(f"No recorded fixture for this request ({fixture_key(payload)})")
+
+        elapsed = fixture.get("elapsed", 0.0) if self.latency is None else self.latency
+        return fixture, elapsed * self.latency_scale
+
+    def send(self, payload, api_key):
+        fixture, elapsed = self._fixture(payload)
+        time.sleep(elapsed)
+        return fixture["response"]
+
+    def stream(self, payload, api_key):
+        fixture, elapsed = self._fixture(payload)
+        chunks = fixture.get("chunks")
+        if not chunks:
+            text = fixture["response"]["content"][0]["text"]
+            pieces = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+            chunks = [[piece, elapsed * (i + 1) / len(pieces)] for i, piece in enumerate(pieces)]
+
+        recorded_total = chunks[-1][1] or 1.0
+        start = time.perf_counter()
+        for text, offset in chunks:
+            # Keep the recorded pacing, stretched to the simulated total latency
+            delay = offset / recorded_total * elapsed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            yield text
+        return fixture["response"]
+
+
+def _message(text, payload):
+    prompt_chars = len(payload.get("system", "")) + sum(len(m["content"]) for m in payload["messages"])
+    return {
+        "content": [{"type": "text", "text": text}],
+        "model": payload.get("model"),
+        "usage": {"input_tokens": prompt_chars // 4, "output_tokens": len(text) // 4},
+    }
+
+
+class TransportStats:
+    """Thread-safe counters of API calls, wall time and token usage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.seconds = 0.0
+            self.input_tokens = 0
+            self.output_tokens = 0
+
+    def record(self, elapsed, response_data=None):
+        usage = (response_data or {}).get("usage") or {}
+        with self._lock:
+            self.calls += 1
+            self.errors += response_data is None
+            self.seconds += elapsed
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "seconds": self.seconds,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+            }
+
+
+stats = TransportStats()
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures or slow
+    calls; open -> half-open after ``reset_timeout`` seconds, when one probe
+    call is let through; half-open -> closed on success, open on failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, latency_threshold=30.0, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self.transitions = {}
+        self._probe_in_flight = False
+
+    def _transition(self, state):
+        # Called with the lock held
+        key = f"{self.state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        logger.warning("Claude API circuit breaker %s", key)
+        self.state = state
+        if state == self.OPEN:
+            self.opened_at = self._clock()
+        elif state == self.CLOSED:
+            self.failures = 0
+
+    def retry_after(self):
+        """Seconds until the next probe is allowed (0 when calls are allowed)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_timeout - self._clock())
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self.state == self.OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+                self._transition(self.HALF_OPEN)
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected += 1
+            retry_after = 0.0 if self.state == self.HALF_OPEN else \
+                max(0.0, self.opened_at + self.reset_timeout - self._clock())
+        raise CircuitOpenError(f"The Claude API is unavailable; retrying in {retry_after:.0f}s")
+
+    def after_call(self, elapsed, succeeded):
+        """Record a finished call; ``succeeded`` is False only for failures of the service
+
+        ``elapsed`` is the latency to check, or None for an untimed call.
+        """
+        slow = elapsed is not None and elapsed > self.latency_threshold
+        with self._lock:
+            probe = self._probe_in_flight
+            self._probe_in_flight = False
+            if succeeded and not slow:
+                if self.state != self.CLOSED:
+                    self._transition(self.CLOSED)
+                self.failures = 0
+                return
+            self.failures += 1
+            if probe or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self._transition(self.OPEN)
+
+    def abandon(self):
+        """Forget a call that ended without an outcome, such as a stream the consumer closed"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "rejected_calls": self.rejected,
+                "transitions": dict(self.transitions),
+            }
+
+    def metrics_text(self):
+        """Breaker metrics in the Prometheus text exposition format"""
+        metrics = self.metrics()
+        lines = ["# TYPE hr360_api_breaker_state gauge"]
+        for state in (self.CLOSED, self.OPEN, self.HALF_OPEN):
+            lines.append(f'hr360_api_breaker_state{{state="{state}"}} {int(metrics["state"] == state)}')
+        lines.append("# TYPE hr360_api_breaker_rejected_total counter")
+        lines.append(f"hr360_api_breaker_rejected_total {metrics['rejected_calls']}")
+        lines.append("# TYPE hr360_api_breaker_transitions_total counter")
+        for key, count in sorted(metrics["transitions"].items()):
+            source, target = key.split("->")
+            lines.append(f'hr360_api_breaker_transitions_total{{from="{source}",to="{target}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("HR360_BREAKER_FAILURES", "5")),
+    latency_threshold=float(os.getenv("HR360_BREAKER_LATENCY", "30")),
+    reset_timeout=float(os.getenv("HR360_BREAKER_RESET", "30")),
+)
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def transport_from_env():
+    mode = os.getenv("HR360_TRANSPORT", "http").lower()
+    fixture_dir = os.getenv("HR360_FIXTURES", "fixtures")
+    if mode == "record":
+        return RecordingTransport(fixture_dir)
+    if mode == "replay":
+        latency = os.getenv("HR360_REPLAY_LATENCY")
+        return ReplayTransport(
+            fixture_dir,
+            latency=float(latency) if latency else None,
+            error_rate=float(os.getenv("HR360_REPLAY_ERROR_RATE", "0")),
+        )
+    return HTTPTransport()
+
+
+def get_transport():
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = transport_from_env()
+        return _transport
+
+
+def set_transport(transport):
+    """Replace the process-wide transport (``None`` re-reads the environment)"""
+    global _transport
+    with _transport_lock:
+        _transport = transport
+
+
+_scheduler = None
+
+
+def set_scheduler(scheduler):
+    """Admit every call through a tenant scheduler (see tenants.py); ``None`` admits them directly"""
+    global _scheduler
+    _scheduler = scheduler
+
+
+def _admission(payload, api_key):
+    return _scheduler.slot(api_key, payload) if _scheduler is not None else nullcontext()
+
+
+def _transport_for(api_key, transport):
+    if transport is not None:
+        return transport
+    if _scheduler is not None:
+        return _scheduler.transport_for(api_key, get_transport())
+    return get_transport()
+
+
+def breaker_for(api_key):
+    """The circuit breaker guarding calls made with ``api_key``"""
+    if _scheduler is not None:
+        return _scheduler.breaker_for(api_key)
+    return breaker
+
+
+def create_message(payload, api_key, transport=None):
+    """Send a Messages API payload and return the decoded response body"""
+    call_breaker = breaker_for(api_key)
+    with _admission(payload, api_key) as ticket:
+        call_breaker.before_call()
+        start = time.perf_counter()
+        response_data = None
+        failed = True
+        try:
+            response_data = _transport_for(api_key, transport).send(payload, api_key)
+            failed = False
+            return response_data
+        except ClaudeAPIError as e:
+            failed = e.service_failure
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            # Untimed: the call lasts as long as the generation
+            call_breaker.after_call(None, not failed)
+            stats.record(elapsed, response_data)
+            if ticket is not None:
+                ticket.finish(response_data)
+
+
+def stream_message(payload, api_key, transport=None):
+    """Yield text deltas of a Messages API call and return the final message
+
+    The breaker sees the time to the first token, not the time the consumer
+    takes to render the stream, and a stream the consumer closes early is
+    not recorded at all.
+    """
+    call_breaker = breaker_for(api_key)
+    with _admission(payload, api_key) as ticket:
+        call_breaker.before_call()
+        start = time.perf_counter()
+        first_token = None
+        response_data = None
+        failed = True
+        abandoned = False
+        chunks = _transport_for(api_key, transport).stream(payload, api_key)
+        try:
+            while True:
+                try:
+                    text = next(chunks)
+                except StopIteration as stop:
+                    response_data = stop.value
+                    break
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                yield text
+            failed = False
+            return response_data
+        except GeneratorExit:
+            abandoned = True
+            raise
+        except ClaudeAPIError as e:
+            failed = e.service_failure
+            raise
+        finally:
+            chunks.close()
+            if ticket is not None:
+                ticket.finish(response_data)
+            if abandoned:
+                call_breaker.abandon()
+            else:
+                elapsed = time.perf_counter() - start
+                call_breaker.after_call(first_token if first_token is not None else elapsed, not failed)
+                stats.record(elapsed, response_data)
+
+
+def response_text(response_data):
+    return response_data["content"][0]["text"]
+
+
+def parse_json_response(response, pattern):
+    """Decode the JSON payload of a Claude response, tolerating surrounding prose"""
+    json_match = re.search(pattern, response.replace('\n', ' '), re.DOTALL)
+    return json.loads(json_match.group(0) if json_match else response)
+
+
+def generate(prompt, system_prompt=None, model=DEFAULT_MODEL, api_key=None, transport=None):
+    """Send a prompt and return ``{"text": ..., "usage": ...}``, raising ClaudeAPIError on failure"""
+    response_data = create_message(build_payload(prompt, system_prompt, model), api_key, transport=transport)
+    try:
+        return {"text": response_text(response_data), "usage": response_data.get("usage") or {}}
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        raise ClaudeAPIError(f"Unexpected API response: {response_data}") from e
+
+
+def ask(prompt, system_prompt=None, model=DEFAULT_MODEL, api_key=None, transport=None):
+    """Send a prompt and return the text of the reply, raising ClaudeAPIError on failure"""
+    return generate(prompt, system_prompt, model, api_key, transport)["text"]
@@ -0,0 +1,540 @@
+"""Generation cache shared across app replicas, with stampede protection.
+
+The backend is chosen with ``HR360_CACHE_URL``:
+
+- ``memory://`` (default): in-process, also the stand-in for Redis in tests
+- ``sqlite:///path/to/cache.db``: SQLite in WAL mode, e.g. on a shared volume
+- ``redis://host:6379/0``: any Redis-protocol store (needs the ``redis`` package)
+
+Entries are ``{"text": ..., "stored_at": ...}`` dicts, optionally with extra
+fields such as the API ``usage``, stored as zlib-compressed compact JSON.
+``get_or_generate`` takes a per-key lease lock before generating, so only
+one replica generates a given key while the others wait for its result;
+a streaming holder renews its lease as long as chunks keep arriving.
+Shared counters (``incr``) hold the tenants' daily token usage, so quotas
+hold across replicas.
+
+Entries stored more than ``HR360_CACHE_RETENTION`` seconds ago (default 30
+days) are deleted, at most once per ``EVICT_INTERVAL`` by the writing
+replica, or by Redis itself.  Keep the retention above the app's
+``HR360_CACHE_TTL``, since expired entries are still served while the API
+is degraded.
+"""
+import abc
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+LOCK_TTL = 120.0
+WAIT_TIMEOUT = 150.0
+RETENTION = 30 * 24 * 3600.0
+EVICT_INTERVAL = 3600.0
+
+
+def generation_key(model, system_prompt, prompt):
+    """Cache key of a generation request"""
+    return hashlib.sha256(json.dumps([model, system_prompt, prompt]).encode()).hexdigest()
+
+
+def encode_entry(entry):
+    return zlib.compress(json.dumps(entry, separators=(",", ":")).encode(), 6)
+
+
+def decode_entry(data):
+    return json.loads(zlib.decompress(data))
+
+
+def _collect(chunks):
+    """The text of a chunk generator, with the fields of the dict it returns"""
+    parts = []
+    while True:
+        try:
+            parts.append(next(chunks))
+        except StopIteration as stop:
+            extra = stop.value if isinstance(stop.value, dict) else {}
+            return {**extra, "text": "".join(parts)}
+
+
+class CacheBackend(abc.ABC):
+    """Base class: subclasses implement the raw get/set and lease-lock primitives
+
+    Entries stored more than ``retention`` seconds ago are evicted (None
+    keeps them forever).
+    """
+
+    def __init__(self, retention=None):
+        self.retention = retention
+        self._evicted_at = float("-inf")
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "hits": 0, "misses": 0, "generations": 0,
+            "lock_waits": 0, "lock_wait_seconds": 0.0, "bytes_stored": 0, "evictions": 0,
+        }
+
+    # Primitives
+    @abc.abstractmethod
+    def _get(self, key):
+        """Stored data of ``key``, or None"""
+
+    @abc.abstractmethod
+    def _set(self, key, data, stored_at):
+        """Store ``data`` under ``key``"""
+
+    @abc.abstractmethod
+    def _add(self, key, data, stored_at):
+        """Store ``data`` unless ``key`` has a value; return whether it was stored"""
+
+    @abc.abstractmethod
+    def _evict(self, before):
+        """Delete the entries stored before the ``before`` timestamp; return how many"""
+
+    @abc.abstractmethod
+    def incr(self, key, amount=1):
+        """Add ``amount`` to the counter ``key`` (0 when new) and return its total"""
+
+    @abc.abstractmethod
+    def acquire(self, key, ttl=LOCK_TTL):
+        """Take the lease lock of ``key``; return a token, or None if another holder has it"""
+
+    @abc.abstractmethod
+    def renew(self, key, token, ttl=LOCK_TTL):
+        """Extend a held lease to ``ttl`` seconds from now; return False if it was lost"""
+
+    @abc.abstractmethod
+    def release(self, key, token):
+        """Give up a held lease"""
+
+    @abc.abstractmethod
+    def locked(self, key):
+        """Whether anyone holds the lease of ``key``"""
+
+    # Entries
+    def get(self, key):
+        """Stored entry for ``key`` (fresh or not), or None"""
+        data = self._get(key)
+        return decode_entry(data) if data is not None else None
+
+    def set(self, key, entry):
+        data = encode_entry(entry)
+        self._set(key, data, entry.get("stored_at", time.time()))
+        self._count("bytes_stored", len(data))
+        self._evict_periodically()
+
+    def setdefault(self, key, entry):
+        """Store ``entry`` unless ``key`` has one, and return the stored entry (the first writer wins)"""
+        data = encode_entry(entry)
+        if self._add(key, data, entry.get("stored_at", time.time())):
+            self._count("bytes_stored", len(data))
+            self._evict_periodically()
+            return entry
+        return self.get(key) or entry
+
+    def evict(self, max_age=None):
+        """Delete entries stored more than ``max_age`` seconds ago (default: the retention); return how many"""
+        max_age = max_age if max_age is not None else self.retention
+        if max_age is None:
+            return 0
+        evicted = self._evict(time.time() - max_age)
+        self._count("evictions", evicted)
+        return evicted
+
+    def _evict_periodically(self):
+        if self.retention is None:
+            return
+        with self._metrics_lock:
+            now = time.monotonic()
+            if now - self._evicted_at < EVICT_INTERVAL:
+                return
+            self._evicted_at = now
+        self.evict()
+
+    def get_or_generate(self, key, generate, max_age=None, lock_ttl=LOCK_TTL, wait_timeout=WAIT_TIMEOUT):
+        """Return a fresh entry for ``key``, generating it with ``generate()`` on a miss
+
+        ``generate()`` returns the text, or a dict with ``text`` and extra
+        fields to store with it.  Only the holder of the key's lock generates;
+        other callers, in this or another process, poll for its result.  If
+        the holder fails or the wait times out, the caller generates itself.
+        """
+        entry = self._fresh(key, max_age)
+        if entry is not None:
+            self._count("hits")
+            return entry
+
+        waited_from = None
+        deadline = time.monotonic() + wait_timeout
+        delay = 0.05
+        while True:
+            token = self.acquire(key, lock_ttl)
+            if token is not None:
+                break
+            if waited_from is None:
+                waited_from = time.monotonic()
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+            entry = self._fresh(key, max_age)
+            if entry is not None:
+                self._count_wait(waited_from)
+                self._count("hits")
+                return entry
+            if time.monotonic() > deadline:
+                break
+        if waited_from is not None:
+            self._count_wait(waited_from)
+
+        try:
+            # Another replica may have finished between our miss and the lock
+            entry = self._fresh(key, max_age)
+            if entry is not None:
+                self._count("hits")
+                return entry
+            self._count("misses")
+            generated = generate()
+            entry = dict(generated) if isinstance(generated, dict) else {"text": generated}
+            entry["stored_at"] = time.time()
+            self._count("generations")
+            self.set(key, entry)
+            return entry
+        finally:
+            if token is not None:
+                self.release(key, token)
+
+    def stream_or_generate(self, key, stream, max_age=None, lock_ttl=LOCK_TTL, wait_timeout=WAIT_TIMEOUT):
+        """Like ``get_or_generate``, but pass the chunks of ``stream()`` through as they arrive
+
+        A fresh entry is yielded as a single chunk, and so is the result of
+        another holder of the key's lock.  Only a complete stream is stored,
+        with the fields of the dict ``stream()`` returns, if any.
+        """
+        entry = self._fresh(key, max_age)
+        if entry is not None:
+            self._count("hits")
+            yield entry["text"]
+            return
+
+        token = self.acquire(key, lock_ttl)
+        if token is None:
+            yield self.get_or_generate(key, lambda: _collect(stream()), max_age, lock_ttl, wait_timeout)["text"]
+            return
+        try:
+            self._count("misses")
+            parts = []
+            chunks = stream()
+            renewed_at = time.monotonic()
+            while True:
+                try:
+                    text = next(chunks)
+                except StopIteration as stop:
+                    extra = stop.value if isinstance(stop.value, dict) else {}
+                    break
+                parts.append(text)
+                # Keep the lease while the stream is alive, so a long
+                # generation is not started again by another replica
+                if time.monotonic() - renewed_at > lock_ttl / 3:
+                    self.renew(key, token, lock_ttl)
+                    renewed_at = time.monotonic()
+                yield text
+            self._count("generations")
+            self.set(key, {**extra, "text": "".join(parts), "stored_at": time.time()})
+        finally:
+            self.release(key, token)
+
+    def _fresh(self, key, max_age):
+        entry = self.get(key)
+        if entry is None or (max_age is not None and time.time() - entry["stored_at"] >= max_age):
+            return None
+        return entry
+
+    # Metrics
+    def _count(self, name, amount=1):
+        with self._metrics_lock:
+            self._metrics[name] += amount
+
+    def _count_wait(self, waited_from):
+        with self._metrics_lock:
+            self._metrics["lock_waits"] += 1
+            self._metrics["lock_wait_seconds"] += time.monotonic() - waited_from
+
+    def metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = metrics["hits"] / lookups if lookups else 0.0
+        metrics["backend"] = type(self).__name__
+        return metrics
+
+
+class InProcessBackend(CacheBackend):
+    """Dictionary-backed cache for a single process"""
+
+    def __init__(self, retention=None):
+        super().__init__(retention)
+        self._data = {}
+        self._counters = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        stored = self._data.get(key)
+        return stored[0] if stored is not None else None
+
+    def _set(self, key, data, stored_at):
+        self._data[key] = (data, stored_at)
+
+    def _add(self, key, data, stored_at):
+        stored = (data, stored_at)
+        return self._data.setdefault(key, stored) is stored
+
+    def _evict(self, before):
+        expired = [key for key, (_, stored_at) in list(self._data.items()) if stored_at < before]
+        for key in expired:
+            self._data.pop(key, None)
+        with self._lock:
+            for key in [key for key, (_, created_at) in self._counters.items() if created_at < before]:
+                del self._counters[key]
+        return len(expired)
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            total, created_at = self._counters.get(key, (0, time.time()))
+            self._counters[key] = (total + amount, created_at)
+            return total + amount
+
+    def acquire(self, key, ttl=LOCK_TTL):
+        with self._lock:
+            holder = self._locks.get(key)
+            if holder is not None and holder[1] > time.monotonic():
+                return None
+            token = uuid.uuid4().hex
+            self._locks[key] = (token, time.monotonic() + ttl)
+            return token
+
+    def renew(self, key, token, ttl=LOCK_TTL):
+        with self._lock:
+            holder = self._locks.get(key)
+            if holder is None or holder[0] != token:
+                return False
+            self._locks[key] = (token, time.monotonic() + ttl)
+            return True
+
+    def release(self, key, token):
+        with self._lock:
+            if self._locks.get(key, (None,))[0] == token:
+                del self._locks[key]
+
+    def locked(self, key):
+        with self._lock:
+            holder = self._locks.get(key)
+            return holder is not None and holder[1] > time.monotonic()
+
+
+class SQLiteBackend(CacheBackend):
+    """SQLite cache in WAL mode; safe to share between processes on one volume"""
+
+    def __init__(self, path, retention=None):
+        super().__init__(retention)
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                         "stored_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, token TEXT NOT NULL, "
+                         "expires_at REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL, "
+                         "created_at REAL NOT NULL)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            if "stored_at" not in columns:
+                # Caches from before eviction: their entries age from now
+                conn.execute("ALTER TABLE entries ADD COLUMN stored_at REAL")
+                conn.execute("UPDATE entries SET stored_at = ?", (time.time(),))
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_stored_at ON entries (stored_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key):
+        row = self._connection().execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key, data, stored_at):
+        self._connection().execute("INSERT OR REPLACE INTO entries (key, value, stored_at) VALUES (?, ?, ?)",
+                                   (key, data, stored_at))
+
+    def _add(self, key, data, stored_at):
+        cursor = self._connection().execute(
+            "INSERT OR IGNORE INTO entries (key, value, stored_at) VALUES (?, ?, ?)", (key, data, stored_at))
+        return cursor.rowcount == 1
+
+    def _evict(self, before):
+        conn = self._connection()
+        conn.execute("DELETE FROM counters WHERE created_at < ?", (before,))
+        return conn.execute("DELETE FROM entries WHERE stored_at < ?", (before,)).rowcount
+
+    def incr(self, key, amount=1):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT INTO counters (key, value, created_at) VALUES (?, ?, ?) "
+                         "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value", (key, amount, time.time()))
+            total = conn.execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return total
+
+    def acquire(self, key, ttl=LOCK_TTL):
+        # Wall-clock expiry, since lock holders may live in other processes
+        conn = self._connection()
+        token = uuid.uuid4().hex
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM locks WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute("INSERT OR IGNORE INTO locks (key, token, expires_at) VALUES (?, ?, ?)",
+                                  (key, token, now + ttl))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return token if cursor.rowcount == 1 else None
+
+    def renew(self, key, token, ttl=LOCK_TTL):
+        cursor = self._connection().execute("UPDATE locks SET expires_at = ? WHERE key = ? AND token = ?",
+                                            (time.time() + ttl, key, token))
+        return cursor.rowcount == 1
+
+    def release(self, key, token):
+        self._connection().execute("DELETE FROM locks WHERE key = ? AND token = ?", (key, token))
+
+    def locked(self, key):
+        row = self._connection().execute("SELECT 1 FROM locks WHERE key = ? AND expires_at > ?",
+                                         (key, time.time())).fetchone()
+        return row is not None
+
+
+class RedisBackend(CacheBackend):
+    """Cache in any Redis-protocol store; entries expire through Redis key expiry"""
+
+    # Delete or extend the lock only if it still holds our token
+    _RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+    _RENEW_SCRIPT = ("if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) "
+                     "end return 0")
+
+    def __init__(self, url, prefix="hr360:", retention=None):
+        super().__init__(retention)
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("The redis package is required for redis:// cache URLs") from e
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def _get(self, key):
+        return self._client.get(f"{self._prefix}entry:{key}")
+
+    def _expiry(self, stored_at):
+        # Milliseconds left until the entry is evicted, or None to keep it
+        if self.retention is None:
+            return None
+        return max(1, int((stored_at + self.retention - time.time()) * 1000))
+
+    def _set(self, key, data, stored_at):
+        self._client.set(f"{self._prefix}entry:{key}", data, px=self._expiry(stored_at))
+
+    def _add(self, key, data, stored_at):
+        return bool(self._client.set(f"{self._prefix}entry:{key}", data, nx=True, px=self._expiry(stored_at)))
+
+    def _evict(self, before):
+        # Redis expires the entries itself
+        return 0
+
+    def incr(self, key, amount=1):
+        counter = f"{self._prefix}counter:{key}"
+        pipeline = self._client.pipeline()
+        pipeline.incrby(counter, amount)
+        if self.retention is not None:
+            pipeline.expire(counter, int(self.retention))
+        return int(pipeline.execute()[0])
+
+    def acquire(self, key, ttl=LOCK_TTL):
+        token = uuid.uuid4().hex
+        if self._client.set(f"{self._prefix}lock:{key}", token, nx=True, px=int(ttl * 1000)):
+            return token
+        return None
+
+    def renew(self, key, token, ttl=LOCK_TTL):
+        return bool(self._client.eval(self._RENEW_SCRIPT, 1, f"{self._prefix}lock:{key}", token, int(ttl * 1000)))
+
+    def release(self, key, token):
+        self._client.eval(self._RELEASE_SCRIPT, 1, f"{self._prefix}lock:{key}", token)
+
+    def locked(self, key):
+        return bool(self._client.exists(f"{self._prefix}lock:{key}"))
+
+
+def backend_from_url(url=None):
+    """Create the cache backend for ``url`` (default: ``HR360_CACHE_URL``)"""
+    url = url if url is not None else os.getenv("HR360_CACHE_URL", "memory://")
+    retention = float(os.getenv("HR360_CACHE_RETENTION", str(RETENTION)))
+    if not url or url.startswith("memory://"):
+        return InProcessBackend(retention)
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):], retention)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url, retention=retention)
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    import tempfile
+
+    def replica(path, barrier, results):
+        backend = SQLiteBackend(path)
+        barrier.wait()
+
+        def generate():
+            time.sleep(0.5)
+            return "generated " * 200
+        start = time.perf_counter()
+        backend.get_or_generate("popular-role", generate)
+        results.put((time.perf_counter() - start, backend.metrics()))
+
+    path = os.path.join(tempfile.mkdtemp(), "cache.db")
+    replicas = 8
+    barrier = multiprocessing.Barrier(replicas)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=replica, args=(path, barrier, results)) for _ in range(replicas)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    generations = sum(metrics["generations"] for _, metrics in outcomes)
+    waits = sum(metrics["lock_waits"] for _, metrics in outcomes)
+    entry_bytes = len(SQLiteBackend(path)._get("popular-role"))
+    print(f"{replicas} replicas, one popular key: {generations} generation(s), {waits} lock wait(s), "
+          f"slowest replica {max(elapsed for elapsed, _ in outcomes):.2f}s")
+    print(f"stored entry: {entry_bytes} bytes compressed from {len(json.dumps({'text': 'generated ' * 200}))}")
+
+    backend = SQLiteBackend(path)
+    start = time.perf_counter()
+    for i in range(2_000):
+        backend.get_or_generate("popular-role", lambda: "unused")
+    print(f"hit latency: {(time.perf_counter() - start) / 2_000 * 1e6:.0f} us per lookup, "
+          f"hit rate {backend.metrics()['hit_rate']:.0%}")
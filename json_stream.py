@@ -0,0 +1,248 @@
+"""Incremental JSON parsing of streamed Claude responses.
+
+``JSONStreamParser`` is fed text chunks as they arrive and reports every
+array element and object member as soon as its value is complete, so the
+structured tabs can render skills, job boards and questions one by one.
+Prose before the JSON value is skipped, like ``parse_json_response`` does;
+everything after the value is ignored.  Literal newlines inside strings are
+accepted, as the model sometimes emits them.
+
+Events are ``(path, value)`` pairs where ``path`` holds the object keys and
+array indexes leading to the value: ``("skills", "Circuit Analysis")`` for a
+member of the ``skills`` object, ``(3,)`` for the fourth element of a
+top-level array.
+"""
+import json
+
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = _WHITESPACE + ",]}"
+
+
+class JSONStreamError(ValueError):
+    """The stream is not valid JSON, or ended before the value was complete"""
+
+    def __init__(self, message, position=None):
+        super().__init__(message if position is None else f"{message} at character {position}")
+        self.position = position
+
+
+class _Frame:
+    __slots__ = ("kind", "path", "start", "state", "key", "count")
+
+    def __init__(self, kind, path, start):
+        self.kind = kind
+        self.path = path
+        self.start = start
+        # Arrays: "value" or "comma"; objects: "key", "colon", "value" or "comma"
+        self.state = "value" if kind == "[" else "key"
+        self.key = None
+        self.count = 0
+
+    def child_path(self):
+        return self.path + ((self.key if self.kind == "{" else self.count),)
+
+
+class JSONStreamParser:
+    """Push parser yielding completed array elements and object members"""
+
+    def __init__(self):
+        self.text = ""
+        self.value = None
+        self.done = False
+        self._position = 0
+        self._stack = []
+        self._string_start = None
+        self._escaped = False
+        self._scalar_start = None
+
+    def feed(self, chunk):
+        """Consume a text chunk and return the ``(path, value)`` events it completed"""
+        self.text += chunk
+        events = []
+        text = self.text
+        i = self._position
+        end = len(text)
+        while i < end and not self.done:
+            char = text[i]
+
+            if self._string_start is not None:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._end_string(i + 1, events)
+                i += 1
+                continue
+
+            if self._scalar_start is not None:
+                if char not in _DELIMITERS:
+                    i += 1
+                    continue
+                self._end_scalar(i, events)
+
+            if not self._stack:
+                # Skip prose until the top-level array or object opens
+                if char in "[{":
+                    self._stack.append(_Frame(char, (), i))
+                i += 1
+                continue
+
+            frame = self._stack[-1]
+            if char in _WHITESPACE:
+                pass
+            elif char == '"':
+                if frame.state not in ("key", "value"):
+                    raise JSONStreamError("Unexpected string", i)
+                self._string_start = i
+            elif char in "[{":
+                if frame.state != "value":
+                    raise JSONStreamError(f"Unexpected {char!r}", i)
+                self._stack.append(_Frame(char, frame.child_path(), i))
+            elif char in "]}":
+                self._close(char, i, events)
+            elif char == ",":
+                if frame.state != "comma":
+                    raise JSONStreamError("Unexpected ','", i)
+                frame.state = "value" if frame.kind == "[" else "key"
+            elif char == ":":
+                if frame.state != "colon":
+                    raise JSONStreamError("Unexpected ':'", i)
+                frame.state = "value"
+            elif frame.state == "value" and (char.isdigit() or char in "-tfn"):
+                self._scalar_start = i
+            else:
+                raise JSONStreamError(f"Unexpected {char!r}", i)
+            i += 1
+        self._position = i
+        return events
+
+    def close(self):
+        """Finish the stream; raises JSONStreamError if the value is incomplete"""
+        if self._scalar_start is not None and len(self._stack) > 0:
+            raise JSONStreamError("Stream ended inside a value", len(self.text))
+        if not self.done:
+            if not self._stack:
+                raise JSONStreamError("No JSON array or object in the response")
+            raise JSONStreamError("Stream ended before the JSON value was complete", len(self.text))
+        return self.value
+
+    def _end_string(self, end, events):
+        frame = self._stack[-1]
+        raw = self.text[self._string_start:end]
+        self._string_start = None
+        try:
+            value = json.loads(raw, strict=False)
+        except json.JSONDecodeError as e:
+            raise JSONStreamError(f"Invalid string: {e.msg}", end) from e
+        if frame.state == "key":
+            frame.key = value
+            frame.state = "colon"
+        else:
+            self._complete(frame, value, events)
+
+    def _end_scalar(self, end, events):
+        raw = self.text[self._scalar_start:end]
+        start = self._scalar_start
+        self._scalar_start = None
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise JSONStreamError(f"Invalid value {raw!r}", start) from e
+        self._complete(self._stack[-1], value, events)
+
+    def _close(self, char, position, events):
+        frame = self._stack[-1]
+        if (frame.kind == "[") != (char == "]"):
+            raise JSONStreamError(f"Mismatched {char!r}", position)
+        # Closing is valid after a value, or straight away in an empty container
+        if frame.state != "comma" and (frame.count or frame.state == "colon"
+                                       or (frame.kind == "{" and frame.state == "value")):
+            raise JSONStreamError(f"Unexpected {char!r}", position)
+        self._stack.pop()
+        try:
+            value = json.loads(self.text[frame.start:position + 1], strict=False)
+        except json.JSONDecodeError as e:
+            raise JSONStreamError(f"Invalid value: {e.msg}", frame.start + e.pos) from e
+        if self._stack:
+            self._complete(self._stack[-1], value, events)
+        else:
+            self.value = value
+            self.done = True
+
+    def _complete(self, frame, value, events):
+        events.append((frame.child_path(), value))
+        frame.count += 1
+        frame.state = "comma"
+
+
+def iter_json_stream(chunks):
+    """Yield ``(path, value)`` events from an iterable of text chunks
+
+    Raises JSONStreamError once the stream turns out to be malformed or
+    truncated; the events yielded up to then are valid.
+    """
+    parser = JSONStreamParser()
+    # Drain the whole stream even after the value closes, so callers that
+    # cache the full response text see all of it
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    return parser.close()
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    def split(text, rng):
+        chunks, i = [], 0
+        while i < len(text):
+            size = rng.randint(1, 8)
+            chunks.append(text[i:i + size])
+            i += size
+        return chunks
+
+    rng = random.Random(0)
+    questions = {
+        "skills": {f"Skill {i}": [f"Question {j} about \"skill\" {i}?" for j in range(3)] for i in range(5)},
+        "general": ["Tell us about a project.", "How do you prioritise?"],
+        "meta": {"count": 17, "ratio": -1.5e3, "draft": False, "owner": None, "tags": []},
+    }
+    response = "Here are the questions:\n" + json.dumps(questions, indent=2) + "\nGood luck!"
+
+    # Chunk boundaries anywhere, including inside strings, escapes and numbers
+    for _ in range(200):
+        events = list(iter_json_stream(split(response, rng)))
+        assert {path[0]: value for path, value in events if len(path) == 1} == questions
+        assert [path for path, _ in events if path[0] == "skills" and len(path) == 2] == \
+            [("skills", skill) for skill in questions["skills"]]
+
+    # Truncated streams yield every member completed before the cut, then fail
+    cut = response.index('"Skill 3"')
+    events = []
+    try:
+        for event in iter_json_stream(split(response[:cut], rng)):
+            events.append(event)
+    except JSONStreamError as e:
+        print(f"truncated: {e}")
+    else:
+        raise AssertionError("truncated stream was accepted")
+    assert [path for path, _ in events if len(path) == 2] == [("skills", f"Skill {i}") for i in range(3)]
+
+    for bad in ['["a", "b",]', '["a" "b"]', '{"a": 1]', '{"a" 1}', '[1, tru]', '{"a": "b\\x"}', 'no json here']:
+        try:
+            list(iter_json_stream(split(bad, rng)))
+        except JSONStreamError as e:
+            print(f"malformed {bad!r}: {e}")
+        else:
+            raise AssertionError(f"malformed stream was accepted: {bad}")
+
+    # Parsing cost per chunk for a long response
+    response = json.dumps([{"name": f"Job Board {i}", "why": "Strong reach among engineers. " * 8}
+                           for i in range(200)])
+    chunks = split(response, rng)
+    start = time.perf_counter()
+    events = list(iter_json_stream(chunks))
+    elapsed = time.perf_counter() - start
+    print(f"{len(response):,} chars in {len(chunks):,} chunks: {elapsed * 1e3:.1f} ms, "
+          f"{elapsed / len(chunks) * 1e6:.1f} us per chunk, {len(events)} events")
@@ -0,0 +1,250 @@
+"""Speculative prefetch of the generations a user is likely to request next.
+
+Once a role and level have been generated in one tab, the other levels'
+profiles and the other tabs' prompts for the same role and level are
+generated on a small background pool and stored in the generation cache,
+so they are cache hits when the user gets there.
+
+Prefetching is low priority: it waits while interactive requests are in
+flight, stops when the rolling token budget is spent, and reports its hit
+rate and wasted-token rate so the policy can be tuned.
+"""
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import claude_api
+import prompts
+from tenants import background
+from generation_cache import generation_key
+
+# Rough output size used to decide whether a prefetch fits in the budget
+EXPECTED_OUTPUT_TOKENS = 1000
+
+_foreground_calls = 0
+_foreground_idle = threading.Condition()
+
+
+@contextmanager
+def foreground():
+    """Mark an interactive API call; prefetches wait until none are in flight"""
+    global _foreground_calls
+    with _foreground_idle:
+        _foreground_calls += 1
+    try:
+        yield
+    finally:
+        with _foreground_idle:
+            _foreground_calls -= 1
+            _foreground_idle.notify_all()
+
+
+def _wait_for_idle(timeout):
+    with _foreground_idle:
+        _foreground_idle.wait_for(lambda: _foreground_calls == 0, timeout=timeout)
+
+
+class BudgetExhausted(Exception):
+    pass
+
+
+class Prefetcher:
+    """Background generation of likely next requests into ``cache``
+
+    ``token_budget`` caps the input + output tokens spent on prefetches per
+    ``window`` seconds.  Every interactive lookup should be reported with
+    ``record_use`` so prefetch hits can be counted.
+    """
+
+    def __init__(self, cache, max_workers=1, token_budget=200_000, window=3600.0, max_age=None,
+                 idle_timeout=30.0):
+        self.cache = cache
+        self.token_budget = token_budget
+        self.window = window
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hr360-prefetch")
+        self._lock = threading.Lock()
+        self._spending = collections.deque()
+        self._scheduled = set()
+        self._prefetched = {}
+        self._in_flight = set()
+        self._claimed = set()
+        self._counts = {"tasks": 0, "prefetched": 0, "already_cached": 0, "over_budget": 0, "errors": 0,
+                        "hits": 0, "tokens_spent": 0, "tokens_used": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def _spent_in_window(self):
+        # Called with the lock held
+        horizon = time.monotonic() - self.window
+        while self._spending and self._spending[0][0] < horizon:
+            self._spending.popleft()
+        return sum(tokens for _, tokens in self._spending)
+
+    def fetch(self, prompt, system_prompt=None, model=claude_api.DEFAULT_MODEL, api_key=None):
+        """Generate one prompt into the cache (unless fresh) and return its text"""
+        key = generation_key(model, system_prompt, prompt)
+        entry = self.cache.get(key)
+        if entry is not None and (self.max_age is None or time.time() - entry["stored_at"] < self.max_age):
+            self._count("already_cached")
+            return entry["text"]
+
+        _wait_for_idle(self.idle_timeout)
+        estimate = (len(prompt) + len(system_prompt or "")) // 4 + EXPECTED_OUTPUT_TOKENS
+        with self._lock:
+            if self._spent_in_window() + estimate > self.token_budget:
+                self._counts["over_budget"] += 1
+                raise BudgetExhausted()
+
+        usage = {}
+
+        def generate():
+            generated = claude_api.generate(prompt, system_prompt, model, api_key=api_key)
+            usage.update(generated["usage"])
+            return generated
+
+        with self._lock:
+            self._in_flight.add(key)
+        try:
+            entry = self.cache.get_or_generate(key, generate, max_age=self.max_age)
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+                claimed = key in self._claimed
+                self._claimed.discard(key)
+                if usage:
+                    tokens = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+                    self._spending.append((time.monotonic(), tokens))
+                    self._counts["prefetched"] += 1
+                    self._counts["tokens_spent"] += tokens
+                    if claimed:
+                        # The user asked for it while it was being generated
+                        self._counts["hits"] += 1
+                        self._counts["tokens_used"] += tokens
+                    else:
+                        self._prefetched[key] = tokens
+        return entry["text"]
+
+    def submit(self, name, task, api_key):
+        """Run ``task(fetch)`` in the background once per ``name``"""
+        with self._lock:
+            if name in self._scheduled:
+                return
+            self._scheduled.add(name)
+            self._counts["tasks"] += 1
+
+        def fetch(prompt, system_prompt=None, model=claude_api.DEFAULT_MODEL):
+            return self.fetch(prompt, system_prompt, model, api_key=api_key)
+
+        def run():
+            try:
+                # Prefetches queue behind the key's interactive calls
+                with background():
+                    task(fetch)
+            except BudgetExhausted:
+                pass
+            except Exception:
+                self._count("errors")
+            finally:
+                # Allow the same work to be scheduled again after the cache entries expire
+                with self._lock:
+                    self._scheduled.discard(name)
+
+        self._executor.submit(run)
+
+    def schedule_role(self, role, level, api_key, current_tab=None):
+        """Prefetch the other levels and the other tabs for ``role`` at ``level``"""
+        for tab, task in role_prefetch_tasks(role, level):
+            if tab != current_tab:
+                self.submit(f"{tab}|{role}|{level}", task, api_key)
+
+    def record_use(self, key):
+        """Report an interactive lookup of ``key`` to count prefetch hits"""
+        with self._lock:
+            if key in self._in_flight:
+                self._claimed.add(key)
+                return
+            tokens = self._prefetched.pop(key, None)
+            if tokens is not None:
+                self._counts["hits"] += 1
+                self._counts["tokens_used"] += tokens
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._counts)
+            metrics["budget_remaining"] = max(0, self.token_budget - self._spent_in_window())
+        spent = metrics["tokens_spent"]
+        metrics["hit_rate"] = metrics["hits"] / metrics["prefetched"] if metrics["prefetched"] else 0.0
+        metrics["wasted_token_rate"] = (spent - metrics["tokens_used"]) / spent if spent else 0.0
+        return metrics
+
+
+def role_prefetch_tasks(role, level):
+    """(tab, task) pairs, most likely next step first, for a role and level"""
+
+    def profile(profile_level):
+        def task(fetch):
+            response = fetch(*prompts.skill_profile_prompt(role, profile_level))
+            skills = claude_api.parse_json_response(response, r'\{.*\}')["skills"]
+            fetch(*prompts.skill_descriptions_prompt(role, profile_level, skills))
+        return task
+
+    def job_poster(fetch):
+        fetch(*prompts.job_description_prompt(role, level))
+        fetch(*prompts.job_boards_prompt(role, level))
+
+    def interview_questions(fetch):
+        response = fetch(*prompts.interview_skills_prompt(role, level))
+        skills = claude_api.parse_json_response(response, r'\[.*\]')
+        fetch(*prompts.interview_questions_prompt(role, level, skills, prompts.DEFAULT_QUESTION_TYPES))
+
+    tasks = [("profile", profile(level))]
+    # Adjacent levels first: Junior -> Mid -> Senior
+    position = prompts.LEVELS.index(level) if level in prompts.LEVELS else 0
+    others = sorted((other for other in prompts.LEVELS if other != level),
+                    key=lambda other: abs(prompts.LEVELS.index(other) - position))
+    tasks += [(f"profile:{other}", profile(other)) for other in others]
+    tasks += [("job_poster", job_poster), ("interview_questions", interview_questions)]
+    return tasks
+
+
+if __name__ == "__main__":
+    import random
+
+    from generation_cache import InProcessBackend
+
+    def canned(payload):
+        prompt = payload["messages"][0]["content"]
+        if "key skills required" in prompt:
+            return '{"skills": ["Circuit Analysis", "Embedded C"], "ratings": [4, 5]}'
+        if "List the 5" in prompt:
+            return '["Circuit Analysis", "Embedded C"]'
+        return '{"Circuit Analysis": "Applies it with guidance"}'
+
+    claude_api.set_transport(claude_api.ReplayTransport(None, latency=0.05, fallback=canned, seed=0))
+    cache = InProcessBackend()
+    prefetcher = Prefetcher(cache, token_budget=50_000, idle_timeout=0.0)
+
+    # Users profile one level, then sometimes move to the next level or to interview questions
+    rng = random.Random(0)
+    roles = [f"Role {i}" for i in range(20)]
+    for role in roles:
+        prefetcher.schedule_role(role, "Junior", "demo", current_tab="profile")
+    prefetcher._executor.shutdown(wait=True)
+    for role in roles:
+        if rng.random() < 0.6:
+            prompt, system_prompt = prompts.skill_profile_prompt(role, "Mid")
+            prefetcher.record_use(generation_key(claude_api.DEFAULT_MODEL, system_prompt, prompt))
+        if rng.random() < 0.3:
+            prompt, system_prompt = prompts.interview_skills_prompt(role, "Junior")
+            prefetcher.record_use(generation_key(claude_api.DEFAULT_MODEL, system_prompt, prompt))
+    metrics = prefetcher.metrics()
+    print(f"{metrics['tasks']} tasks, {metrics['prefetched']} prefetched, {metrics['over_budget']} over budget, "
+          f"{metrics['errors']} errors")
+    print(f"hit rate {metrics['hit_rate']:.0%}, wasted tokens {metrics['wasted_token_rate']:.0%} "
+          f"of {metrics['tokens_spent']:,}")
@@ -0,0 +1,155 @@
+"""Rerun profiling for the Streamlit script.
+
+A ``RerunProfiler`` is created at the top of every script run.  When it is
+enabled, ``section(name)`` times a named phase (API call, JSON parsing, chart
+rendering, PNG encoding, a whole tab...) and ``capture=True`` additionally
+records a cProfile of the full rerun.  When disabled, ``section`` returns a
+shared no-op context manager, so instrumented code costs one method call.
+
+Finished reruns are kept in a ``ProfileHistory`` for the in-app panel, which
+lists the slowest sections and offers the cProfile dumps for download
+(open them with ``python -m pstats`` or snakeviz).
+"""
+import collections
+import cProfile
+import io
+import marshal
+import pstats
+import time
+from contextlib import contextmanager, nullcontext
+
+_DISABLED = nullcontext()
+
+
+class RerunProfiler:
+    """Section timers, and optionally a cProfile capture, for one script rerun"""
+
+    def __init__(self, enabled=False, capture=False):
+        self.enabled = enabled or capture
+        self.capture = capture
+        self.sections = []
+        self._depth = 0
+        self._profile = None
+        self._started_at = None
+        self._start = None
+
+    def start(self):
+        if self.enabled:
+            self._started_at = time.time()
+            self._start = time.perf_counter()
+        if self.capture:
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # Another profiler is already active in this thread
+                self._profile = None
+        return self
+
+    def section(self, name):
+        """Context manager timing the phase ``name``; sections may nest"""
+        if not self.enabled:
+            return _DISABLED
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        depth = self._depth
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth = depth
+            self.sections.append((name, depth, time.perf_counter() - start))
+
+    def finish(self):
+        """Stop timing and return the rerun's record, or None when disabled"""
+        if not self.enabled or self._start is None:
+            return None
+        total = time.perf_counter() - self._start
+        self._start = None
+        record = {
+            "started_at": self._started_at,
+            "total": total,
+            "sections": self.sections,
+            # Time not covered by any top-level section: imports, setup, Streamlit overhead
+            "unaccounted": total - sum(seconds for _, depth, seconds in self.sections if depth == 0),
+            "profile": None,
+            "summary": None,
+        }
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.create_stats()
+            # Same format as pstats.Stats.dump_stats, without a temporary file
+            record["profile"] = marshal.dumps(self._profile.stats)
+            out = io.StringIO()
+            pstats.Stats(self._profile, stream=out).sort_stats("cumulative").print_stats(25)
+            record["summary"] = out.getvalue()
+            self._profile = None
+        return record
+
+
+class ProfileHistory:
+    """The most recent rerun records"""
+
+    def __init__(self, size=20):
+        self._records = collections.deque(maxlen=size)
+
+    def add(self, record):
+        if record is not None:
+            self._records.append(record)
+
+    def records(self):
+        return list(self._records)
+
+    def clear(self):
+        self._records.clear()
+
+    def slowest_sections(self, limit=10):
+        """Per-section totals over the kept reruns, slowest (by worst rerun) first"""
+        per_rerun = []
+        for record in self._records:
+            totals = collections.defaultdict(lambda: [0, 0.0])
+            for name, _, seconds in record["sections"]:
+                totals[name][0] += 1
+                totals[name][1] += seconds
+            totals["(outside sections)"] = [1, record["unaccounted"]]
+            per_rerun.append(totals)
+
+        stats = {}
+        for totals in per_rerun:
+            for name, (calls, seconds) in totals.items():
+                row = stats.setdefault(name, {"section": name, "reruns": 0, "calls": 0, "total_s": 0.0, "max_s": 0.0})
+                row["reruns"] += 1
+                row["calls"] += calls
+                row["total_s"] += seconds
+                row["max_s"] = max(row["max_s"], seconds)
+        rows = sorted(stats.values(), key=lambda row: row["max_s"], reverse=True)[:limit]
+        for row in rows:
+            row["mean_s"] = row["total_s"] / row["reruns"]
+        return rows
+
+
+if __name__ == "__main__":
+    # Overhead of an instrumented section when profiling is off and on
+    for enabled in (False, True):
+        profiler = RerunProfiler(enabled=enabled).start()
+        n = 200_000
+        start = time.perf_counter()
+        for _ in range(n):
+            with profiler.section("phase"):
+                pass
+        elapsed = time.perf_counter() - start
+        print(f"enabled={enabled}: {elapsed / n * 1e9:.0f} ns per section")
+
+    profiler = RerunProfiler(capture=True).start()
+    with profiler.section("tab"):
+        with profiler.section("work"):
+            sum(i * i for i in range(200_000))
+    history = ProfileHistory()
+    history.add(profiler.finish())
+    record = history.records()[0]
+    print(f"rerun {record['total'] * 1e3:.1f} ms, profile dump {len(record['profile']):,} bytes")
+    for row in history.slowest_sections():
+        print(f"  {row['section']:<20} max {row['max_s'] * 1e3:.2f} ms")
@@ -0,0 +1,197 @@
+"""Prompt builders for the HR360 use cases.
+
+Each builder returns a ``(prompt, system_prompt)`` tuple so that the same
+text is produced wherever a generation is requested, which keeps cached
+responses reusable across tabs and sessions.
+"""
+
+LEVELS = ["Junior", "Mid", "Senior"]
+
+
+# Case 1: Skill Identifier
+def skill_identifier_prompt(job_role):
+    prompt = f"""
+                You are a skilled HR professional and job analyst. Based on the job role or description below,
+                identify and list the most important technical and soft skills required for this position.
+
+                Job Role/Description: {job_role}
+
+                Please format your response as a JSON array of strings, with each string being a specific skill.
+                Example format: ["Skill 1", "Skill 2", "Skill 3"]
+
+                Provide between 8-12 specific, relevant skills for this role.
+                """
+    system_prompt = "You are an HR skills analyst that identifies required skills for job roles. Always return your answer in valid JSON format as an array of strings."
+    return prompt, system_prompt
+
+
+# Case 2: Skill Profiler
+SKILLS_ASSESSMENT_SYSTEM_PROMPT = "You are a skills assessment expert. Always return your answer in valid JSON format."
+
+
+def skill_profile_prompt(role, level):
+    prompt = f"""
+                You are an expert in skills assessment for technical roles.
+                For the role of {role} at {level} level, please provide:
+
+                1. A list of 8 key skills required for this role
+                2. A rating from 1-10 for each skill based on the expected proficiency level ({level})
+
+                Return your answer as a JSON object with this exact structure:
+                {{
+                    "skills": ["skill1", "skill2", ...],
+                    "ratings": [7, 8, ...]
+                }}
+
+                Junior should have ratings mostly in the 3-5 range, Mid in the 5-8 range, and Senior in the 8-10 range.
+                """
+    return prompt, SKILLS_ASSESSMENT_SYSTEM_PROMPT
+
+
+def skill_descriptions_prompt(role, level, skills):
+    prompt = f"""
+                        For each of these skills for a {level}-level {role}, provide a brief description of what this level of proficiency means.
+                        Skills: {", ".join(skills)}
+
+                        Format your response as a JSON object with skill names as keys and descriptions as values.
+                        Example:
+                        {{
+                            "Skill Name": "Description of what {level} level means for this skill",
+                            ...
+                        }}
+                        """
+    return prompt, SKILLS_ASSESSMENT_SYSTEM_PROMPT
+
+
+def multi_level_profile_prompt(role, levels=LEVELS):
+    level_ratings = ",\n".join(f'                        "{level}": [5, 6, ...]' for level in levels)
+    prompt = f"""
+                You are an expert in skills assessment for technical roles.
+                For the role of {role}, please provide:
+
+                1. A list of 8 key skills required for this role, shared by all of these levels: {", ".join(levels)}
+                2. A rating from 1-10 for each skill at each level, in the same order as the skills
+
+                Return your answer as a JSON object with this exact structure:
+                {{
+                    "skills": ["skill1", "skill2", ...],
+                    "ratings": {{
+{level_ratings}
+                    }}
+                }}
+
+                Junior should have ratings mostly in the 3-5 range, Mid in the 5-8 range, and Senior in the 8-10 range.
+                """
+    return prompt, SKILLS_ASSESSMENT_SYSTEM_PROMPT
+
+
+def multi_level_descriptions_prompt(role, levels, skills):
+    prompt = f"""
+                        For each of these skills for a {role}, provide a brief description of what proficiency means at each of these levels: {", ".join(levels)}.
+                        Skills: {", ".join(skills)}
+
+                        Format your response as a JSON object with skill names as keys and, for each skill, an object with level names as keys and descriptions as values.
+                        Example:
+                        {{
+                            "Skill Name": {{"{levels[0]}": "Description of what {levels[0]} level means for this skill", ...}},
+                            ...
+                        }}
+                        """
+    return prompt, SKILLS_ASSESSMENT_SYSTEM_PROMPT
+
+
+# Case 3: Job Poster
+def job_description_prompt(role, level, company_name="", location=""):
+    prompt = f"""
+                Create a professional job description for a {level}-level {role} position
+                {f'at {company_name}' if company_name else ''}{f' in {location}' if location else ''}.
+
+                Include the following sections:
+                1. Position title
+                2. Location and job type
+                3. About the company (generic if no company name provided)
+                4. Responsibilities
+                5. Required skills with proficiency levels
+                6. Qualifications and experience
+                7. Application instructions
+
+                Format the job description in Markdown with appropriate headers and bullet points.
+                Make it professional but engaging.
+                """
+    return prompt, None
+
+
+def job_boards_prompt(role, level):
+    prompt = f"""
+                    Recommend 5 specific job boards that would be most effective for posting a job listing for a {level}-level {role} position.
+
+                    For each job board, explain why it's particularly suitable for this role.
+
+                    Format your response as a JSON array of objects with "name" and "why" properties:
+                    [
+                      {{"name": "Job Board Name", "why": "Reason this board is good for this role"}},
+                      ...
+                    ]
+                    """
+    system_prompt = "You are an HR recruitment expert. Always return your answer in valid JSON format."
+    return prompt, system_prompt
+
+
+# Case 4: Interview Questions
+INTERVIEW_SYSTEM_PROMPT = "You are a technical recruiter creating interview questions. Return only valid JSON."
+QUESTION_TYPES = ["Technical", "Behavioral", "Problem-solving", "Team Collaboration"]
+DEFAULT_QUESTION_TYPES = ["Technical", "Problem-solving"]
+
+
+def interview_skills_prompt(role, level):
+    prompt = f"""
+                        List the 5 most important skills for a {level}-level {role}.
+                        Return only a JSON array of strings.
+                        Example: ["Skill 1", "Skill 2", "Skill 3", "Skill 4", "Skill 5"]
+                        """
+    return prompt, INTERVIEW_SYSTEM_PROMPT
+
+
+def interview_questions_prompt(role, level, skills, question_types):
+    prompt = f"""
+                                Create interview questions for a {level}-level {role} position.
+
+                                Key skills for this role: {", ".join(skills)}
+                                Question types needed: {", ".join(question_types)}
+
+                                Generate 2-3 questions for each skill, focusing on the selected question types.
+                                Also include 2-3 general questions that cover the selected question types.
+
+                                Format your response as a JSON object with this structure:
+                                {{
+                                  "skills": {{
+                                    "Skill Name 1": ["Question 1", "Question 2", ...],
+                                    "Skill Name 2": ["Question 1", "Question 2", ...],
+                                    ...
+                                  }},
+                                  "general": ["General question 1", "General question 2", ...]
+                                }}
+
+                                Questions should be appropriate for the {level} experience level.
+                                """
+    return prompt, INTERVIEW_SYSTEM_PROMPT
+
+
+# Case 5: Development Plan
+def development_plan_prompt(role, level, employee_name, feedback):
+    prompt = f"""
+                        Create a personalized development plan for a {level}-level {role}
+                        {f'named {employee_name}' if employee_name else ''} based on the following performance feedback:
+
+                        "{feedback}"
+
+                        Include:
+                        1. A summary of strengths and areas for improvement
+                        2. Specific development goals for each area needing improvement
+                        3. Recommended learning resources (courses, books, etc.)
+                        4. Actionable milestones with a 3-month timeline
+                        5. Key performance indicators to measure progress
+
+                        Format the development plan in detailed Markdown with clear sections and bullet points.
+                        """
+    return prompt, None
@@ -0,0 +1,206 @@
+"""Role normalization and near-duplicate lookup.
+
+Free-text roles such as "Electrical Engineer - Motor Control",
+"electrical engineer (motor control)" and "Motor Control Electrical Engineer"
+are mapped onto one canonical key (case, punctuation, stop words and token
+order are ignored).  Misspelled tokens are corrected against the vocabulary
+of stored roles through a character-trigram index, so "Electrcal Engineer"
+folds into "Electrical Engineer" while "Senior" never folds into "Junior".
+Only likely typos are corrected: a token one edit (a dropped, added, changed
+or swapped letter) away from a known one with the same first letter, so
+"Electrician" and "Mechanic" stay distinct from "Electrical" and "Mechanical".
+
+Run ``python role_normalizer.py`` to benchmark lookups at 100k stored roles.
+"""
+import re
+import threading
+import time
+import unicodedata
+
+_STOPWORDS = {"a", "an", "and", "at", "for", "in", "of", "on", "the", "to", "with"}
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+
+# Tokens shorter than this are never spell-corrected ("qa", "ml", "hr", ...)
+_MIN_CORRECTABLE = 4
+
+
+def role_tokens(role):
+    """Lower-case, accent-stripped tokens of a role without stop words"""
+    text = unicodedata.normalize("NFKD", role).encode("ascii", "ignore").decode().lower()
+    return [token for token in _TOKEN_RE.findall(text) if token not in _STOPWORDS]
+
+
+def normalize_role(role):
+    """Canonical key of a role: its distinct tokens in sorted order"""
+    return " ".join(sorted(set(role_tokens(role))))
+
+
+def one_edit_apart(a, b):
+    """Whether ``a`` and ``b`` differ by one dropped, added, changed or swapped letter"""
+    if a == b or abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while a[i:i + 1] == b[i:i + 1]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    return a[i + 1:] == b[i + 1:] or (a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2]
+                                       and a[i + 2:] == b[i + 2:])
+
+
+def _trigrams(token):
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class RoleIndex:
+    """Thread-safe store of canonical role keys with near-duplicate lookup
+
+    Only tokens that have never been seen are corrected, and only onto a
+    known token one edit away with the same first letter.  Known tokens are
+    trusted as-is.
+
+    The phrasing used for a key is the first one seen.  With ``phrasings``,
+    a generation cache backend, that choice is shared with the other
+    replicas, so they all build the same prompt text for the same role.
+    """
+
+    def __init__(self, phrasings=None):
+        self.phrasings = phrasings
+        self._roles = {}
+        self._vocabulary = set()
+        self._trigram_index = {}
+        self._corrections = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._roles)
+
+    def __contains__(self, role):
+        return self.lookup(role) is not None
+
+    def representative(self, key):
+        """First phrasing stored for a canonical key"""
+        return self._roles.get(key)
+
+    def key(self, role):
+        """Canonical key of a role after correcting misspelled tokens"""
+        tokens = {self._correct(token) for token in role_tokens(role)}
+        return " ".join(sorted(tokens))
+
+    def lookup(self, role):
+        """Return the canonical key of a stored near-duplicate, or None"""
+        key = self.key(role)
+        return key if key in self._roles else None
+
+    def add(self, role):
+        """Store a role (unless a near-duplicate exists) and return its canonical key"""
+        key = self.key(role)
+        if not key or key in self._roles:
+            return key
+        with self._lock:
+            if key not in self._roles:
+                self._roles[key] = role.strip()
+                for token in key.split():
+                    self._learn(token)
+        return key
+
+    def canonicalize(self, role):
+        """Map a free-text role onto the stored phrasing of its canonical key"""
+        key = self.add(role)
+        phrasing = self._roles.get(key, role)
+        if self.phrasings is None or not key:
+            return phrasing
+        # The first replica to store a phrasing for the key wins.  Not cached
+        # here, so every replica follows once the cache evicts the entry
+        entry = self.phrasings.setdefault(f"role:{key}", {"text": phrasing, "stored_at": time.time()})
+        return entry["text"]
+
+    def _learn(self, token):
+        if token in self._vocabulary:
+            return
+        self._vocabulary.add(token)
+        self._corrections.clear()
+        for trigram in _trigrams(token):
+            self._trigram_index.setdefault(trigram, set()).add(token)
+
+    def _correct(self, token):
+        if token in self._vocabulary or len(token) < _MIN_CORRECTABLE:
+            return token
+        cached = self._corrections.get(token)
+        if cached is not None:
+            return cached
+
+        shared = {}
+        with self._lock:
+            for trigram in _trigrams(token):
+                for candidate in self._trigram_index.get(trigram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+
+        # Only the few candidates sharing the most trigrams are worth an edit
+        # check; ties go to the alphabetically first, so the result does not
+        # depend on the order the vocabulary was learned in
+        best = token
+        for candidate in sorted(shared, key=lambda candidate: (-shared[candidate], candidate))[:10]:
+            if candidate[0] == token[0] and one_edit_apart(candidate, token):
+                best = candidate
+                break
+        self._corrections[token] = best
+        return best
+
+
+if __name__ == "__main__":
+    import random
+    import statistics
+    import time
+
+    rng = random.Random(7)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    domain_words = [
+        "electrical", "mechanical", "software", "hardware", "data", "process", "quality", "test",
+        "firmware", "systems", "network", "security", "cloud", "embedded", "control", "motor",
+        "power", "signal", "product", "design", "research", "field", "service", "sales",
+        "supply", "chain", "finance", "marketing", "payroll", "talent", "robotics", "vision",
+    ]
+    # Pad the vocabulary with pseudo-words so 100k roles are not all near each other
+    domain_words += ["".join(rng.choice(letters) for _ in range(rng.randint(5, 10))) for _ in range(3_000)]
+    titles = ["engineer", "analyst", "specialist", "architect", "technician", "scientist", "consultant"]
+    seniorities = ["", "Junior ", "Senior ", "Lead ", "Principal "]
+
+    roles = set()
+    while len(roles) < 100_000:
+        area = " ".join(rng.sample(domain_words, rng.randint(2, 3))).title()
+        roles.add(f"{rng.choice(seniorities)}{area} {rng.choice(titles).title()}")
+    roles = sorted(roles)
+
+    index = RoleIndex()
+    start = time.perf_counter()
+    for role in roles:
+        index.add(role)
+    build_seconds = time.perf_counter() - start
+
+    def perturb(role):
+        tokens = role.split()
+        rng.shuffle(tokens)
+        longest = max(range(len(tokens)), key=lambda i: len(tokens[i]))
+        word = tokens[longest]
+        position = rng.randrange(1, len(word))
+        tokens[longest] = word[:position] + word[position + 1:]
+        return " - ".join(tokens).lower()
+
+    queries = [perturb(rng.choice(roles)) for _ in range(5_000)]
+    timings = []
+    hits = 0
+    for query in queries:
+        start = time.perf_counter()
+        hits += index.lookup(query) is not None
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    print(f"stored roles:   {len(index):,} ({len(roles):,} inserted) in {build_seconds:.1f}s")
+    print(f"lookup p50:     {statistics.median(timings) * 1e6:.0f} us")
+    print(f"lookup p99:     {timings[int(len(timings) * 0.99)] * 1e6:.0f} us")
+    print(f"near-dup hits:  {hits / len(queries):.1%} of {len(queries):,} shuffled, misspelled queries")
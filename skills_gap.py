@@ -0,0 +1,264 @@
+"""Team skills-gap analytics against Skill Profiler target ratings.
+
+Employee ratings are read from a CSV or Parquet export in either long format
+(``employee, team, skill, rating``) or wide format (``employee, team`` plus
+one column per skill), aligned onto the skills of a role profile and turned
+into an employees x skills matrix.  All gap, coverage and priority figures
+are computed on that matrix with NumPy/pandas, without per-employee loops.
+"""
+import difflib
+
+import numpy as np
+import pandas as pd
+
+from skills_kb import skill_key
+
+ID_COLUMNS = ("employee", "team")
+
+# Repeated text columns are read as categoricals, so their codes come for free
+CATEGORICAL_COLUMNS = ("employee", "team", "skill")
+
+
+def load_ratings(source, filename=None):
+    """Read a CSV or Parquet export of employee skill ratings"""
+    name = str(filename or getattr(source, "name", None) or source).lower()
+    if name.endswith((".parquet", ".pq")):
+        ratings = pd.read_parquet(source)
+    else:
+        # Column names are matched case-insensitively, so read the header first
+        header = pd.read_csv(source, nrows=0).columns
+        if hasattr(source, "seek"):
+            source.seek(0)
+        ratings = pd.read_csv(source, dtype={
+            column: "category" for column in header if str(column).strip().lower() in CATEGORICAL_COLUMNS
+        })
+
+    ratings.columns = [str(column).strip() for column in ratings.columns]
+    lower = {column.lower(): column for column in ratings.columns}
+    if "employee" not in lower:
+        raise ValueError("The ratings file needs an 'employee' column")
+    ratings = ratings.rename(columns={
+        lower[column]: column for column in ("employee", "team", "skill", "rating") if column in lower
+    })
+    if "team" not in ratings.columns:
+        ratings["team"] = "All"
+    return ratings
+
+
+def align_skills(available, profile_skills, cutoff=0.8):
+    """Map each profile skill onto every matching skill name found in the ratings
+
+    Returns ``{profile skill: [names]}``: all spellings of a skill that differ
+    only in case or punctuation are listed, and one name may match several
+    profile skills.
+    """
+    by_key = {}
+    for name in available:
+        by_key.setdefault(skill_key(str(name)), []).append(name)
+    keys = list(by_key)
+    mapping = {}
+    for skill in profile_skills:
+        key = skill_key(skill)
+        if key in by_key:
+            mapping[skill] = by_key[key]
+            continue
+        close = difflib.get_close_matches(key, keys, n=1, cutoff=cutoff)
+        if close:
+            mapping[skill] = by_key[close[0]]
+    return mapping
+
+
+def _factorize(values):
+    # Categorical columns already carry their codes; anything else is hashed
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy().astype(np.int64)
+        categories = values.cat.categories
+        # Drop unused categories with a bincount (remove_unused_categories sorts every code)
+        used = np.bincount(codes[codes >= 0], minlength=len(categories)) > 0
+        if not used.all():
+            codes = np.append(np.cumsum(used) - 1, -1)[codes]
+            categories = categories[used]
+        return codes, categories
+    return pd.factorize(values)
+
+
+def _group_sums(codes, n_groups, *arrays):
+    """Column sums of each rows x columns array per group code, as n_groups x columns arrays"""
+    n_columns = arrays[0].shape[1]
+    # One flat bincount per array: cell (row, column) adds to bin (code of row, column)
+    bins = (codes[:, None] * n_columns + np.arange(n_columns)).ravel()
+    return [np.bincount(bins, weights=values.ravel(), minlength=n_groups * n_columns).reshape(n_groups, n_columns)
+            for values in arrays]
+
+
+def rating_matrix(ratings, profile_skills):
+    """Return employees, their teams and an employees x skills matrix (NaN = not rated)"""
+    if {"skill", "rating"} <= set(ratings.columns):
+        employee_codes, employees = _factorize(ratings["employee"])
+        skill_codes, skill_names = _factorize(ratings["skill"])
+
+        # Align the few distinct skill names, then map every row through the codes
+        mapping = align_skills(skill_names, profile_skills)
+        columns_of = {}
+        for j, target in enumerate(profile_skills):
+            for source in mapping.get(target, ()):
+                columns_of.setdefault(source, []).append(j)
+
+        matrix = np.full((len(employees), len(profile_skills)), np.nan)
+        values = pd.to_numeric(ratings["rating"], errors="coerce").to_numpy(dtype=float)
+        # A name matching several profile skills fills each of them: pass k
+        # writes the k-th column of every name
+        for k in range(max(map(len, columns_of.values()), default=0)):
+            column_codes = [columns_of[name][k] if len(columns_of.get(name, ())) > k else -1 for name in skill_names]
+            columns = np.append(np.array(column_codes, dtype=np.int64), -1)[skill_codes]
+            keep = (columns >= 0) & (employee_codes >= 0)
+            matrix[employee_codes[keep], columns[keep]] = values[keep]
+
+        # Team of each employee, through the codes so no per-row strings are built
+        team_codes, team_names = _factorize(ratings["team"])
+        team_of = np.full(len(employees), -1, dtype=np.int64)
+        known = employee_codes >= 0
+        team_of[employee_codes[known]] = team_codes[known]
+        teams = np.append(np.asarray(team_names, dtype=object), None)[team_of]
+        return np.asarray(employees, dtype=object), teams, matrix
+
+    skill_columns = [column for column in ratings.columns if column not in ID_COLUMNS]
+    mapping = align_skills(skill_columns, profile_skills)
+    matrix = np.full((len(ratings), len(profile_skills)), np.nan)
+    matched = [j for j, skill in enumerate(profile_skills) if skill in mapping]
+    if matched:
+        # One block conversion instead of a strided write per column
+        block = ratings[[mapping[profile_skills[j]][0] for j in matched]]
+        if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in block.dtypes):
+            block = block.apply(pd.to_numeric, errors="coerce")
+        matrix[:, matched] = block.to_numpy(dtype=float)
+        # Other spellings of a skill fill the ratings the first one lacks
+        for j in matched:
+            for source in mapping[profile_skills[j]][1:]:
+                other = pd.to_numeric(ratings[source], errors="coerce").to_numpy(dtype=float)
+                matrix[:, j] = np.where(np.isnan(matrix[:, j]), other, matrix[:, j])
+    return ratings["employee"].to_numpy(dtype=object), ratings["team"].to_numpy(dtype=object), matrix
+
+
+def analyze_gaps(employees, teams, matrix, profile_skills, targets):
+    """Per-employee and per-team gaps, coverage and ranked development priorities
+
+    Returns a dict of DataFrames:
+
+    - ``employees``: skills rated, coverage (share of rated skills at or above
+      target), mean and total gap and the largest-gap skill per employee
+    - ``teams``: head count, mean coverage and mean gap per team
+    - ``team_ratings``: mean rating per team and skill, for radar overlays
+    - ``priorities``: team/skill pairs ranked by mean gap x share below target,
+      with the whole organisation reported as team ``"All teams"``
+    """
+    skills = np.asarray(profile_skills, dtype=object)
+    targets = np.asarray(targets, dtype=float)
+    teams = pd.Series(teams, dtype=object).fillna("Unassigned").to_numpy()
+
+    rated = ~np.isnan(matrix)
+    # Ratings and gaps with unrated skills as 0, computed once and shared by
+    # every aggregate below (fmax drops the NaN of unrated skills)
+    filled_ratings = np.where(rated, matrix, 0.0)
+    filled_gaps = np.fmax(targets - matrix, 0.0)
+    below = filled_gaps > 0
+    n_rated = rated.sum(axis=1)
+    gap_sums = filled_gaps.sum(axis=1)
+    coverage_num = n_rated - below.sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        coverage = coverage_num / n_rated
+        mean_gap = gap_sums / n_rated
+    employee_frame = pd.DataFrame({
+        "employee": employees,
+        "team": teams,
+        "skills_rated": n_rated,
+        "coverage": coverage,
+        "mean_gap": mean_gap,
+        "total_gap": gap_sums,
+        "top_priority": np.where(gap_sums > 0, skills[filled_gaps.argmax(axis=1)], ""),
+    })
+
+    # Per-team sums with bincount on the team codes instead of pandas groupbys
+    team_codes, team_names = pd.factorize(teams)
+    team_names = np.asarray(team_names, dtype=object)
+    n_teams = len(team_names)
+    gap_totals, below_counts, rated_counts, rating_totals = _group_sums(
+        team_codes, n_teams, filled_gaps, below, rated, filled_ratings)
+    any_rated = n_rated > 0
+    head_count = np.bincount(team_codes, minlength=n_teams)
+    rated_employees = np.bincount(team_codes, weights=any_rated, minlength=n_teams)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        team_ratings = pd.DataFrame(rating_totals / rated_counts, index=team_names, columns=profile_skills)
+        team_frame = pd.DataFrame({
+            "team": team_names,
+            "employees": head_count,
+            "coverage": np.bincount(team_codes, weights=np.where(any_rated, coverage, 0.0),
+                                    minlength=n_teams) / rated_employees,
+            "mean_gap": np.bincount(team_codes, weights=np.where(any_rated, mean_gap, 0.0),
+                                    minlength=n_teams) / rated_employees,
+        })
+    team_frame = team_frame.sort_values(["mean_gap", "team"], ascending=[False, True], ignore_index=True)
+
+    priorities = pd.concat([
+        _priorities(gap_totals.sum(axis=0, keepdims=True), below_counts.sum(axis=0, keepdims=True),
+                    rated_counts.sum(axis=0, keepdims=True), ["All teams"], profile_skills, targets),
+        _priorities(gap_totals, below_counts, rated_counts, team_names, profile_skills, targets),
+    ], ignore_index=True)
+
+    return {
+        "employees": employee_frame,
+        "teams": team_frame,
+        "team_ratings": team_ratings,
+        "priorities": priorities,
+    }
+
+
+def _priorities(gap_sums, below_counts, rated_counts, group_names, profile_skills, targets):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_gap = gap_sums / rated_counts
+        share_below = below_counts / rated_counts
+
+    groups = np.asarray(group_names, dtype=object)
+    n_groups, n_skills = mean_gap.shape
+    result = pd.DataFrame({
+        "team": np.repeat(groups, n_skills),
+        "skill": np.tile(np.asarray(profile_skills, dtype=object), n_groups),
+        "target": np.tile(targets, n_groups),
+        "mean_gap": mean_gap.ravel(),
+        "share_below_target": share_below.ravel(),
+    })
+    result["priority"] = result["mean_gap"] * result["share_below_target"]
+    result = result.dropna(subset=["priority"])
+    result = result.sort_values(["team", "priority"], ascending=[True, False], ignore_index=True)
+    result["rank"] = result.groupby("team").cumcount() + 1
+    return result
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(5)
+    n_employees, n_skills = 100_000, 50
+    profile_skills = [f"Skill {i}" for i in range(n_skills)]
+    targets = rng.integers(3, 10, n_skills)
+
+    values = rng.integers(1, 11, (n_employees, n_skills)).astype(float)
+    values[rng.random(values.shape) < 0.05] = np.nan  # some skills left unrated
+    wide = pd.DataFrame(values, columns=profile_skills)
+    wide.insert(0, "team", rng.choice([f"Team {i}" for i in range(200)], n_employees))
+    wide.insert(0, "employee", [f"E{i:06d}" for i in range(n_employees)])
+    long = wide.melt(id_vars=list(ID_COLUMNS), var_name="skill", value_name="rating").dropna()
+
+    # As load_ratings reads a long CSV export: text columns as categoricals
+    long_categorical = long.astype({column: "category" for column in CATEGORICAL_COLUMNS})
+
+    for label, ratings in (("wide", wide), ("long", long), ("long, categorical", long_categorical)):
+        start = time.perf_counter()
+        employees, teams, matrix = rating_matrix(ratings, profile_skills)
+        aligned = time.perf_counter()
+        results = analyze_gaps(employees, teams, matrix, profile_skills, targets)
+        done = time.perf_counter()
+        print(f"{label:<17} {len(ratings):>9,} rows: align {aligned - start:.3f}s, "
+              f"analyze {done - aligned:.3f}s, {len(results['priorities']):,} priority rows")
@@ -0,0 +1,284 @@
+"""Persistent skills knowledge base built from validated Skill Identifier results.
+
+Every validated ``skills`` array is stored under the canonical key of its
+role, skill names are deduplicated case- and punctuation-insensitively, and
+an inverted index from role tokens to roles lets a known role be answered
+without an LLM call.
+
+``record`` appends to a journal next to the JSON snapshot (``<path>.log``),
+so recording costs one short write however large the knowledge base is.
+``save`` folds the journal into the snapshot; loading replays it.
+
+Run ``python skills_kb.py`` to benchmark index build and queries at 50k roles.
+"""
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+
+from role_normalizer import normalize_role
+
+_SKILL_KEY_RE = re.compile(r"[^a-z0-9+#]+")
+
+# Roles differing in these tokens never answer for each other
+SENIORITY_TOKENS = {"intern", "trainee", "entry", "junior", "jr", "associate", "mid", "intermediate", "senior",
+                    "sr", "lead", "staff", "principal", "chief", "head"}
+
+# Journal lines after which loading compacts the journal into the snapshot
+COMPACT_AFTER = 10_000
+
+
+def skill_key(name):
+    """Deduplication key of a skill name"""
+    return _SKILL_KEY_RE.sub(" ", name.lower()).strip()
+
+
+def valid_skills(skills):
+    """True if ``skills`` is a non-empty JSON array of non-empty strings"""
+    return (isinstance(skills, list) and len(skills) > 0
+            and all(isinstance(skill, str) and skill.strip() for skill in skills))
+
+
+class SkillsKnowledgeBase:
+    """Skills per canonical role, persisted as JSON at ``path``
+
+    ``query`` answers exact canonical matches and roles whose token Jaccard
+    similarity with a stored role is at least ``min_score`` and whose
+    seniority tokens are the same.
+    """
+
+    def __init__(self, path=None, min_score=0.75, autosave=True):
+        self.path = path
+        self.min_score = min_score
+        self.autosave = autosave
+        self.journal_path = f"{path}.log" if path else None
+        self._roles = {}
+        self._index = {}
+        self._generations = set()
+        self._journal = None
+        self._journal_lines = 0
+        self._lock = threading.Lock()
+        if path and (os.path.exists(path) or os.path.exists(self.journal_path)):
+            self.load()
+
+    def __len__(self):
+        return len(self._roles)
+
+    def record(self, role, skills, generation=None):
+        """Merge a validated skills array into the entry for ``role``
+
+        ``generation`` identifies the API response the skills come from;
+        a response already recorded (a cache hit) is not counted again.
+        """
+        key = normalize_role(role)
+        if not key or not valid_skills(skills):
+            return
+        with self._lock:
+            if generation is not None:
+                if generation in self._generations:
+                    return
+                self._generations.add(generation)
+            self._merge(key, role, skills)
+            if self.autosave and self.path:
+                self._append({"role": role, "skills": skills, "generation": generation})
+
+    def _merge(self, key, role, skills):
+        # Called with the lock held
+        entry = self._roles.get(key)
+        if entry is None:
+            entry = self._roles[key] = {"role": role.strip(), "skills": {}}
+            for token in key.split():
+                self._index.setdefault(token, set()).add(key)
+        known = entry["skills"]
+        for skill in skills:
+            dedup_key = skill_key(skill)
+            if not dedup_key:
+                continue
+            if dedup_key in known:
+                known[dedup_key][1] += 1
+            else:
+                known[dedup_key] = [skill.strip(), 1]
+
+    def _append(self, record):
+        if self._journal is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._journal.flush()
+        self._journal_lines += 1
+
+    def query(self, role, limit=12):
+        """Skills of the best confident match for ``role``, or None on a miss"""
+        key = normalize_role(role)
+        if not key:
+            return None
+        entry = self._roles.get(key)
+        if entry is None:
+            match = self._best_match(set(key.split()))
+            if match is None:
+                return None
+            entry = self._roles[match]
+        # Skills confirmed by more generations come first
+        ranked = sorted(entry["skills"].values(), key=lambda item: -item[1])
+        return [name for name, _ in ranked[:limit]]
+
+    def _best_match(self, tokens):
+        # Prefix filtering: a role with Jaccard >= min_score must share at
+        # least one of the rarest len(tokens) - ceil(min_score * len(tokens)) + 1
+        # query tokens, so only those postings need to be scanned.
+        rarest = sorted(tokens, key=lambda token: len(self._index.get(token, ())))
+        prefix = len(tokens) - math.ceil(self.min_score * len(tokens)) + 1
+        candidates = set()
+        for token in rarest[:prefix]:
+            candidates.update(self._index.get(token, ()))
+
+        seniority = tokens & SENIORITY_TOKENS
+        best, best_score = None, self.min_score
+        for candidate in candidates:
+            other = set(candidate.split())
+            if other & SENIORITY_TOKENS != seniority:
+                continue
+            score = len(tokens & other) / len(tokens | other)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def load(self):
+        """Read the snapshot and replay the journal; a long journal is compacted"""
+        data = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        with self._lock:
+            self._roles = {}
+            self._index = {}
+            self._generations = set(data.get("generations", ()))
+            for key, entry in data.get("roles", {}).items():
+                self._roles[key] = {
+                    "role": entry["role"],
+                    "skills": {skill_key(name): [name, count] for name, count in entry["skills"]},
+                }
+                for token in key.split():
+                    self._index.setdefault(token, set()).add(key)
+
+            self._journal_lines = 0
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            # A line cut short by a crash
+                            continue
+                        generation = record.get("generation")
+                        if generation is not None:
+                            if generation in self._generations:
+                                continue
+                            self._generations.add(generation)
+                        self._merge(normalize_role(record["role"]), record["role"], record["skills"])
+                        self._journal_lines += 1
+            if self._journal_lines >= COMPACT_AFTER:
+                self._save()
+
+    def save(self):
+        """Write the full snapshot and empty the journal"""
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        data = {
+            "roles": {
+                key: {"role": entry["role"], "skills": list(entry["skills"].values())}
+                for key, entry in self._roles.items()
+            },
+            "generations": sorted(self._generations),
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first so a crash never leaves a truncated file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        # Everything journaled is in the snapshot now
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal_lines = 0
+
+
+if __name__ == "__main__":
+    import random
+    import statistics
+    import time
+
+    rng = random.Random(11)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(5_000)]
+    titles = ["engineer", "analyst", "specialist", "architect", "technician", "scientist", "manager"]
+    skill_pool = [f"Skill {word.title()}" for word in rng.sample(words, 2_000)]
+
+    roles = set()
+    while len(roles) < 50_000:
+        roles.add(" ".join(rng.sample(words, rng.randint(2, 3))) + " " + rng.choice(titles))
+    roles = sorted(roles)
+
+    kb = SkillsKnowledgeBase(os.path.join(tempfile.mkdtemp(), "skills_kb.json"), autosave=False)
+    start = time.perf_counter()
+    for role in roles:
+        kb.record(role, rng.sample(skill_pool, 10))
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    kb.save()
+    save_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    SkillsKnowledgeBase(kb.path)
+    load_seconds = time.perf_counter() - start
+
+    # Recording with autosave appends to the journal instead of rewriting the snapshot
+    journaled = SkillsKnowledgeBase(kb.path)
+    record_timings = []
+    for i, role in enumerate(rng.sample(roles, 2_000)):
+        start = time.perf_counter()
+        journaled.record(role, rng.sample(skill_pool, 10), generation=f"generation-{i}")
+        record_timings.append(time.perf_counter() - start)
+    record_timings.sort()
+    journaled.record(roles[0], rng.sample(skill_pool, 10), generation="generation-0")
+    assert journaled._journal_lines == 2_000, "a repeated generation was recorded twice"
+    start = time.perf_counter()
+    reloaded = SkillsKnowledgeBase(kb.path)
+    replay_seconds = time.perf_counter() - start
+    assert reloaded.query(roles[0]) == journaled.query(roles[0])
+
+    seniority = SkillsKnowledgeBase()
+    seniority.record("Electrical Engineer - Motor Control", ["Motor Drives", "PLC Programming"])
+    assert seniority.query("Electrical Engineer (Motor Control) II") is not None
+    assert seniority.query("Senior Electrical Engineer Motor Control") is None
+
+    def timed_queries(queries):
+        timings, hits = [], 0
+        for query in queries:
+            start = time.perf_counter()
+            hits += kb.query(query) is not None
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        return statistics.median(timings) * 1e3, timings[int(len(timings) * 0.99)] * 1e3, hits / len(queries)
+
+    exact = [" - ".join(reversed(rng.choice(roles).split())).upper() for _ in range(5_000)]
+    # One extra qualifier token keeps 3-of-4 and 4-of-5 token overlaps
+    fuzzy = [rng.choice(roles) + " ii" for _ in range(5_000)]
+    misses = [" ".join(rng.sample(words, 3)) + " intern" for _ in range(5_000)]
+
+    print(f"roles indexed:  {len(kb):,} in {build_seconds:.2f}s (save {save_seconds:.2f}s, load {load_seconds:.2f}s)")
+    print(f"record (autosave): p50 {statistics.median(record_timings) * 1e3:.3f} ms, "
+          f"p99 {record_timings[int(len(record_timings) * 0.99)] * 1e3:.3f} ms; "
+          f"load with 2,000 journal lines {replay_seconds:.2f}s")
+    for label, queries in (("exact", exact), ("fuzzy", fuzzy), ("miss", misses)):
+        p50, p99, hit_rate = timed_queries(queries)
+        print(f"{label:<6} query   p50 {p50:.3f} ms, p99 {p99:.3f} ms, hit rate {hit_rate:.1%}")
@@ -0,0 +1,423 @@
+"""Per-tenant isolation of Claude API traffic.
+
+Every API key is a tenant.  ``TenantScheduler`` admits each call through a
+fair queue: a shared pool of ``capacity`` concurrent calls is handed out
+round-robin across the tenants that have work waiting, and each tenant is
+also held to its own concurrency limit, token-rate limit (a token bucket
+refilled per minute) and daily token quota.  Within a tenant, interactive
+calls go before background work (bulk runs, prefetches, refreshes), which
+is marked with ``background()``.  Live HTTP traffic of each tenant goes
+through its own ``requests.Session`` connection pool, and each tenant has
+its own circuit breaker, so one key's failures (say, its own 429s) never
+make the other tenants fail fast.
+
+The daily token usage is counted in ``usage_store``, the shared generation
+cache backend, so with a SQLite or Redis cache every replica enforces the
+same quota and a restart does not reset it.  Concurrency and the token
+rate are enforced per replica; the configured token rate is split evenly
+across ``HR360_REPLICAS`` replicas.
+
+Limits come from the environment:
+
+- ``HR360_API_CONCURRENCY``: calls in flight across all tenants, per replica (16)
+- ``HR360_TENANT_CONCURRENCY``: calls in flight per tenant, per replica (4)
+- ``HR360_TENANT_TOKENS_PER_MINUTE``: token rate per tenant, across all replicas (200000)
+- ``HR360_TENANT_DAILY_TOKENS``: tokens per tenant per day, across all replicas (5000000)
+- ``HR360_REPLICAS``: number of app replicas sharing the limits (1)
+- ``HR360_TENANT_LIMITS``: JSON object, or path to a JSON file, mapping a
+  tenant id (see ``tenant_id``) to overrides of the above and a ``name``
+
+Run ``python tenants.py`` for a multi-tenant load test against a mock API.
+"""
+import collections
+import contextvars
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import claude_api
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Output tokens reserved for a call until its actual usage is known
+ESTIMATED_OUTPUT_TOKENS = 1000
+MAX_QUEUE_WAIT = 120.0
+
+_priority = contextvars.ContextVar("hr360_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def background():
+    """Mark the API calls made inside as background work"""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def tenant_id(api_key):
+    """Stable, non-secret id of the tenant owning ``api_key``"""
+    return hashlib.sha256((api_key or "").encode()).hexdigest()[:10]
+
+
+def estimate_tokens(payload):
+    prompt_chars = len(payload.get("system") or "") + sum(len(m["content"]) for m in payload["messages"])
+    return prompt_chars // 4 + min(payload.get("max_tokens", ESTIMATED_OUTPUT_TOKENS), ESTIMATED_OUTPUT_TOKENS)
+
+
+class TenantQuotaExceeded(claude_api.ClaudeAPIError):
+    pass
+
+
+class _Tenant:
+    def __init__(self, tenant, limits, now, today):
+        self.id = tenant
+        self.limits = limits
+        self.queues = (collections.deque(), collections.deque())
+        self.in_flight = 0
+        self.bucket = float(limits["tokens_per_minute"])
+        self.bucket_at = now
+        self.day = today
+        self.tokens_today = 0
+        self.requests = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.waits = collections.deque(maxlen=1000)
+        self.transport = None
+        # Same settings as the process-wide breaker (HR360_BREAKER_*)
+        self.breaker = claude_api.CircuitBreaker(
+            failure_threshold=claude_api.breaker.failure_threshold,
+            latency_threshold=claude_api.breaker.latency_threshold,
+            reset_timeout=claude_api.breaker.reset_timeout,
+        )
+
+    def refill(self, now):
+        rate = self.limits["tokens_per_minute"] / 60.0
+        self.bucket = min(float(self.limits["tokens_per_minute"]), self.bucket + (now - self.bucket_at) * rate)
+        self.bucket_at = now
+
+
+class _Ticket:
+    __slots__ = ("tenant", "estimate", "priority", "enqueued_at", "granted", "throttled", "usage")
+
+    def __init__(self, tenant, estimate, priority, enqueued_at):
+        self.tenant = tenant
+        self.estimate = estimate
+        self.priority = priority
+        self.enqueued_at = enqueued_at
+        self.granted = False
+        self.throttled = False
+        self.usage = None
+
+    def finish(self, response_data):
+        """Report the call's response so its actual token usage is charged"""
+        usage = (response_data or {}).get("usage") or {}
+        self.usage = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+
+
+class TenantScheduler:
+    """Fair admission of API calls across tenants, with per-tenant limits"""
+
+    def __init__(self, capacity=16, concurrency=4, tokens_per_minute=200_000, daily_tokens=5_000_000,
+                 overrides=None, max_wait=MAX_QUEUE_WAIT, clock=time.monotonic, today=datetime.date.today,
+                 usage_store=None):
+        self.capacity = capacity
+        self.defaults = {"concurrency": concurrency, "tokens_per_minute": tokens_per_minute,
+                         "daily_tokens": daily_tokens, "name": None}
+        self.overrides = overrides or {}
+        self.max_wait = max_wait
+        # Shared counters of daily usage (a generation cache backend), or None to count in this process
+        self.usage_store = usage_store
+        self._clock = clock
+        self._today = today
+        self._cond = threading.Condition()
+        self._tenants = collections.OrderedDict()
+        self._in_flight = 0
+
+    def limits(self, tenant):
+        return {**self.defaults, **self.overrides.get(tenant, {})}
+
+    def _tenant(self, api_key):
+        tenant = tenant_id(api_key)
+        state = self._tenants.get(tenant)
+        if state is None:
+            state = self._tenants[tenant] = _Tenant(tenant, self.limits(tenant), self._clock(), self._today())
+        if state.day != self._today():
+            state.day = self._today()
+            state.tokens_today = 0
+        return state
+
+    def _shared_usage(self, tenant, day, tokens=0):
+        """Add ``tokens`` to the tenant's usage on ``day`` in the usage store and return the total"""
+        return self.usage_store.incr(f"tenant-usage:{tenant.id}:{day.isoformat()}", tokens)
+
+    def _dispatch(self):
+        # Called with the lock held: hand free capacity to waiting tenants round-robin
+        granted = False
+        while self._in_flight < self.capacity:
+            now = self._clock()
+            for tenant in list(self._tenants.values()):
+                if tenant.in_flight >= tenant.limits["concurrency"]:
+                    continue
+                queue = tenant.queues[INTERACTIVE] or tenant.queues[BACKGROUND]
+                if not queue:
+                    continue
+                ticket = queue[0]
+                tenant.refill(now)
+                if tenant.bucket < min(ticket.estimate, tenant.limits["tokens_per_minute"]):
+                    if not ticket.throttled:
+                        ticket.throttled = True
+                        tenant.throttled += 1
+                    continue
+                queue.popleft()
+                ticket.granted = True
+                tenant.bucket -= ticket.estimate
+                tenant.in_flight += 1
+                self._in_flight += 1
+                # The tenant just served moves to the back of the rotation
+                self._tenants.move_to_end(tenant.id)
+                granted = True
+                break
+            else:
+                break
+        if granted:
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, api_key, payload):
+        """Wait for this tenant's turn to call the API; yields a ticket to ``finish`` with the response"""
+        estimate = estimate_tokens(payload)
+        with self._cond:
+            tenant = self._tenant(api_key)
+            day = tenant.day
+        if self.usage_store is not None:
+            # Outside the lock: the store may be a network round trip away
+            shared_today = self._shared_usage(tenant, day)
+        with self._cond:
+            if self.usage_store is not None and tenant.day == day:
+                tenant.tokens_today = shared_today
+            daily = tenant.limits["daily_tokens"]
+            if tenant.tokens_today + estimate > daily:
+                tenant.rejected += 1
+                raise TenantQuotaExceeded(f"The daily quota of {daily:,} tokens for this API key is used up.")
+            ticket = _Ticket(tenant, estimate, _priority.get(), self._clock())
+            tenant.queues[ticket.priority].append(ticket)
+            self._dispatch()
+            while not ticket.granted:
+                if self._clock() - ticket.enqueued_at > self.max_wait:
+                    tenant.queues[ticket.priority].remove(ticket)
+                    raise claude_api.ClaudeAPIError("Timed out waiting for API capacity")
+                # Timed wait, so throttled tenants are retried as their token buckets refill
+                self._cond.wait(timeout=0.05)
+                self._dispatch()
+            tenant.waits.append(self._clock() - ticket.enqueued_at)
+            tenant.requests += 1
+        try:
+            yield ticket
+        finally:
+            with self._cond:
+                tenant.in_flight -= 1
+                self._in_flight -= 1
+                # Charge the actual usage; failed calls get their reservation back
+                used = ticket.usage or 0
+                tenant.bucket -= used - ticket.estimate
+                if tenant.day == day:
+                    tenant.tokens_today += used
+                self._dispatch()
+            if self.usage_store is not None and used:
+                total = self._shared_usage(tenant, day, used)
+                with self._cond:
+                    if tenant.day == day:
+                        tenant.tokens_today = total
+
+    def transport_for(self, api_key, default):
+        """The tenant's own HTTP transport with a dedicated connection pool, or ``default``"""
+        if type(default) is not claude_api.HTTPTransport:
+            return default
+        with self._cond:
+            tenant = self._tenant(api_key)
+            if tenant.transport is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                session.mount("https://", HTTPAdapter(pool_connections=1,
+                                                      pool_maxsize=tenant.limits["concurrency"]))
+                tenant.transport = claude_api.HTTPTransport(session=session, timeout=default.timeout)
+            return tenant.transport
+
+    def breaker_for(self, api_key):
+        """The circuit breaker of the tenant owning ``api_key``"""
+        with self._cond:
+            return self._tenant(api_key).breaker
+
+    def usage(self, api_key=None):
+        """Usage rows per tenant (only the tenant of ``api_key`` if given)"""
+        only = tenant_id(api_key) if api_key is not None else None
+        rows = []
+        tenants = []
+        with self._cond:
+            now = self._clock()
+            for tenant in self._tenants.values():
+                if only is not None and tenant.id != only:
+                    continue
+                tenants.append(tenant)
+                tenant.refill(now)
+                waits = sorted(tenant.waits)
+                rows.append({
+                    "tenant": tenant.id,
+                    "name": tenant.limits["name"] or tenant.id,
+                    "in_flight": tenant.in_flight,
+                    "queued": len(tenant.queues[INTERACTIVE]) + len(tenant.queues[BACKGROUND]),
+                    "requests": tenant.requests,
+                    "throttled": tenant.throttled,
+                    "rejected": tenant.rejected,
+                    "tokens_today": tenant.tokens_today,
+                    "daily_tokens": tenant.limits["daily_tokens"],
+                    "tokens_available": max(0, int(tenant.bucket)),
+                    "tokens_per_minute": tenant.limits["tokens_per_minute"],
+                    "wait_p50_s": waits[len(waits) // 2] if waits else 0.0,
+                    "wait_p95_s": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                    "breaker": tenant.breaker.metrics()["state"],
+                    "day": tenant.day,
+                })
+        for row, tenant in zip(rows, tenants):
+            day = row.pop("day")
+            if self.usage_store is not None:
+                row["tokens_today"] = self._shared_usage(tenant, day)
+        return rows
+
+
+def scheduler_from_env(usage_store=None):
+    """TenantScheduler configured from the HR360_* environment variables, counting usage in ``usage_store``"""
+    overrides = os.getenv("HR360_TENANT_LIMITS", "")
+    if overrides and os.path.exists(overrides):
+        with open(overrides, encoding="utf-8") as f:
+            overrides = f.read()
+    overrides = json.loads(overrides) if overrides else {}
+    # Each replica refills its own token buckets, so each gets its share of the rate
+    replicas = max(1, int(os.getenv("HR360_REPLICAS", "1")))
+    for limits in overrides.values():
+        if "tokens_per_minute" in limits:
+            limits["tokens_per_minute"] = limits["tokens_per_minute"] // replicas
+    return TenantScheduler(
+        capacity=int(os.getenv("HR360_API_CONCURRENCY", "16")),
+        concurrency=int(os.getenv("HR360_TENANT_CONCURRENCY", "4")),
+        tokens_per_minute=int(os.getenv("HR360_TENANT_TOKENS_PER_MINUTE", "200000")) // replicas,
+        daily_tokens=int(os.getenv("HR360_TENANT_DAILY_TOKENS", "5000000")),
+        overrides=overrides,
+        usage_store=usage_store,
+    )
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    class MockAPI:
+        """Replay transport behind a server that handles ``slots`` calls at a time"""
+
+        def __init__(self, latency, slots):
+            self._replay = claude_api.ReplayTransport(None, latency=latency, fallback=lambda payload: "ok " * 200)
+            self._slots = threading.Semaphore(slots)
+
+        def send(self, payload, api_key):
+            with self._slots:
+                return self._replay.send(payload, api_key)
+
+    def load_test(scheduler):
+        claude_api.set_scheduler(scheduler)
+        mock = MockAPI(latency=0.1, slots=8)
+        interactive_latency = collections.defaultdict(list)
+
+        def bulk_call(i):
+            with background():
+                claude_api.create_message(claude_api.build_payload(f"bulk {i}"), "key-bulk", transport=mock)
+
+        def interactive_user(key):
+            for i in range(15):
+                start = time.perf_counter()
+                claude_api.create_message(claude_api.build_payload(f"{key} {i}"), key, transport=mock)
+                interactive_latency[key].append(time.perf_counter() - start)
+                time.sleep(0.05)
+
+        # One department floods the API with a bulk run while two others work interactively
+        with ThreadPoolExecutor(max_workers=64) as bulk_pool, ThreadPoolExecutor(max_workers=2) as users:
+            bulk = [bulk_pool.submit(bulk_call, i) for i in range(400)]
+            time.sleep(0.2)
+            start = time.perf_counter()
+            sessions = [users.submit(interactive_user, key) for key in ("key-sales", "key-engineering")]
+            for future in sessions:
+                future.result()
+            interactive_elapsed = time.perf_counter() - start
+            for future in bulk:
+                future.result()
+        samples = sorted(latency for latencies in interactive_latency.values() for latency in latencies)
+        return samples, interactive_elapsed
+
+    for label, scheduler in (("no tenant scheduler", None),
+                             ("fair tenant scheduler", TenantScheduler(capacity=8, concurrency=6))):
+        samples, elapsed = load_test(scheduler)
+        print(f"{label:<22} interactive latency p50 {samples[len(samples) // 2] * 1e3:6.0f} ms   "
+              f"p95 {samples[int(len(samples) * 0.95)] * 1e3:6.0f} ms   (mock API: 100 ms per call, 8 at a time)")
+        if scheduler is not None:
+            for row in scheduler.usage():
+                print(f"  tenant {row['tenant']}: {row['requests']} requests, {row['tokens_today']:,} tokens, "
+                      f"queue wait p50 {row['wait_p50_s'] * 1e3:.0f} ms, p95 {row['wait_p95_s'] * 1e3:.0f} ms")
+
+    class RateLimitedKey:
+        """Mock API answering 429 to one key and normally to the others"""
+
+        def __init__(self, limited_key):
+            self.limited_key = limited_key
+            self._replay = claude_api.ReplayTransport(None, fallback=lambda payload: "ok")
+
+        def send(self, payload, api_key):
+            if api_key == self.limited_key:
+                raise claude_api.APIStatusError(429, "rate_limit_error")
+            return self._replay.send(payload, api_key)
+
+    # One tenant's own 429s open its breaker only
+    scheduler = TenantScheduler()
+    claude_api.set_scheduler(scheduler)
+    mock = RateLimitedKey("key-throttled")
+    for i in range(claude_api.breaker.failure_threshold + 1):
+        try:
+            claude_api.create_message(claude_api.build_payload(f"throttled {i}"), "key-throttled", transport=mock)
+        except claude_api.ClaudeAPIError as error:
+            outcome = type(error).__name__
+    claude_api.create_message(claude_api.build_payload("other tenant"), "key-sales", transport=mock)
+    # Two replicas sharing one SQLite cache enforce one daily quota
+    import tempfile
+
+    from generation_cache import SQLiteBackend
+
+    class FixedUsage:
+        """Mock API charging 2,000 tokens per call"""
+
+        def send(self, payload, api_key):
+            return {"content": [{"type": "text", "text": "ok"}],
+                    "usage": {"input_tokens": 500, "output_tokens": 1500}}
+
+    store_path = os.path.join(tempfile.mkdtemp(), "cache.db")
+    replicas = [TenantScheduler(daily_tokens=20_000, usage_store=SQLiteBackend(store_path)) for _ in range(2)]
+    answered = {0: 0, 1: 0}
+    for i in range(20):
+        replica = i % 2
+        claude_api.set_scheduler(replicas[replica])
+        try:
+            claude_api.create_message(claude_api.build_payload(f"quota {i}"), "key-sales", transport=FixedUsage())
+            answered[replica] += 1
+        except TenantQuotaExceeded:
+            pass
+    print(f"shared daily quota: {answered[0] + answered[1]} calls answered across 2 replicas "
+          f"({answered[0]} + {answered[1]}), {replicas[0].usage('key-sales')[0]['tokens_today']:,} of 20,000 tokens used")
+    claude_api.set_scheduler(scheduler)
+    print(f"breaker isolation: key-throttled {scheduler.breaker_for('key-throttled').state} (last call: {outcome}), "
+          f"key-sales {scheduler.breaker_for('key-sales').state} (call succeeded)")
+    claude_api.set_scheduler(None)
@@ -0,0 +1,184 @@
+import threading
+import time
+
+import pytest
+
+from generation_cache import CacheBackend, InProcessBackend, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return InProcessBackend()
+    return SQLiteBackend(str(tmp_path / "cache.db"))
+
+
+def test_miss_generates_and_hit_reuses(backend):
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return {"text": "plan", "usage": {"input_tokens": 10, "output_tokens": 20}}
+
+    first = backend.get_or_generate("key", generate)
+    second = backend.get_or_generate("key", generate)
+    assert len(calls) == 1
+    assert first["text"] == second["text"] == "plan"
+    assert second["usage"] == {"input_tokens": 10, "output_tokens": 20}
+    metrics = backend.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["generations"]) == (1, 1, 1)
+
+
+def test_expired_entry_is_regenerated(backend):
+    backend.get_or_generate("key", lambda: "old")
+    time.sleep(0.02)
+    assert backend.get_or_generate("key", lambda: "new", max_age=0.01)["text"] == "new"
+
+
+def test_concurrent_callers_generate_once(backend):
+    calls = []
+    barrier = threading.Barrier(8)
+    results = []
+
+    def generate():
+        calls.append(1)
+        time.sleep(0.3)
+        return "shared"
+
+    def caller():
+        barrier.wait()
+        results.append(backend.get_or_generate("key", generate)["text"])
+
+    threads = [threading.Thread(target=caller) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == ["shared"] * 8
+    assert backend.metrics()["lock_waits"] == 7
+    assert not backend.locked("key")
+
+
+def test_failed_holder_releases_the_lease(backend):
+    def failing():
+        raise RuntimeError("API down")
+
+    with pytest.raises(RuntimeError):
+        backend.get_or_generate("key", failing)
+    assert not backend.locked("key")
+    assert backend.get_or_generate("key", lambda: "recovered")["text"] == "recovered"
+
+
+def test_waiter_generates_itself_after_timeout(backend):
+    token = backend.acquire("key", ttl=60)
+    start = time.monotonic()
+    entry = backend.get_or_generate("key", lambda: "own", wait_timeout=0.3)
+    assert entry["text"] == "own"
+    assert 0.3 <= time.monotonic() - start < 5
+    assert backend.metrics()["lock_waits"] == 1
+    # The abandoned holder's lease is left alone
+    assert backend.locked("key")
+    backend.release("key", token)
+
+
+def test_expired_lease_can_be_taken_over(backend):
+    assert backend.acquire("key", ttl=0.05) is not None
+    assert backend.acquire("key", ttl=60) is None
+    time.sleep(0.1)
+    token = backend.acquire("key", ttl=60)
+    assert token is not None
+    backend.release("key", "someone else's token")
+    assert backend.locked("key")
+    backend.release("key", token)
+    assert not backend.locked("key")
+
+
+def test_stream_without_the_lease_keeps_usage(backend):
+    def stream():
+        yield "part one, "
+        yield "part two"
+        return {"usage": {"input_tokens": 3, "output_tokens": 4}}
+
+    token = backend.acquire("key", ttl=60)
+    chunks = backend.stream_or_generate("key", stream, wait_timeout=0.1)
+    assert "".join(chunks) == "part one, part two"
+    backend.release("key", token)
+    entry = backend.get("key")
+    assert entry["text"] == "part one, part two"
+    assert entry["usage"] == {"input_tokens": 3, "output_tokens": 4}
+
+
+def test_stream_stores_only_complete_responses(backend):
+    def stream():
+        yield "partial"
+        yield "rest"
+        return {"usage": {"input_tokens": 1, "output_tokens": 2}}
+
+    chunks = backend.stream_or_generate("key", stream)
+    assert next(chunks) == "partial"
+    chunks.close()
+    assert backend.get("key") is None
+    assert not backend.locked("key")
+
+    assert "".join(backend.stream_or_generate("key", stream)) == "partialrest"
+    assert backend.get("key")["usage"] == {"input_tokens": 1, "output_tokens": 2}
+
+
+def test_incomplete_backend_fails_when_created():
+    class NoLocks(CacheBackend):
+        def _get(self, key):
+            return None
+
+        def _set(self, key, data, stored_at):
+            pass
+
+    with pytest.raises(TypeError):
+        NoLocks()
+
+
+def test_streaming_holder_renews_its_lease(backend):
+    def stream():
+        for i in range(8):
+            time.sleep(0.05)
+            yield f"{i} "
+
+    taken_over = []
+    for chunk in backend.stream_or_generate("key", stream, lock_ttl=0.15):
+        # Well past the first lease, another caller still cannot take it
+        taken_over.append(backend.acquire("key", ttl=60))
+    assert taken_over == [None] * 8
+    assert not backend.locked("key")
+    assert backend.get("key")["text"] == "0 1 2 3 4 5 6 7 "
+
+
+def test_renew_needs_the_holders_token(backend):
+    token = backend.acquire("key", ttl=60)
+    assert backend.renew("key", token, ttl=60)
+    assert not backend.renew("key", "someone else's token", ttl=60)
+    backend.release("key", token)
+    assert not backend.renew("key", token, ttl=60)
+
+
+def test_old_entries_are_evicted(backend):
+    now = time.time()
+    backend.set("old", {"text": "old", "stored_at": now - 3600})
+    backend.set("new", {"text": "new", "stored_at": now})
+    assert backend.evict(max_age=60) == 1
+    assert backend.get("old") is None
+    assert backend.get("new")["text"] == "new"
+    assert backend.metrics()["evictions"] == 1
+
+
+def test_writes_evict_past_the_retention(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.db"), retention=60)
+    backend.set("old", {"text": "old", "stored_at": time.time() - 3600})
+    assert backend.get("old") is None
+
+
+def test_counters_are_shared_between_backends(tmp_path):
+    first, second = SQLiteBackend(str(tmp_path / "cache.db")), SQLiteBackend(str(tmp_path / "cache.db"))
+    assert first.incr("tokens", 0) == 0
+    assert first.incr("tokens", 1500) == 1500
+    assert second.incr("tokens", 500) == 2000
+    assert first.incr("tokens", 0) == 2000
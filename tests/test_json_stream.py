@@ -0,0 +1,103 @@
+import json
+import random
+
+import pytest
+
+from json_stream import JSONStreamError, JSONStreamParser, iter_json_stream
+
+QUESTIONS = {
+    "skills": {f"Skill {i}": [f"Question {j} about \"skill\" {i}?" for j in range(3)] for i in range(5)},
+    "general": ["Tell us about a project.", "How do you prioritise?"],
+    "meta": {"count": 17, "ratio": -1.5e3, "draft": False, "owner": None, "tags": [], "extra": {}},
+}
+RESPONSE = "Here are the questions:\n" + json.dumps(QUESTIONS, indent=2) + "\nGood luck!"
+
+
+def split(text, seed, max_size=8):
+    rng = random.Random(seed)
+    chunks, i = [], 0
+    while i < len(text):
+        size = rng.randint(1, max_size)
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
+
+
+def members(events, depth=1):
+    return {path[-1]: value for path, value in events if len(path) == depth}
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_any_chunking_yields_the_same_events(seed):
+    events = list(iter_json_stream(split(RESPONSE, seed)))
+    assert members(events) == QUESTIONS
+    assert [path for path, _ in events if path[0] == "skills" and len(path) == 2] == \
+        [("skills", skill) for skill in QUESTIONS["skills"]]
+
+
+def test_events_arrive_as_soon_as_each_member_completes():
+    parser = JSONStreamParser()
+    assert parser.feed('["Circuit Analysis", "Motor') == [((0,), "Circuit Analysis")]
+    assert parser.feed(' Drives"') == [((1,), "Motor Drives")]
+    assert parser.feed(', 4') == []
+    assert parser.feed('2]') == [((2,), 42)]
+    assert parser.done
+    assert parser.close() == ["Circuit Analysis", "Motor Drives", 42]
+
+
+def test_prose_around_the_value_is_ignored():
+    events = list(iter_json_stream(["Sure! Here they are: [\"a\"", ", \"b\"] Hope this", " helps [1]"]))
+    assert events == [((0,), "a"), ((1,), "b")]
+
+
+def test_truncated_stream_yields_completed_members_then_fails():
+    cut = RESPONSE.index('"Skill 3"')
+    events = []
+    with pytest.raises(JSONStreamError, match="ended before"):
+        for event in iter_json_stream(split(RESPONSE[:cut], 0)):
+            events.append(event)
+    assert [path for path, _ in events if len(path) == 2] == [("skills", f"Skill {i}") for i in range(3)]
+
+
+@pytest.mark.parametrize("text", ['["a", "b"', '{"a": 1', '{"a": "unterminated', '[1, 2, 3'])
+def test_truncated_values_are_rejected(text):
+    with pytest.raises(JSONStreamError):
+        list(iter_json_stream([text]))
+
+
+@pytest.mark.parametrize("text", [
+    '["a", "b",]', '["a" "b"]', '{"a": 1]', '{"a" 1}', '[1, tru]', '{"a": "b\\x"}', 'no json here',
+    '{"a": }', '{"a":}', '{"a": 1,}', '{,}', '[,]', '{"a": [1,]}', '{1: 2}', '[-]', '{"a": 1 2}',
+])
+def test_malformed_streams_raise_json_stream_error(text):
+    for seed in range(5):
+        with pytest.raises(JSONStreamError):
+            list(iter_json_stream(split(text, seed, max_size=3)))
+
+
+def test_literal_newlines_inside_strings_are_accepted():
+    text = '{"skills": ["Circuit\nAnalysis", "Motor Drives"], "why": "Line one\nline two"}'
+    for seed in range(10):
+        events = list(iter_json_stream(split(text, seed)))
+        assert members(events) == {"skills": ["Circuit\nAnalysis", "Motor Drives"], "why": "Line one\nline two"}
+        assert members(events, depth=2) == {0: "Circuit\nAnalysis", 1: "Motor Drives"}
+
+
+def test_mutated_responses_only_raise_json_stream_error():
+    rng = random.Random(7)
+    text = json.dumps(QUESTIONS)
+    for _ in range(2000):
+        chars = list(text)
+        for _ in range(rng.randint(1, 3)):
+            position = rng.randrange(len(chars))
+            action = rng.random()
+            if action < 0.4:
+                del chars[position]
+            elif action < 0.7:
+                chars.insert(position, rng.choice('{}[]:,"\\ 1n\n'))
+            else:
+                chars[position] = rng.choice('{}[]:,"\\ 1n\n')
+        try:
+            list(iter_json_stream(split("".join(chars), rng.random())))
+        except JSONStreamError:
+            pass
@@ -0,0 +1,71 @@
+import pytest
+
+from generation_cache import InProcessBackend, SQLiteBackend
+from role_normalizer import RoleIndex, normalize_role, one_edit_apart
+
+
+@pytest.fixture
+def index():
+    index = RoleIndex()
+    for role in ("Senior Electrical Technician", "Mechanical Engineer", "Junior Software Engineer", "Data Analyst"):
+        index.add(role)
+    return index
+
+
+def test_phrasing_and_token_order_are_ignored():
+    assert (normalize_role("Electrical Engineer - Motor Control")
+            == normalize_role("electrical engineer (motor control)")
+            == normalize_role("Motor Control Electrical Engineer"))
+
+
+@pytest.mark.parametrize("query, key", [
+    ("Electrcal Engineer", "electrical engineer"),       # dropped letter
+    ("Sofwtare Engineer", "engineer software"),          # swapped letters
+    ("Mechanicel Engineer", "engineer mechanical"),      # changed letter
+    ("Senior Softwares Engineer", "engineer senior software"),  # added letter
+])
+def test_typos_are_corrected(index, query, key):
+    assert index.key(query) == key
+
+
+@pytest.mark.parametrize("query, key", [
+    ("Senior Electrician Technician", "electrician senior technician"),
+    ("Mechanic Engineer", "engineer mechanic"),
+    ("Junior Mechanics Engineer", "engineer junior mechanics"),
+    ("Bata Analyst", "analyst bata"),
+    ("QA Engineer", "engineer qa"),
+])
+def test_distinct_words_are_not_rewritten(index, query, key):
+    assert index.key(query) == key
+
+
+def test_known_tokens_are_never_merged(index):
+    index.add("Senior Data Analyst")
+    assert index.key("Junior Data Analyst") == "analyst data junior"
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("engineer", "enginer", True),
+    ("engineer", "engineers", True),
+    ("engineer", "enigneer", True),
+    ("engineer", "engimeer", True),
+    ("mechanic", "mechanical", False),
+    ("senior", "junior", False),
+    ("engineer", "engineer", False),
+])
+def test_one_edit_apart(a, b, expected):
+    assert one_edit_apart(a, b) is expected
+    assert one_edit_apart(b, a) is expected
+
+
+@pytest.mark.parametrize("backend_type", ["memory", "sqlite"])
+def test_replicas_share_the_first_phrasing(tmp_path, backend_type):
+    if backend_type == "memory":
+        backend = other_backend = InProcessBackend()
+    else:
+        backend = SQLiteBackend(str(tmp_path / "cache.db"))
+        other_backend = SQLiteBackend(str(tmp_path / "cache.db"))
+    first, restarted = RoleIndex(phrasings=backend), RoleIndex(phrasings=other_backend)
+    assert first.canonicalize("Electrical Engineer - Motor Control") == "Electrical Engineer - Motor Control"
+    assert restarted.canonicalize("motor control electrical engineer") == "Electrical Engineer - Motor Control"
+    assert first.canonicalize("electrical engineer (motor control)") == "Electrical Engineer - Motor Control"
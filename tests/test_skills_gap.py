@@ -0,0 +1,54 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from skills_gap import align_skills, analyze_gaps, load_ratings, rating_matrix
+
+LONG_CSV = """employee,team,skill,rating
+A,T1,Circuit Analysis,3
+A,T1,Embedded C,7
+B,T2,circuit analysis,9
+"""
+
+WIDE_CSV = """employee,team,Circuit Analysis,circuit analysis,Embedded C
+A,T1,3,,7
+B,T2,,9,
+"""
+
+
+def ratings(text):
+    return load_ratings(io.StringIO(text), "ratings.csv")
+
+
+def test_every_spelling_of_a_skill_is_aligned():
+    mapping = align_skills(["Circuit Analysis", "Embedded C", "circuit analysis"], ["Circuit Analysis"])
+    assert mapping == {"Circuit Analysis": ["Circuit Analysis", "circuit analysis"]}
+
+
+@pytest.mark.parametrize("text", [LONG_CSV, WIDE_CSV], ids=["long", "wide"])
+def test_ratings_under_other_spellings_are_kept(text):
+    employees, teams, matrix = rating_matrix(ratings(text), ["Circuit Analysis", "Embedded C", "PCB Design"])
+    assert list(employees) == ["A", "B"]
+    np.testing.assert_array_equal(matrix, [[3, 7, np.nan], [9, np.nan, np.nan]])
+
+    results = analyze_gaps(employees, teams, matrix, ["Circuit Analysis", "Embedded C", "PCB Design"], [5, 5, 5])
+    a = results["employees"].set_index("employee").loc["A"]
+    assert a["skills_rated"] == 2
+    assert a["coverage"] == 0.5
+    assert a["top_priority"] == "Circuit Analysis"
+
+
+@pytest.mark.parametrize("text", [LONG_CSV, WIDE_CSV], ids=["long", "wide"])
+def test_a_rating_column_shared_by_two_profile_skills_fills_both(text):
+    skills = ["Circuit Analysis", "Circuit Analyses", "Embedded C"]
+    assert align_skills(["Circuit Analysis", "Embedded C"], skills)["Circuit Analyses"] == ["Circuit Analysis"]
+    _, _, matrix = rating_matrix(ratings(text), skills)
+    np.testing.assert_array_equal(matrix, [[3, 3, 7], [9, 9, np.nan]])
+
+
+def test_categorical_and_plain_long_ratings_agree():
+    plain = pd.read_csv(io.StringIO(LONG_CSV))
+    skills = ["Circuit Analysis", "Embedded C"]
+    np.testing.assert_array_equal(rating_matrix(plain, skills)[2], rating_matrix(ratings(LONG_CSV), skills)[2])
@@ -0,0 +1,41 @@
+import pytest
+
+import claude_api
+from generation_cache import SQLiteBackend
+from tenants import TenantQuotaExceeded, TenantScheduler
+
+
+class FixedUsage:
+    def send(self, payload, api_key):
+        return {"content": [{"type": "text", "text": "ok"}], "usage": {"input_tokens": 500, "output_tokens": 1500}}
+
+
+@pytest.fixture
+def replicas(tmp_path):
+    schedulers = [TenantScheduler(daily_tokens=10_000, usage_store=SQLiteBackend(str(tmp_path / "cache.db")))
+                  for _ in range(2)]
+    yield schedulers
+    claude_api.set_scheduler(None)
+
+
+def call(scheduler, api_key):
+    claude_api.set_scheduler(scheduler)
+    claude_api.create_message(claude_api.build_payload("prompt"), api_key, transport=FixedUsage())
+
+
+def test_replicas_share_the_daily_quota(replicas):
+    for i in range(5):
+        call(replicas[i % 2], "key-a")
+    # All 10,000 tokens are used, so the next call is rejected on either replica
+    for replica in replicas:
+        with pytest.raises(TenantQuotaExceeded):
+            call(replica, "key-a")
+    assert replicas[1].usage("key-a")[0]["tokens_today"] == 10_000
+    call(replicas[1], "key-b")
+
+
+def test_restarted_replica_keeps_the_days_usage(replicas, tmp_path):
+    call(replicas[0], "key-a")
+    restarted = TenantScheduler(daily_tokens=10_000, usage_store=SQLiteBackend(str(tmp_path / "cache.db")))
+    call(restarted, "key-a")
+    assert restarted.usage("key-a")[0]["tokens_today"] == 4_000